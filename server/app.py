@@ -21,11 +21,13 @@ from server.config import (
     validate_startup_security,
 )
 from server.database import Base, engine
+from server.migrations import run_migrations
 from server.models import db as _db_models  # noqa: F401
 from server.routers.auth import router as auth_router
 from server.routers.projects import router as projects_router
 from server.routers.schedules import router as schedules_router
 from server.routers.status import router as status_router
+from server.services.project_cache import start_project_cache, stop_project_cache
 from server.services.scheduler import start_scheduler, stop_scheduler
 
 AUTH_PUBLIC_PATHS = frozenset({"/login", "/logout"})
@@ -44,6 +46,7 @@ AUTH_PUBLIC_PATH_EXTENSIONS = (
 async def lifespan(_: FastAPI):
     validate_startup_security()
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     if not PROJECTS_ROOT.exists():
         logger.warning(
             "La carpeta de stacks no existe: %s. Por defecto el compose oficial usa "
@@ -55,7 +58,9 @@ async def lifespan(_: FastAPI):
             DEFAULT_STACKS_ROOT,
         )
     start_scheduler()
+    start_project_cache()
     yield
+    stop_project_cache()
     stop_scheduler()
 
 
@@ -105,6 +110,7 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth_router)
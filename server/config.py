@@ -20,12 +20,137 @@ PROJECTS_ROOT = Path(
     os.getenv("PROJECTS_ROOT") or os.getenv("DOCKER_ROOT_PATH", DEFAULT_STACKS_ROOT)
 )
 DB_PATH = DATA_DIR / "pullpilot.db"
+UPDATE_STATUS_DB_PATH = DATA_DIR / "update_status.db"
 _static_override = os.getenv("STATIC_DIR", "").strip()
 STATIC_DIR = Path(_static_override) if _static_override else BASE_DIR / "static"
 TEMPLATES_DIR = BASE_DIR / "templates"
 
+# SQLite: WAL deja leer a la API mientras el scheduler escribe historial.
+_raw_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL").strip().upper()
+SQLITE_JOURNAL_MODE: Literal["WAL", "DELETE", "TRUNCATE"] = (
+    _raw_journal_mode if _raw_journal_mode in ("WAL", "DELETE", "TRUNCATE") else "WAL"
+)
+_raw_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()
+SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = (
+    _raw_synchronous if _raw_synchronous in ("OFF", "NORMAL", "FULL") else "NORMAL"
+)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+DB_POOL_SIZE = max(1, int(os.getenv("DB_POOL_SIZE", "5")))
+DB_MAX_OVERFLOW = max(0, int(os.getenv("DB_MAX_OVERFLOW", "10")))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
 HEALTHCHECK_TIMEOUT = int(os.getenv("HEALTHCHECK_TIMEOUT", "60"))
 COMMAND_TIMEOUT = int(os.getenv("COMMAND_TIMEOUT", "300"))
+# Líneas de stdout/stderr que conserva en memoria el runner asíncrono (el resto solo se emite).
+COMMAND_OUTPUT_TAIL_LINES = int(os.getenv("COMMAND_OUTPUT_TAIL_LINES", "200"))
+# Historial: detalles comprimidos (zlib) y tope por stack; al superarlo se conserva el final.
+HISTORY_COMPRESS = _env_bool("HISTORY_COMPRESS", True)
+HISTORY_MAX_LOG_BYTES = max(0, int(os.getenv("HISTORY_MAX_LOG_BYTES", str(256 * 1024))))
+# Retención del historial (0 = sin límite en ese criterio) y cada cuántas horas se aplica.
+# Todo a 0 por defecto: el borrado es definitivo, así que cada instalación lo activa a mano.
+HISTORY_RETENTION_DAYS = max(0, int(os.getenv("HISTORY_RETENTION_DAYS", "0")))
+HISTORY_RETENTION_RUNS = max(0, int(os.getenv("HISTORY_RETENTION_RUNS", "0")))
+HISTORY_RETENTION_MB = max(0, float(os.getenv("HISTORY_RETENTION_MB", "0")))
+HISTORY_RETENTION_INTERVAL = max(0, float(os.getenv("HISTORY_RETENTION_INTERVAL", "24")))
+# Filas borradas por transacción: lotes pequeños para no bloquear las escrituras de logs.
+HISTORY_RETENTION_BATCH = max(1, int(os.getenv("HISTORY_RETENTION_BATCH", "200")))
+# Actualizaciones lanzadas desde la API que se conservan (con su log) tras terminar.
+UPDATE_JOBS_HISTORY = int(os.getenv("UPDATE_JOBS_HISTORY", "50"))
+
+
+def _default_docker_socket() -> str:
+    docker_host = os.getenv("DOCKER_HOST", "").strip()
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://") :]
+    return "/var/run/docker.sock"
+
+
+# Consultas de estado/salud vía Docker Engine API (socket unix); el CLI queda como respaldo.
+DOCKER_API_ENABLED = _env_bool("DOCKER_API_ENABLED", True)
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET", "").strip() or _default_docker_socket()
+DOCKER_API_POOL_SIZE = int(os.getenv("DOCKER_API_POOL_SIZE", "4"))
+
+# bulk: un solo listado de contenedores para todo el dashboard; per_project: un `compose ps` por stack.
+_raw_status_scan = os.getenv("PROJECT_STATUS_SCAN", "bulk").strip().lower()
+PROJECT_STATUS_SCAN: Literal["bulk", "per_project"] = (
+    _raw_status_scan if _raw_status_scan in ("bulk", "per_project") else "bulk"
+)
+
+# Cache del listado de proyectos (GET /api/projects): antigüedad máxima por defecto y refresco en segundo plano.
+PROJECTS_CACHE_ENABLED = _env_bool("PROJECTS_CACHE_ENABLED", True)
+PROJECTS_CACHE_TTL = float(os.getenv("PROJECTS_CACHE_TTL", "30"))
+PROJECTS_CACHE_REFRESH_INTERVAL = float(os.getenv("PROJECTS_CACHE_REFRESH_INTERVAL", "15"))
+# Borra los ajustes (excluded, full_stop) de stacks que ya no están en PROJECTS_ROOT (sin directorio o sin compose).
+PROJECTS_PRUNE_MISSING = _env_bool("PROJECTS_PRUNE_MISSING", False)
+# Descubrimiento de stacks con inotify además de la cache por mtime (no detecta cambios remotos en NFS).
+PROJECTS_SCAN_INOTIFY = _env_bool("PROJECTS_SCAN_INOTIFY", False)
+
+# Stacks actualizados a la vez en la actualización global (1 = secuencial, comportamiento clásico).
+GLOBAL_UPDATE_CONCURRENCY = max(1, int(os.getenv("GLOBAL_UPDATE_CONCURRENCY", "1")))
+# Fase previa de `compose pull` en paralelo: cada stack solo queda parado lo que tarda en recrearse.
+GLOBAL_UPDATE_PREFETCH = _env_bool("GLOBAL_UPDATE_PREFETCH", True)
+GLOBAL_PULL_CONCURRENCY = max(1, int(os.getenv("GLOBAL_PULL_CONCURRENCY", "4")))
+# Actualizaciones de stacks en paralelo en la cola central (manuales, programadas y globales).
+UPDATE_QUEUE_CONCURRENCY = max(1, int(os.getenv("UPDATE_QUEUE_CONCURRENCY", "4")))
+# Segundos que una actualización programada o global espera si otro worker tiene el stack
+# bloqueado; pasado ese tiempo se omite (no cuenta como error).
+PROJECT_LOCK_WAIT = max(0.0, float(os.getenv("PROJECT_LOCK_WAIT", "300")))
+# Sin cambios en git ni en las imágenes: no se para ni se recrea el stack.
+UPDATE_SKIP_UNCHANGED = _env_bool("UPDATE_SKIP_UNCHANGED", True)
+
+# Comprobación de imágenes nuevas en el registry (sin pull): intervalo en minutos (0 = desactivada).
+REGISTRY_CHECK_INTERVAL = int(os.getenv("REGISTRY_CHECK_INTERVAL", "360"))
+REGISTRY_CACHE_TTL = float(os.getenv("REGISTRY_CACHE_TTL", "1800"))
+REGISTRY_TIMEOUT = float(os.getenv("REGISTRY_TIMEOUT", "10"))
+# La actualización global omite los stacks sin git que el registry da por al día.
+GLOBAL_UPDATE_ONLY_AVAILABLE = _env_bool("GLOBAL_UPDATE_ONLY_AVAILABLE", False)
+
+# Estado de la actualización global: memory (por proceso) o sqlite (fichero en DATA_DIR compartido
+# por todos los workers). auto = sqlite solo si UVICORN_WORKERS > 1.
+_raw_status_backend = os.getenv("UPDATE_STATUS_BACKEND", "auto").strip().lower()
+UPDATE_STATUS_BACKEND: Literal["auto", "memory", "sqlite"] = (
+    _raw_status_backend if _raw_status_backend in ("auto", "memory", "sqlite") else "auto"
+)
+# Backend sqlite: cada cuánto (s) comprueba el stream SSE si otro worker cambió el estado.
+UPDATE_STATUS_POLL_INTERVAL = float(os.getenv("UPDATE_STATUS_POLL_INTERVAL", "1"))
+
+
+# Varios workers: solo uno (el que tiene DATA_DIR/locks/scheduler.lock) ejecuta el scheduler.
+# Los demás reintentan tomar el lock cada SCHEDULER_LEADER_RETRY s; el líder recarga las tareas
+# cambiadas desde otro worker cada SCHEDULER_SYNC_INTERVAL s.
+SCHEDULER_LEADER_RETRY = float(os.getenv("SCHEDULER_LEADER_RETRY", "15"))
+SCHEDULER_SYNC_INTERVAL = float(os.getenv("SCHEDULER_SYNC_INTERVAL", "30"))
+
+# Jobs del scheduler: sqlalchemy (tabla apscheduler_jobs en la BD; sobreviven a reinicios) o memory.
+_raw_jobstore = os.getenv("SCHEDULER_JOBSTORE", "sqlalchemy").strip().lower()
+SCHEDULER_JOBSTORE: Literal["sqlalchemy", "memory"] = (
+    _raw_jobstore if _raw_jobstore in ("sqlalchemy", "memory") else "sqlalchemy"
+)
+# Valores por defecto de las tareas que no los fijan: retraso máximo (s) con el que aún se
+# ejecuta una ejecución perdida y si varias perdidas se juntan en una sola.
+SCHEDULER_MISFIRE_GRACE_TIME = int(os.getenv("SCHEDULER_MISFIRE_GRACE_TIME", "3600"))
+SCHEDULER_COALESCE = _env_bool("SCHEDULER_COALESCE", True)
+# Al arrancar: run = recuperar las ejecuciones perdidas (dentro del margen); skip = descartarlas.
+_raw_catch_up = os.getenv("SCHEDULER_CATCH_UP", "run").strip().lower()
+SCHEDULER_CATCH_UP: Literal["run", "skip"] = _raw_catch_up if _raw_catch_up in ("run", "skip") else "run"
+# Segundos de retraso a partir de los que una ejecución se registra como tardía.
+SCHEDULER_LATE_THRESHOLD = float(os.getenv("SCHEDULER_LATE_THRESHOLD", "60"))
+# Tareas cron con la misma expresión se reparten en esta ventana (s; 0 = desactivado) para no
+# lanzar todos los pulls a la vez: hash = desfase fijo por tarea; jitter = aleatorio cada vez.
+SCHEDULER_STAGGER_WINDOW = int(os.getenv("SCHEDULER_STAGGER_WINDOW", "600"))
+_raw_stagger_mode = os.getenv("SCHEDULER_STAGGER_MODE", "hash").strip().lower()
+SCHEDULER_STAGGER_MODE: Literal["hash", "jitter"] = (
+    _raw_stagger_mode if _raw_stagger_mode in ("hash", "jitter") else "hash"
+)
+
+
+def uvicorn_workers() -> int:
+    try:
+        return int(os.getenv("UVICORN_WORKERS", "1") or "1")
+    except ValueError:
+        return 1
+
 
 _raw_log_locale = (os.getenv("LOG_LOCALE") or "es").strip().lower()
 LOG_LOCALE: Literal["es", "en"] = (
@@ -77,12 +202,7 @@ if not _SESSION_SECRET_SET:
 
 def validate_startup_security() -> None:
     """Llamar al arranque de la app. Falla si la configuración es insegura para el modo elegido."""
-    workers_raw = os.getenv("UVICORN_WORKERS", "1") or "1"
-    try:
-        workers = int(workers_raw)
-    except ValueError:
-        workers = 1
-    if workers > 1 and not _SESSION_SECRET_SET:
+    if uvicorn_workers() > 1 and not _SESSION_SECRET_SET:
         raise RuntimeError(
             "SESSION_SECRET debe estar definido en el entorno cuando UVICORN_WORKERS > 1."
         )
@@ -1,29 +1,67 @@
 import os
 from collections.abc import Generator
 from contextlib import contextmanager
+from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from server.config import DB_PATH
+from server.config import (
+    DB_MAX_OVERFLOW,
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-if os.getenv("PULLPILOT_TESTING") == "1":
-    engine = create_engine(
-        "sqlite://",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-else:
-    engine = create_engine(
-        f"sqlite:///{DB_PATH}",
-        connect_args={"check_same_thread": False},
-    )
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    # Se ejecuta en cada conexión nueva del pool; journal_mode=WAL persiste en el fichero.
+    cursor = dbapi_connection.cursor()
+    try:
+        # Solo surte efecto en una base nueva (antes de crear tablas); las existentes se
+        # convierten en server/migrations.py.
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(path: Path | None = None) -> Engine:
+    """Engine SQLite con WAL y pool de conexiones reutilizables; `path=None` = en memoria (tests)."""
+    connect_args = {
+        "check_same_thread": False,
+        # Espera del driver ante un lock de escritura (además del PRAGMA busy_timeout).
+        "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if path is None:
+        engine = create_engine("sqlite://", connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            f"sqlite:///{path}",
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+engine = create_sqlite_engine(None if os.getenv("PULLPILOT_TESTING") == "1" else DB_PATH)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -13,10 +13,14 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "log.status_ok": "OK",
         "log.status_error": "ERROR",
         "update.header": "=== ACTUALIZANDO: {name} ===",
+        "update.skipped_other_worker": "Omitido: otro worker esta actualizando este stack.",
+        "update.deduplicated": "Actualizado por otra peticion que ya estaba en cola; su detalle esta en esa entrada del historial.",
         "update.git_snapshot": "Snapshot creado. Commit actual: {commit}",
         "update.git_snapshot_warn": "No se pudo guardar estado Git: {exc}",
         "update.git_pull": "Ejecutando git pull...",
         "update.compose_pull": "Descargando imagenes nuevas...",
+        "update.compose_pull_prefetched": "Imagenes ya descargadas en la fase previa.",
+        "update.up_to_date": "Sin cambios en git ni en las imagenes: el stack ya esta al dia.",
         "update.full_stop_down": "Modo Full Stop: bajando servicios...",
         "update.compose_stop": "Deteniendo contenedores...",
         "update.compose_up": "Recreando contenedores...",
@@ -34,6 +38,8 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "error.error_prefix": "ERROR:",
         "error.db_project_not_found": "Proyecto no encontrado en la base de datos.",
         "error.invalid_compose_stack": "El directorio del proyecto no es un stack compose valido.",
+        "error.project_update_in_progress": "El stack ya se esta actualizando (en este u otro worker).",
+        "error.update_cancelled": "Actualizacion cancelada (servidor detenido o tarea cancelada).",
         "error.path_resolve_failed": "No se pudo resolver la ruta del proyecto: {exc}",
         "error.path_outside_root": "La ruta del proyecto no esta bajo PROJECTS_ROOT (posible dato alterado en BD).",
         "health.timeout": "Timeout: Los servicios no iniciaron correctamente en {timeout}s.",
@@ -54,6 +60,7 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "scheduler.global_summary": "Actualizacion global: {ok} OK, {errors} errores",
         "scheduler.scheduled_ok": "[Programada] {target}: OK",
         "scheduler.scheduled_error": "[Programada] {target}: ERROR",
+        "scheduler.scheduled_skipped": "[Programada] {target}: OMITIDA (la actualiza otro worker)",
         "scheduler.scheduled_exception": "[Programada] {target}: EXCEPCION",
         "scheduler.safe_cleanup_done": "Limpieza de imagenes obsoletas completada (modo seguro).",
         "scheduler.docker_output": "Salida Docker:",
@@ -61,6 +68,9 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "scheduler.cleanup_skipped": "[WARN] LIMPIEZA OMITIDA: Se detectaron {errors} errores durante la actualizacion. No se ejecutara prune para facilitar la depuracion.",
         "scheduler.internal_loop_error": "[ERR] Error interno en el bucle principal: {exc}",
         "scheduler.status_pruning": "Limpiando sistema (prune seguro)...",
+        "scheduler.status_prefetching": "Descargando imagenes ({done}/{total})...",
+        "scheduler.no_updates_available": "Omitido: el registry no tiene imagenes nuevas para este stack.",
+        "history.log_truncated": "[... log recortado: se omitieron {lines} lineas anteriores ...]",
     },
     "en": {
         "log.prefix_ok": "[OK]",
@@ -70,10 +80,14 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "log.status_ok": "OK",
         "log.status_error": "ERROR",
         "update.header": "=== UPDATING: {name} ===",
+        "update.skipped_other_worker": "Skipped: another worker is updating this stack.",
+        "update.deduplicated": "Updated by another request already in the queue; its details are in that history entry.",
         "update.git_snapshot": "Snapshot created. Current commit: {commit}",
         "update.git_snapshot_warn": "Could not save Git state: {exc}",
         "update.git_pull": "Running git pull...",
         "update.compose_pull": "Pulling new images...",
+        "update.compose_pull_prefetched": "Images already pulled during the prefetch phase.",
+        "update.up_to_date": "No git or image changes: stack is already up to date.",
         "update.full_stop_down": "Full Stop mode: bringing services down...",
         "update.compose_stop": "Stopping containers...",
         "update.compose_up": "Recreating containers...",
@@ -91,6 +105,8 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "error.error_prefix": "ERROR:",
         "error.db_project_not_found": "Project not found in the database.",
         "error.invalid_compose_stack": "The project directory is not a valid Compose stack.",
+        "error.project_update_in_progress": "The stack is already being updated (by this or another worker).",
+        "error.update_cancelled": "Update cancelled (server stopping or task cancelled).",
         "error.path_resolve_failed": "Could not resolve project path: {exc}",
         "error.path_outside_root": "Project path is not under PROJECTS_ROOT (possible tampered DB data).",
         "health.timeout": "Timeout: Services did not become healthy within {timeout}s.",
@@ -111,6 +127,7 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "scheduler.global_summary": "Global update: {ok} OK, {errors} errors",
         "scheduler.scheduled_ok": "[Scheduled] {target}: OK",
         "scheduler.scheduled_error": "[Scheduled] {target}: ERROR",
+        "scheduler.scheduled_skipped": "[Scheduled] {target}: SKIPPED (another worker is updating it)",
         "scheduler.scheduled_exception": "[Scheduled] {target}: EXCEPTION",
         "scheduler.safe_cleanup_done": "Obsolete image cleanup completed (safe mode).",
         "scheduler.docker_output": "Docker output:",
@@ -118,6 +135,9 @@ _MESSAGES: dict[str, dict[str, str]] = {
         "scheduler.cleanup_skipped": "[WARN] CLEANUP SKIPPED: {errors} error(s) during update. Prune will not run to aid debugging.",
         "scheduler.internal_loop_error": "[ERR] Internal error in main loop: {exc}",
         "scheduler.status_pruning": "Cleaning up system (safe prune)...",
+        "scheduler.status_prefetching": "Pulling images ({done}/{total})...",
+        "scheduler.no_updates_available": "Skipped: the registry has no newer images for this stack.",
+        "history.log_truncated": "[... log truncated: {lines} earlier line(s) omitted ...]",
     },
 }
 
@@ -0,0 +1,179 @@
+"""Migraciones de esquema para bases de datos existentes.
+
+`Base.metadata.create_all` solo crea tablas que faltan: los índices o columnas nuevos de una
+tabla ya creada se añaden aquí. Cada migración se aplica una vez y queda registrada en
+`schema_migrations`.
+"""
+import json
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from sqlalchemy import Connection, Engine, insert, text
+
+from server.config import HISTORY_COMPRESS, logger
+from server.locale.log_messages import t
+from server.models.db import UpdateResult
+from server.models.types import compress_text, decompress_text
+from server.services.coordination import LOCKS_DIR, FileLock
+
+_BACKFILL_BATCH = 500
+
+
+def _logs_timestamp_index(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_logs_timestamp_id ON logs (timestamp, id)"))
+
+
+def _results_from_details(log_id: int, run_status: str, details: bytes | str) -> list[dict]:
+    try:
+        data = json.loads(decompress_text(details))
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(data, dict):
+        return []
+    projects = [name for name in data if name != "safe_cleanup"]
+    success_marks = [t("update.completed_banner", loc) for loc in ("es", "en")]
+    skipped_marks = [t("scheduler.no_updates_available", loc) for loc in ("es", "en")]
+    rows = []
+    for name in projects:
+        value = data[name]
+        text_log = "\n".join(map(str, value)) if isinstance(value, list) else str(value)
+        if len(projects) == 1:
+            status = run_status
+        elif any(mark in text_log for mark in skipped_marks):
+            status = "SKIPPED"
+        elif any(mark in text_log for mark in success_marks):
+            status = "SUCCESS"
+        else:
+            status = "ERROR"
+        rows.append({"log_id": log_id, "project": name, "status": status})
+    return rows
+
+
+def _backfill_update_results(conn: Connection) -> None:
+    # Ejecuciones anteriores a update_results: sin tiempos ni commits, solo stack y estado.
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            text(
+                "SELECT id, status, details FROM logs WHERE id > :last_id "
+                "AND NOT EXISTS (SELECT 1 FROM update_results r WHERE r.log_id = logs.id) "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": _BACKFILL_BATCH},
+        ).all()
+        if not batch:
+            return
+        rows = [row for log in batch for row in _results_from_details(*log)]
+        if rows:
+            conn.execute(insert(UpdateResult), rows)
+        last_id = batch[-1][0]
+
+
+def _compress_history_details(conn: Connection) -> bool:
+    # Con la compresión desactivada no se marca como aplicada: se hará al activarla.
+    if not HISTORY_COMPRESS:
+        return False
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            text(
+                "SELECT id, details FROM logs WHERE id > :last_id AND typeof(details) = 'text' "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": _BACKFILL_BATCH},
+        ).all()
+        if not batch:
+            return True
+        conn.execute(
+            text("UPDATE logs SET details = :details WHERE id = :id"),
+            [{"id": row_id, "details": compress_text(details)} for row_id, details in batch],
+        )
+        last_id = batch[-1][0]
+
+
+def _incremental_auto_vacuum(conn: Connection) -> None:
+    # auto_vacuum solo cambia en una base existente con un VACUUM completo: se hace una vez,
+    # al arrancar; después el job de retención libera espacio con incremental_vacuum.
+    if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+        return
+    conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.exec_driver_sql("VACUUM")
+
+
+def _add_columns(conn: Connection, table: str, columns: dict[str, str]) -> None:
+    existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def _schedule_options_and_run_timing(conn: Connection) -> None:
+    # Bases nuevas ya tienen las columnas (create_all): solo se añaden las que faltan.
+    _add_columns(
+        conn,
+        "schedules",
+        {
+            "misfire_grace_time": "INTEGER",
+            "coalesce": "BOOLEAN",
+            "max_instances": "INTEGER NOT NULL DEFAULT 1",
+        },
+    )
+    _add_columns(conn, "logs", {"scheduled_for": "DATETIME", "run_timing": "VARCHAR"})
+
+
+class Migration(NamedTuple):
+    id: str
+    apply: Callable[[Connection], bool | None]
+    # False: se ejecuta fuera de transacción (VACUUM no admite otra cosa).
+    transactional: bool = True
+
+
+# Orden de aplicación; los IDs no se renombran una vez publicados. Una migración que devuelve
+# False no queda registrada y se reintenta en el siguiente arranque.
+MIGRATIONS: list[Migration] = [
+    Migration("0001_logs_timestamp_index", _logs_timestamp_index),
+    Migration("0002_backfill_update_results", _backfill_update_results),
+    Migration("0003_compress_history_details", _compress_history_details),
+    Migration("0004_incremental_auto_vacuum", _incremental_auto_vacuum, transactional=False),
+    Migration("0005_schedule_options_and_run_timing", _schedule_options_and_run_timing),
+]
+
+
+@contextmanager
+def _autocommit(engine: Engine) -> Iterator[Connection]:
+    with engine.connect() as conn:
+        yield conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """Aplica las migraciones pendientes (cada una en su transacción); devuelve las aplicadas.
+
+    Cada worker de uvicorn la llama al arrancar: el lock hace que solo uno migre a la vez y
+    los demás, al entrar, leen las ya registradas y no repiten nada."""
+    with FileLock(LOCKS_DIR / "migrations.lock"):
+        return _run_pending_migrations(engine)
+
+
+def _run_pending_migrations(engine: Engine) -> list[str]:
+    applied: list[str] = []
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "id TEXT PRIMARY KEY, applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            )
+        )
+        done = set(conn.execute(text("SELECT id FROM schema_migrations")).scalars())
+    for migration_id, migrate, transactional in MIGRATIONS:
+        if migration_id in done:
+            continue
+        with engine.begin() if transactional else _autocommit(engine) as conn:
+            if migrate(conn) is False:
+                continue
+            conn.execute(
+                text("INSERT INTO schema_migrations (id) VALUES (:id)"), {"id": migration_id}
+            )
+        logger.info("Migración aplicada: %s", migration_id)
+        applied.append(migration_id)
+    return applied
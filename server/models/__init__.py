@@ -1,4 +1,4 @@
-from server.models.db import ProjectSettings, ScheduledTask, UpdateLog
+from server.models.db import ProjectSettings, ScheduledTask, UpdateLog, UpdateResult
 from server.models.schemas import Project, ScheduleInput
 
 __all__ = [
@@ -7,4 +7,5 @@ __all__ = [
     "ScheduleInput",
     "ScheduledTask",
     "UpdateLog",
+    "UpdateResult",
 ]
@@ -1,9 +1,10 @@
 import datetime
 
-from sqlalchemy import Boolean, DateTime, Integer, String, Text
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from server.database import Base
+from server.models.types import CompressedText
 
 
 class ProjectSettings(Base):
@@ -24,10 +25,16 @@ class ScheduledTask(Base):
     task_type: Mapped[str] = mapped_column(String)
     expression: Mapped[str] = mapped_column(String)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # None: valores por defecto (SCHEDULER_MISFIRE_GRACE_TIME, SCHEDULER_COALESCE).
+    misfire_grace_time: Mapped[int | None] = mapped_column(Integer)
+    coalesce: Mapped[bool | None] = mapped_column(Boolean)
+    max_instances: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
 
 
 class UpdateLog(Base):
     __tablename__ = "logs"
+    # Paginación por cursor (timestamp, id); en bases existentes lo crea server/migrations.py.
+    __table_args__ = (Index("ix_logs_timestamp_id", "timestamp", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     timestamp: Mapped[datetime.datetime] = mapped_column(
@@ -36,4 +43,38 @@ class UpdateLog(Base):
     )
     status: Mapped[str] = mapped_column(String)
     summary: Mapped[str] = mapped_column(Text)
-    details: Mapped[str] = mapped_column(Text)
+    # JSON {stack: líneas de log}; en disco comprimido (ver server/models/types.py).
+    details: Mapped[str] = mapped_column(CompressedText)
+    # Solo ejecuciones programadas: hora prevista y on_time, late o coalesced.
+    scheduled_for: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+    run_timing: Mapped[str | None] = mapped_column(String)
+
+    results: Mapped[list["UpdateResult"]] = relationship(
+        back_populates="log",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="UpdateResult.id",
+    )
+
+
+class UpdateResult(Base):
+    """Resultado de un stack dentro de una ejecución (`logs`): consultable por SQL sin
+    parsear el JSON de detalles."""
+
+    __tablename__ = "update_results"
+    __table_args__ = (Index("ix_update_results_project_log", "project", "log_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    log_id: Mapped[int] = mapped_column(ForeignKey("logs.id", ondelete="CASCADE"), index=True)
+    project: Mapped[str] = mapped_column(String)
+    # SUCCESS, ERROR o SKIPPED (no se actualizó: sin imágenes nuevas en el registry).
+    status: Mapped[str] = mapped_column(String)
+    started_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+    duration: Mapped[float | None] = mapped_column(Float)
+    commit_before: Mapped[str | None] = mapped_column(String)
+    commit_after: Mapped[str | None] = mapped_column(String)
+    # JSON: [{"service", "image", "before", "after"}] con los IDs de imagen que cambiaron.
+    image_changes: Mapped[str | None] = mapped_column(Text)
+
+    log: Mapped[UpdateLog] = relationship(back_populates="results")
@@ -1,7 +1,8 @@
+import json
 from datetime import datetime
 from typing import Literal, Self
 
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 CronFrequency = Literal["daily", "weekly", "monthly"]
 TaskType = Literal["cron", "date"]
@@ -14,6 +15,38 @@ class Project(BaseModel):
     containers: int
     excluded: bool
     full_stop: bool
+    # None: sin comprobar todavía o registry inaccesible.
+    updates_available: bool | None = None
+
+
+class ImageUpdateOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    reference: str
+    local_digests: list[str]
+    remote_digest: str | None
+    updates_available: bool | None
+    error: str | None = None
+
+
+class StackUpdatesOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    name: str
+    checked_at: datetime
+    updates_available: bool | None
+    images: list[ImageUpdateOut]
+
+
+class UpdateJobOut(BaseModel):
+    id: str
+    project: str
+    status: Literal["running", "success", "error"]
+    success: bool | None
+    started_at: datetime
+    finished_at: datetime | None
+    history_saved: bool
+    logs: list[str] | None = None
 
 
 class ScheduleInput(BaseModel):
@@ -29,6 +62,10 @@ class ScheduleInput(BaseModel):
     hour: int = Field(default=0, ge=0, le=23)
     minute: int = Field(default=0, ge=0, le=59)
     date_iso: str | None = None
+    # None = SCHEDULER_MISFIRE_GRACE_TIME / SCHEDULER_COALESCE.
+    misfire_grace_time: int | None = Field(default=None, ge=0)
+    coalesce: bool | None = None
+    max_instances: int = Field(default=1, ge=1, le=10)
 
     @model_validator(mode="after")
     def require_date_iso_for_once(self) -> Self:
@@ -46,6 +83,47 @@ class ScheduledTaskOut(BaseModel):
     task_type: str
     expression: str
     active: bool
+    misfire_grace_time: int | None = None
+    coalesce: bool | None = None
+    max_instances: int = 1
+    # Según el scheduler (o calculada del trigger); None si no volverá a ejecutarse.
+    next_run_time: datetime | None = None
+    # Comparte expresión con otras tareas y se escalona (SCHEDULER_STAGGER_WINDOW); el desfase
+    # en segundos es fijo en modo hash y None en modo jitter (aleatorio en cada ejecución).
+    staggered: bool = False
+    stagger_offset: int | None = None
+
+
+class UpdateResultOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    project: str
+    status: str
+    started_at: datetime | None
+    finished_at: datetime | None
+    duration: float | None
+    commit_before: str | None
+    commit_after: str | None
+    image_changes: list[dict] = []
+
+    @field_validator("image_changes", mode="before")
+    @classmethod
+    def parse_image_changes(cls, value: object) -> object:
+        if value is None:
+            return []
+        return json.loads(value) if isinstance(value, str) else value
+
+
+class ProjectUpdateStatsOut(BaseModel):
+    project: str
+    runs: int
+    successes: int
+    failures: int
+    skipped: int
+    # Éxitos / (éxitos + fallos); None si solo hay ejecuciones omitidas.
+    success_rate: float | None
+    avg_duration: float | None
+    last_run: datetime | None
 
 
 class UpdateLogOut(BaseModel):
@@ -55,4 +133,10 @@ class UpdateLogOut(BaseModel):
     timestamp: datetime
     status: str
     summary: str
-    details: str
+    # None en los listados salvo con include_details=true (GET /api/history/{id} siempre lo trae).
+    details: str | None = None
+    # Solo en GET /api/history/{id}.
+    results: list[UpdateResultOut] | None = None
+    # Ejecuciones programadas: hora prevista y puntualidad (on_time / late / coalesced).
+    scheduled_for: datetime | None = None
+    run_timing: str | None = None
@@ -0,0 +1,44 @@
+"""Tipos de columna propios.
+
+`CompressedText` guarda el texto comprimido con zlib precedido de un marcador de formato;
+al leer acepta también filas antiguas en texto plano, así que no hace falta migrar de golpe.
+"""
+import zlib
+
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+from server.config import HISTORY_COMPRESS
+
+# El NUL inicial no puede empezar un texto JSON: distingue BLOB comprimido de texto plano.
+ZLIB_MARKER = b"\x00z1"
+
+
+def compress_text(value: str) -> bytes:
+    return ZLIB_MARKER + zlib.compress(value.encode("utf-8"), 6)
+
+
+def is_compressed(raw: bytes | str | None) -> bool:
+    return isinstance(raw, bytes) and raw.startswith(ZLIB_MARKER)
+
+
+def decompress_text(raw: bytes | str | None) -> str | None:
+    if raw is None or isinstance(raw, str):
+        return raw
+    if raw.startswith(ZLIB_MARKER):
+        return zlib.decompress(raw[len(ZLIB_MARKER) :]).decode("utf-8")
+    return raw.decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        # Vacío se guarda tal cual: así se distingue sin descomprimir (p. ej. 204 en /details).
+        if not value or not HISTORY_COMPRESS:
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
@@ -1,18 +1,20 @@
+import asyncio
 from typing import Callable, List, Literal, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
-from server.config import logger
 from server.locale.http import get_request_locale
 from server.locale.log_messages import t
 from server.database import session_scope
 from server.models.db import ProjectSettings
-from server.models.schemas import Project
-from server.services.projects import scan_projects_logic, update_single_project_logic
-from server.services.update_logs import persist_update_log
+from server.models.schemas import Project, StackUpdatesOut, UpdateJobOut
+from server.services import registry
+from server.services.events import last_event_id, sse_response
+from server.services.project_cache import project_cache
+from server.services.update_jobs import update_jobs
 
 
 router = APIRouter(prefix="/api", tags=["projects"])
@@ -43,41 +45,89 @@ def _toggle_project_field(name: str, field: _ToggleField, db: Session) -> dict:
 
 
 @router.get("/projects", response_model=List[Project])
-async def get_projects():
-    return await _run_in_session(scan_projects_logic)
+async def get_projects(
+    response: Response,
+    max_age: float | None = Query(
+        None,
+        ge=0,
+        description="Antigüedad máxima aceptada de la instantánea (s); 0 fuerza reescaneo.",
+    ),
+):
+    snapshot = await run_in_threadpool(project_cache.get, max_age)
+    response.headers["X-Projects-Refreshed-At"] = snapshot.refreshed_at.isoformat()
+    response.headers["X-Projects-Snapshot-Age"] = f"{snapshot.age:.3f}"
+    availability = registry.get_update_availability()
+    return [
+        {**p, "updates_available": _availability_of(availability, p["name"])}
+        for p in snapshot.projects
+    ]
+
+
+def _availability_of(checks: dict[str, registry.StackUpdateCheck], name: str) -> bool | None:
+    check = checks.get(name)
+    return check.updates_available if check is not None else None
+
+
+@router.get("/projects/updates", response_model=List[StackUpdatesOut])
+def get_project_updates():
+    """Último resultado de la comprobación de imágenes nuevas en el registry."""
+    return list(registry.get_update_availability().values())
+
+
+@router.post("/projects/updates/check", response_model=List[StackUpdatesOut])
+def check_project_updates():
+    """Resuelve ahora los digests remotos (sin descargar capas) de todos los stacks."""
+    return registry.refresh_update_availability()
 
 
 @router.post("/projects/{name}/update")
 async def update_project(name: str, locale: str = Depends(get_request_locale)):
-    def work(db: Session):
-        success, logs = update_single_project_logic(name, db, locale=locale)
-
-        status_word = (
-            t("log.status_ok", locale) if success else t("log.status_error", locale)
+    """Actualización bloqueante (compatibilidad): lanza el job y espera a que termine."""
+    job = update_jobs.start(name, locale=locale)
+    # shield: si el cliente se desconecta, el job sigue hasta el final.
+    await asyncio.shield(job.task)
+
+    if not job.history_saved:
+        raise HTTPException(
+            status_code=500, detail=t("http.history_save_failed", locale)
+        )
+    if not job.success:
+        raise HTTPException(
+            status_code=500,
+            detail=t("http.update_failed", locale),
         )
-        summary = t("summary.project", locale, name=name, status=status_word)
-        try:
-            persist_update_log(
-                db,
-                status="SUCCESS" if success else "ERROR",
-                summary=summary,
-                details={name: logs},
-            )
-        except SQLAlchemyError:
-            raise HTTPException(
-                status_code=500, detail=t("http.history_save_failed", locale)
-            ) from None
-
-        if not success:
-            logger.error("Actualización fallida para %s:\n%s", name, "\n".join(logs))
-            raise HTTPException(
-                status_code=500,
-                detail=t("http.update_failed", locale),
-            )
-
-        return {"success": success, "logs": logs}
 
-    return await _run_in_session(work)
+    return {"success": job.success, "logs": job.logs}
+
+
+@router.post("/projects/{name}/update/start", status_code=202, response_model=UpdateJobOut)
+async def start_project_update(name: str, locale: str = Depends(get_request_locale)):
+    """Lanza la actualización en segundo plano; el log se sigue en /update-jobs/{id}/events."""
+    return update_jobs.start(name, locale=locale).to_dict()
+
+
+@router.get("/update-jobs", response_model=List[UpdateJobOut])
+def list_update_jobs():
+    return [job.to_dict() for job in update_jobs.list()]
+
+
+def _get_job(job_id: str):
+    job = update_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+
+@router.get("/update-jobs/{job_id}", response_model=UpdateJobOut)
+def get_update_job(job_id: str):
+    return _get_job(job_id).to_dict(include_logs=True)
+
+
+@router.get("/update-jobs/{job_id}/events")
+async def stream_update_job(job_id: str, request: Request):
+    """SSE: eventos `status`, `log` (una línea) y `done` (resultado final)."""
+    job = _get_job(job_id)
+    return sse_response(job.events.subscribe(last_event_id(request)))
 
 
 @router.post("/projects/{name}/toggle_exclude")
@@ -5,7 +5,12 @@ from sqlalchemy.orm import Session
 from server.database import get_db
 from server.models.db import ScheduledTask
 from server.models.schemas import ScheduleInput, ScheduledTaskOut
-from server.services.scheduler import build_trigger, refresh_scheduler_jobs
+from server.services.scheduler import (
+    build_trigger,
+    request_scheduler_refresh,
+    schedule_next_run_time,
+)
+from server.services.stagger import stagger_offsets
 
 
 router = APIRouter(prefix="/api", tags=["schedules"])
@@ -18,9 +23,19 @@ def _normalize_date_expression(raw: str) -> str:
     return s
 
 
+def _task_out(task: ScheduledTask, offsets: dict[int, int | None]) -> ScheduledTaskOut:
+    out = ScheduledTaskOut.model_validate(task)
+    out.next_run_time = schedule_next_run_time(task, offsets)
+    out.staggered = task.id in offsets
+    out.stagger_offset = offsets.get(task.id)
+    return out
+
+
 @router.get("/schedules", response_model=list[ScheduledTaskOut])
 def get_schedules(db: Session = Depends(get_db)):
-    return db.query(ScheduledTask).all()
+    tasks = db.query(ScheduledTask).all()
+    offsets = stagger_offsets(tasks)
+    return [_task_out(task, offsets) for task in tasks]
 
 
 @router.post("/schedules", response_model=ScheduledTaskOut)
@@ -46,6 +61,9 @@ def create_schedule(data: ScheduleInput, db: Session = Depends(get_db)):
         task_type=data.task_type,
         expression=expression,
         active=True,
+        misfire_grace_time=data.misfire_grace_time,
+        coalesce=data.coalesce,
+        max_instances=data.max_instances,
     )
     db.add(new_task)
     try:
@@ -55,8 +73,9 @@ def create_schedule(data: ScheduleInput, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail="Error al guardar la programacion") from None
 
-    refresh_scheduler_jobs()
-    return new_task
+    request_scheduler_refresh()
+    active = db.query(ScheduledTask).filter(ScheduledTask.active.is_(True)).all()
+    return _task_out(new_task, stagger_offsets(active))
 
 
 @router.delete("/schedules/{schedule_id}")
@@ -70,5 +89,5 @@ def delete_schedule(schedule_id: int, db: Session = Depends(get_db)):
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Error al eliminar la programacion") from None
-    refresh_scheduler_jobs()
+    request_scheduler_refresh()
     return {"status": "ok"}
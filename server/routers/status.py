@@ -1,12 +1,25 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
-from sqlalchemy.orm import Session
+import datetime
+import zlib
+from collections.abc import Iterator
+from typing import Literal
 
-from server.database import get_db
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Text, select, type_coerce
+from sqlalchemy.orm import Session, defer
+
+from server.database import engine, get_db
 from server.locale.http import get_request_locale
 from server.locale.log_messages import t
 from server.models.db import UpdateLog
-from server.models.schemas import UpdateLogOut
-from server.services.scheduler import global_update_job, snapshot_global_update_status
+from server.models.schemas import ProjectUpdateStatsOut, UpdateLogOut, UpdateResultOut
+from server.models.types import ZLIB_MARKER, is_compressed
+from server.services.events import last_event_id, sse_response
+from server.services.history import InvalidCursorError, project_stats, query_history
+from server.services.retention import database_size, enforce_history_retention
+from server.services.scheduler import global_update_job
+from server.services.update_queue import update_queue
+from server.services.update_status import update_status
 
 
 router = APIRouter(prefix="/api", tags=["status"])
@@ -22,11 +35,138 @@ def trigger_update_all(
 
 
 @router.get("/update-status")
-def get_update_status():
-    return snapshot_global_update_status()
+def get_update_status(request: Request, response: Response):
+    """ETag = versión del estado: si no cambió, `If-None-Match` recibe un 304 sin cuerpo."""
+    etag = update_status.etag()
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    snapshot = update_status.snapshot()
+    response.headers["ETag"] = update_status.etag(snapshot["version"])
+    response.headers["Cache-Control"] = "no-cache"
+    return snapshot
+
+
+@router.get("/update-status/stream")
+async def stream_update_status(request: Request):
+    """SSE: un evento `status` por cambio; al conectar se envía el estado actual si el
+    cliente no lo tiene ya (`Last-Event-ID` = última versión recibida)."""
+    return sse_response(update_status.subscribe(last_event_id(request)))
+
+
+@router.get("/update-queue")
+def get_update_queue():
+    """Cola de actualizaciones de este worker: en curso, pendientes (por orden de turno) y
+    esperas medias/máximas en segundos."""
+    return update_queue.snapshot()
 
 
 @router.get("/history", response_model=list[UpdateLogOut])
-def get_history(db: Session = Depends(get_db)):
-    logs = db.query(UpdateLog).order_by(UpdateLog.timestamp.desc()).limit(20).all()
-    return logs
+def get_history(
+    response: Response,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: str | None = None,
+    status: Literal["SUCCESS", "ERROR"] | None = None,
+    project: str | None = Query(None, max_length=256),
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    include_details: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Más reciente primero. Si hay más filas, `X-Next-Cursor` trae el cursor de la siguiente página."""
+    try:
+        rows, next_cursor = query_history(
+            db,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            project=project,
+            since=since,
+            until=until,
+            include_details=include_details,
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Cursor no válido") from None
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        UpdateLogOut(
+            id=row.id,
+            timestamp=row.timestamp,
+            status=row.status,
+            summary=row.summary,
+            details=row.details if include_details else None,
+            scheduled_for=row.scheduled_for,
+            run_timing=row.run_timing,
+        )
+        for row in rows
+    ]
+
+
+@router.get("/history/projects", response_model=list[ProjectUpdateStatsOut])
+def get_history_project_stats(
+    since: datetime.datetime | None = None, db: Session = Depends(get_db)
+):
+    return project_stats(db, since=since)
+
+
+@router.post("/history/retention")
+def run_history_retention():
+    """Aplica ahora la política de retención (la misma que el job periódico)."""
+    result = enforce_history_retention()
+    return {
+        "deleted_runs": result.deleted_runs,
+        "reclaimed_bytes": result.reclaimed_bytes,
+        "database_bytes": database_size(engine),
+    }
+
+
+@router.get("/history/{log_id}", response_model=UpdateLogOut)
+def get_history_entry(
+    log_id: int, include_details: bool = False, db: Session = Depends(get_db)
+):
+    options = [] if include_details else [defer(UpdateLog.details, raiseload=True)]
+    row = db.get(UpdateLog, log_id, options=options)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Registro no encontrado")
+    return UpdateLogOut(
+        id=row.id,
+        timestamp=row.timestamp,
+        status=row.status,
+        summary=row.summary,
+        details=row.details if include_details else None,
+        results=[UpdateResultOut.model_validate(r) for r in row.results],
+        scheduled_for=row.scheduled_for,
+        run_timing=row.run_timing,
+    )
+
+
+@router.get("/history/{log_id}/details")
+def get_history_details(log_id: int, request: Request, db: Session = Depends(get_db)):
+    """JSON {stack: log} (204 si el registro no tiene detalles). Si el cliente acepta
+    `deflate`, se envía el zlib guardado tal cual; si no, se descomprime por bloques."""
+    row = db.execute(
+        select(type_coerce(UpdateLog.details, Text)).where(UpdateLog.id == log_id)
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Registro no encontrado")
+    raw = row[0]
+    if not raw:
+        # El registro existe pero no guardó detalles.
+        return Response(status_code=204)
+    if not is_compressed(raw):
+        return Response(content=raw, media_type="application/json")
+    body = raw[len(ZLIB_MARKER) :]
+    if "deflate" in request.headers.get("accept-encoding", ""):
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"Content-Encoding": "deflate", "Vary": "Accept-Encoding"},
+        )
+    return StreamingResponse(_inflate_chunks(body), media_type="application/json")
+
+
+def _inflate_chunks(body: bytes, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    inflater = zlib.decompressobj()
+    for start in range(0, len(body), chunk_size):
+        yield inflater.decompress(body[start : start + chunk_size])
+    yield inflater.flush()
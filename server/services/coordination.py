@@ -0,0 +1,128 @@
+"""Coordinación entre workers de uvicorn con locks `flock` en DATA_DIR/locks.
+
+`flock` va por descripción de fichero abierto: dos aperturas del mismo fichero se excluyen
+también entre hilos de un mismo proceso, y el kernel suelta el lock si el proceso muere, así
+que un worker caído nunca deja un stack ni el scheduler bloqueados.
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from urllib.parse import quote
+
+from server.config import DATA_DIR, logger
+
+LOCKS_DIR = DATA_DIR / "locks"
+
+
+class FileLock:
+    """Lock exclusivo entre procesos; misma interfaz que `threading.Lock` (acquire/release)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        # Una instancia la tiene como mucho un hilo a la vez (el descriptor es de la instancia).
+        self._guard = threading.Lock()
+        self._fd: int | None = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._guard.acquire(blocking):
+            return False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        except OSError:
+            self._guard.release()
+            raise
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            self._guard.release()
+            return False
+        except BaseException:
+            os.close(fd)
+            self._guard.release()
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            raise RuntimeError(f"{self.path} no está adquirido")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+            self._guard.release()
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.release()
+
+
+def project_lock(name: str) -> FileLock:
+    """Lock de actualización de un stack, compartido por la API, el scheduler y otros workers."""
+    return FileLock(LOCKS_DIR / f"project-{quote(name, safe='')}.lock")
+
+
+class Leadership:
+    """Elección de líder por lock de fichero: el primer worker que lo toma ejecuta
+    `on_elected`; los demás reintentan cada `retry` segundos por si el líder muere."""
+
+    def __init__(self, lock: FileLock, *, retry: float, on_elected: Callable[[], None]) -> None:
+        self._lock = lock
+        self._retry = retry
+        self._on_elected = on_elected
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock.locked
+
+    def _try_lead(self) -> bool:
+        if not self._lock.acquire(blocking=False):
+            return False
+        logger.info("Worker %s elegido para ejecutar el scheduler.", os.getpid())
+        try:
+            self._on_elected()
+        except Exception:
+            self._lock.release()
+            raise
+        return True
+
+    def _wait_for_leadership(self) -> None:
+        while not self._stop.wait(self._retry):
+            if self._try_lead():
+                return
+
+    def start(self) -> None:
+        if self.is_leader or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        if self._try_lead():
+            return
+        logger.info("Otro worker ejecuta el scheduler; %s queda en espera.", os.getpid())
+        self._thread = threading.Thread(
+            target=self._wait_for_leadership, name="pullpilot-leader", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._retry + 1)
+            self._thread = None
+        if self.is_leader:
+            self._lock.release()
@@ -1,8 +1,11 @@
+import asyncio
+import codecs
 import shlex
 import subprocess
-from collections.abc import Sequence
+from collections import deque
+from collections.abc import Callable, Sequence
 
-from server.config import COMMAND_TIMEOUT, logger
+from server.config import COMMAND_OUTPUT_TAIL_LINES, COMMAND_TIMEOUT, logger
 from server.locale.log_messages import t
 
 
@@ -27,6 +30,13 @@ def get_docker_compose_cmd() -> str:
 COMPOSE_CMD = get_docker_compose_cmd()
 
 
+def _split_command(cmd: str | Sequence[str]) -> tuple[list[str], str]:
+    if isinstance(cmd, str):
+        return shlex.split(cmd), cmd
+    cmd_args = list(cmd)
+    return cmd_args, " ".join(cmd_args)
+
+
 def run_command(
     cmd: str | Sequence[str],
     cwd: str | None = None,
@@ -34,12 +44,7 @@ def run_command(
     log_exec: bool = True,
     locale: str = "es",
 ) -> str:
-    if isinstance(cmd, str):
-        cmd_args = shlex.split(cmd)
-        cmd_display = cmd
-    else:
-        cmd_args = list(cmd)
-        cmd_display = " ".join(cmd_args)
+    cmd_args, cmd_display = _split_command(cmd)
 
     try:
         if log_exec:
@@ -72,3 +77,109 @@ def run_command(
         )
         logger.error(error_msg)
         raise RuntimeError(error_msg) from exc
+
+
+_READ_CHUNK = 64 * 1024
+
+
+async def _pump_lines(
+    stream: asyncio.StreamReader,
+    tail: deque[str],
+    on_line: Callable[[str], None] | None,
+) -> None:
+    """Lee por bloques y parte en líneas (también en `\r`, que usan las barras de progreso)."""
+    pending = ""
+    # Incremental: un carácter multibyte (✔, ⠿...) puede quedar partido entre dos lecturas.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            pending += decoder.decode(b"", final=True)
+            break
+        pending += decoder.decode(chunk).replace("\r\n", "\n").replace("\r", "\n")
+        *lines, pending = pending.split("\n")
+        # Una "línea" sin saltos no puede crecer sin límite.
+        if len(pending) > _READ_CHUNK:
+            lines.append(pending)
+            pending = ""
+        for line in lines:
+            tail.append(line)
+            if on_line is not None:
+                on_line(line)
+    if pending:
+        tail.append(pending)
+        if on_line is not None:
+            on_line(pending)
+
+
+async def _terminate(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+
+async def run_command_async(
+    cmd: str | Sequence[str],
+    cwd: str | None = None,
+    *,
+    log_exec: bool = True,
+    locale: str = "es",
+    timeout: float | None = COMMAND_TIMEOUT,
+    on_line: Callable[[str], None] | None = None,
+    tail_lines: int = COMMAND_OUTPUT_TAIL_LINES,
+) -> str:
+    """Equivalente asíncrono de `run_command` que no ocupa un hilo mientras el comando corre.
+
+    Cada línea de stdout/stderr se pasa a `on_line` según llega; en memoria solo quedan las
+    últimas `tail_lines` de cada flujo, así que el valor devuelto es la cola de stdout. Si la
+    corrutina se cancela o vence `timeout`, el proceso se mata antes de propagar el error.
+    """
+    cmd_args, cmd_display = _split_command(cmd)
+    if log_exec:
+        logger.info("Exec: %s en %s", cmd_display, cwd)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd_args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout_tail: deque[str] = deque(maxlen=tail_lines)
+    stderr_tail: deque[str] = deque(maxlen=tail_lines)
+    assert proc.stdout is not None and proc.stderr is not None
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(
+                _pump_lines(proc.stdout, stdout_tail, on_line),
+                _pump_lines(proc.stderr, stderr_tail, on_line),
+                proc.wait(),
+            ),
+            timeout,
+        )
+    except TimeoutError as exc:
+        await _terminate(proc)
+        stderr = "\n".join(stderr_tail)
+        error_msg = (
+            f"{t('docker.timeout_command', locale, cmd=cmd_display)}\n"
+            f"{t('docker.timeout_configured', locale, seconds=timeout)}\n"
+            f"{t('docker.stderr_label', locale)} {stderr}"
+        )
+        logger.error(error_msg)
+        raise RuntimeError(error_msg) from exc
+    except BaseException:
+        # Cancelación (cliente desconectado, apagado...): no dejar el proceso huérfano.
+        await asyncio.shield(_terminate(proc))
+        raise
+
+    if proc.returncode != 0:
+        stderr = "\n".join(stderr_tail)
+        error_msg = (
+            f"{t('docker.error_command', locale, cmd=cmd_display)}\n"
+            f"{t('docker.stderr_label', locale)} {stderr}"
+        )
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
+    return "\n".join(stdout_tail).strip()
@@ -0,0 +1,318 @@
+"""Cliente mínimo de la Docker Engine API sobre el socket unix.
+
+Evita hacer fork de `docker` / `docker compose` para consultas de estado: las conexiones
+HTTP/1.1 se reutilizan (keep-alive) desde un pool pequeño y seguro entre hilos.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+import threading
+import urllib.parse
+from collections.abc import Iterable, Iterator, Mapping
+from queue import Empty, Full, LifoQueue
+from typing import Any
+
+from server.config import (
+    COMMAND_TIMEOUT,
+    DOCKER_API_ENABLED,
+    DOCKER_API_POOL_SIZE,
+    DOCKER_SOCKET,
+    logger,
+)
+
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+COMPOSE_WORKING_DIR_LABEL = "com.docker.compose.project.working_dir"
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+
+
+class DockerAPIError(RuntimeError):
+    """Respuesta no 2xx del daemon o socket inaccesible."""
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerEventStream:
+    """Flujo de `GET /events` (una línea JSON por evento) sobre una conexión dedicada.
+
+    `close()` puede llamarse desde otro hilo para cortar una lectura bloqueada.
+    """
+
+    def __init__(self, conn: _UnixHTTPConnection, resp: http.client.HTTPResponse) -> None:
+        self._conn = conn
+        self._resp = resp
+        self._closed = False
+        self._reading = False
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        self._reading = True
+        try:
+            while not self._closed:
+                line = self._resp.readline()
+                if not line:
+                    return
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict):
+                    yield event
+        except (OSError, http.client.HTTPException, ValueError) as exc:
+            if self._closed:
+                return
+            raise DockerAPIError(f"Flujo de eventos interrumpido: {exc}") from exc
+        finally:
+            self._reading = False
+            self._conn.close()
+
+    def close(self) -> None:
+        """Corta el flujo; el hilo lector libera la conexión al salir de la iteración."""
+        self._closed = True
+        sock = self._conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if not self._reading:
+            self._conn.close()
+
+    def __enter__(self) -> DockerEventStream:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+
+class DockerEngineClient:
+    """Cliente HTTP con pool de conexiones keep-alive hacia `/var/run/docker.sock`."""
+
+    def __init__(
+        self,
+        socket_path: str,
+        *,
+        pool_size: int = 4,
+        timeout: float = COMMAND_TIMEOUT,
+    ) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: LifoQueue[_UnixHTTPConnection] = LifoQueue(maxsize=max(1, pool_size))
+
+    def _acquire(self) -> _UnixHTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except Empty:
+            return _UnixHTTPConnection(self.socket_path, self.timeout)
+
+    def _release(self, conn: _UnixHTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except Full:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                return
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        params: Mapping[str, str] | None = None,
+    ) -> tuple[int, bytes]:
+        url = path
+        if params:
+            url = f"{path}?{urllib.parse.urlencode(params)}"
+
+        # Un segundo intento cubre conexiones keep-alive que el daemon cerró mientras
+        # estaban en el pool.
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request(method, url, headers={"Host": "docker"})
+                resp = conn.getresponse()
+                body = resp.read()
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                if attempt == 0 and not isinstance(exc, (FileNotFoundError, ConnectionRefusedError)):
+                    continue
+                raise DockerAPIError(
+                    f"Docker API no disponible en {self.socket_path}: {exc}"
+                ) from exc
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return resp.status, body
+        raise DockerAPIError(f"Docker API no disponible en {self.socket_path}")
+
+    def _get_json(self, path: str, params: Mapping[str, str] | None = None) -> Any:
+        status, body = self._request("GET", path, params)
+        if status >= 400:
+            raise DockerAPIError(_error_message(body, status), status=status)
+        try:
+            return json.loads(body or b"null")
+        except ValueError as exc:
+            raise DockerAPIError(f"Respuesta JSON invalida de {path}: {exc}") from exc
+
+    def ping(self) -> bool:
+        try:
+            status, body = self._request("GET", "/_ping")
+        except DockerAPIError:
+            return False
+        return status == 200 and body.strip() == b"OK"
+
+    def list_containers(
+        self,
+        *,
+        labels: Mapping[str, str | None] | None = None,
+        all: bool = False,
+    ) -> list[dict[str, Any]]:
+        """`GET /containers/json`. Las etiquetas con valor None filtran solo por clave."""
+        params: dict[str, str] = {}
+        if all:
+            params["all"] = "1"
+        if labels:
+            label_filters = [k if v is None else f"{k}={v}" for k, v in labels.items()]
+            params["filters"] = json.dumps({"label": label_filters})
+        data = self._get_json("/containers/json", params)
+        return data if isinstance(data, list) else []
+
+    def list_compose_containers(
+        self,
+        *,
+        project: str | None = None,
+        all: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Contenedores creados por compose (todos o los de un proyecto concreto)."""
+        return self.list_containers(labels={COMPOSE_PROJECT_LABEL: project}, all=all)
+
+    def events(
+        self,
+        *,
+        filters: Mapping[str, list[str]] | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        timeout: float | None = None,
+    ) -> DockerEventStream:
+        """Abre `GET /events`; sin `until` el flujo queda abierto hasta `close()`."""
+        params: dict[str, str] = {}
+        if filters:
+            params["filters"] = json.dumps(dict(filters))
+        if since is not None:
+            params["since"] = f"{since:.3f}"
+        if until is not None:
+            params["until"] = f"{until:.3f}"
+        conn = _UnixHTTPConnection(self.socket_path, timeout)
+        try:
+            conn.request(
+                "GET",
+                f"/events?{urllib.parse.urlencode(params)}",
+                headers={"Host": "docker"},
+            )
+            resp = conn.getresponse()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise DockerAPIError(
+                f"Docker API no disponible en {self.socket_path}: {exc}"
+            ) from exc
+        if resp.status >= 400:
+            body = resp.read()
+            conn.close()
+            raise DockerAPIError(_error_message(body, resp.status), status=resp.status)
+        return DockerEventStream(conn, resp)
+
+    def inspect_container(self, container_id: str) -> dict[str, Any]:
+        quoted = urllib.parse.quote(container_id, safe="")
+        data = self._get_json(f"/containers/{quoted}/json")
+        return data if isinstance(data, dict) else {}
+
+    def inspect_image(self, reference: str) -> dict[str, Any]:
+        """`GET /images/{name}/json` (acepta nombre:tag, digest o ID)."""
+        quoted = urllib.parse.quote(reference, safe="")
+        data = self._get_json(f"/images/{quoted}/json")
+        return data if isinstance(data, dict) else {}
+
+    def inspect_containers(self, container_ids: Iterable[str]) -> list[dict[str, Any]]:
+        """Inspect de varios contenedores sobre las mismas conexiones del pool.
+
+        Los contenedores que desaparecen entre el listado y el inspect (404) se omiten,
+        igual que `docker inspect` con IDs ya borrados.
+        """
+        results: list[dict[str, Any]] = []
+        for container_id in container_ids:
+            try:
+                results.append(self.inspect_container(container_id))
+            except DockerAPIError as exc:
+                if exc.status == 404:
+                    continue
+                raise
+        return results
+
+
+def _error_message(body: bytes, status: int) -> str:
+    try:
+        message = json.loads(body).get("message")
+    except (ValueError, AttributeError):
+        message = None
+    return f"Docker API HTTP {status}: {message or body[:200]!r}"
+
+
+def container_workdir(container: Mapping[str, Any]) -> str | None:
+    """working_dir de compose de un contenedor (`/containers/json`, inspect o evento)."""
+    labels = container.get("Labels")
+    if labels is None:
+        labels = (container.get("Config") or {}).get("Labels")
+    if labels is None:
+        labels = (container.get("Actor") or {}).get("Attributes")
+    if not isinstance(labels, Mapping):
+        return None
+    raw = labels.get(COMPOSE_WORKING_DIR_LABEL)
+    return os.path.normpath(raw) if raw else None
+
+
+_client: DockerEngineClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_docker_client() -> DockerEngineClient | None:
+    """Cliente compartido, o None si la API está desactivada o el socket no existe.
+
+    Con None los llamantes usan el CLI (`run_command`) como respaldo.
+    """
+    global _client
+    if not DOCKER_API_ENABLED or not os.path.exists(DOCKER_SOCKET):
+        return None
+    with _client_lock:
+        if _client is None or _client.socket_path != DOCKER_SOCKET:
+            if _client is not None:
+                _client.close()
+            _client = DockerEngineClient(DOCKER_SOCKET, pool_size=DOCKER_API_POOL_SIZE)
+            logger.info("Usando Docker Engine API en %s", DOCKER_SOCKET)
+        return _client
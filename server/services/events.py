@@ -0,0 +1,149 @@
+"""Difusión de eventos a clientes Server-Sent Events.
+
+`Broadcaster` acepta publicaciones desde cualquier hilo (jobs del scheduler, corrutinas del
+event loop) y las reparte a suscriptores asyncio. Guarda un historial acotado para que un
+cliente que reconecta con `Last-Event-ID` no pierda lo emitido mientras estaba fuera.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import threading
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+SSE_HEARTBEAT_SECONDS = 15.0
+
+
+@dataclass(frozen=True)
+class ServerEvent:
+    id: int
+    event: str
+    data: Any
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: {self.event}\ndata: {payload}\n\n"
+
+
+_Subscriber = tuple[asyncio.AbstractEventLoop, asyncio.Queue]
+
+
+class Broadcaster:
+    def __init__(self, *, history: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self._history: deque[ServerEvent] = deque(maxlen=history)
+        self._next_id = 1
+        self._subscribers: set[_Subscriber] = set()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def _deliver(self, subscribers: list[_Subscriber], item: ServerEvent | None) -> None:
+        for loop, q in subscribers:
+            try:
+                loop.call_soon_threadsafe(q.put_nowait, item)
+            except RuntimeError:
+                # Event loop ya cerrado: el suscriptor desaparece con él.
+                with self._lock:
+                    self._subscribers.discard((loop, q))
+
+    def publish(self, event: str, data: Any, *, event_id: int | None = None) -> ServerEvent:
+        """`event_id` permite usar un contador propio (p. ej. una versión); debe ser creciente."""
+        with self._lock:
+            item_id = self._next_id if event_id is None else event_id
+            item = ServerEvent(item_id, event, data)
+            self._next_id = item_id + 1
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+        self._deliver(subscribers, item)
+        return item
+
+    def close(self) -> None:
+        """Fin del flujo: los suscriptores terminan tras recibir lo pendiente."""
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+        self._deliver(subscribers, None)
+
+    async def subscribe(
+        self, last_event_id: int | None = None
+    ) -> AsyncGenerator[ServerEvent, None]:
+        """Repite el historial posterior a `last_event_id` y sigue con los eventos en vivo."""
+        entry: _Subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            backlog = [e for e in self._history if last_event_id is None or e.id > last_event_id]
+            closed = self._closed
+            if not closed:
+                self._subscribers.add(entry)
+        try:
+            for item in backlog:
+                yield item
+            if closed:
+                return
+            while True:
+                item = await entry[1].get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            with self._lock:
+                self._subscribers.discard(entry)
+
+
+def last_event_id(request: Request) -> int | None:
+    """`Last-Event-ID` (reconexión automática de EventSource) o `?last_event_id=`."""
+    raw = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
+async def _with_heartbeat(
+    events: AsyncGenerator[ServerEvent, None], heartbeat: float
+) -> AsyncIterator[str]:
+    # Comentarios periódicos: mantienen viva la conexión a través de proxies.
+    pending: asyncio.Future | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(events))
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat)
+            if not done:
+                yield ": ping\n\n"
+                continue
+            pending = None
+            try:
+                item = done.pop().result()
+            except StopAsyncIteration:
+                return
+            yield item.encode()
+    finally:
+        if pending is not None:
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        await events.aclose()
+
+
+def sse_response(
+    events: AsyncGenerator[ServerEvent, None], *, heartbeat: float = SSE_HEARTBEAT_SECONDS
+) -> StreamingResponse:
+    return StreamingResponse(
+        _with_heartbeat(events, heartbeat),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,75 @@
+"""Clasificación del estado de salud de un stack a partir de `docker inspect`.
+
+Funciones puras: reciben el array JSON del inspect (CLI o Engine API) y no hablan con Docker.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from server.locale.log_messages import t
+
+FailureReason = Literal["restarting", "exited", "unhealthy"]
+
+
+@dataclass(frozen=True)
+class ContainerHealthFailure:
+    cid: str
+    reason: FailureReason
+    exit_code: int | None = None
+
+    def message(self, locale: str) -> str:
+        if self.reason == "restarting":
+            return t("health.restarting", locale, cid=self.cid)
+        if self.reason == "exited":
+            return t("health.exited", locale, cid=self.cid, code=self.exit_code)
+        return t("health.unhealthy", locale, cid=self.cid)
+
+
+@dataclass(frozen=True)
+class StackHealth:
+    healthy: list[str] = field(default_factory=list)
+    starting: list[str] = field(default_factory=list)
+    failed: list[ContainerHealthFailure] = field(default_factory=list)
+
+    @property
+    def converged(self) -> bool:
+        """Todos sanos (y al menos uno): el despliegue se da por bueno."""
+        return bool(self.healthy) and not self.starting and not self.failed
+
+
+def classify_container(data: Mapping[str, Any]) -> ContainerHealthFailure | Literal["healthy", "starting"]:
+    state = data.get("State") or {}
+    status = state.get("Status")
+    health = (state.get("Health") or {}).get("Status")
+    cid = str(data.get("Id", ""))[:12]
+
+    if status == "restarting":
+        return ContainerHealthFailure(cid, "restarting")
+    if status in {"exited", "dead"}:
+        exit_code = state.get("ExitCode")
+        if exit_code != 0:
+            return ContainerHealthFailure(cid, "exited", exit_code)
+    if health == "unhealthy":
+        return ContainerHealthFailure(cid, "unhealthy")
+    if health == "starting":
+        return "starting"
+    # Sin healthcheck solo cuenta como sano si está en ejecución.
+    if health is None and status != "running":
+        return "starting"
+    return "healthy"
+
+
+def classify_stack_health(inspected: Iterable[Mapping[str, Any]]) -> StackHealth:
+    """Reparte los contenedores de un inspect en sanos, arrancando y fallidos."""
+    result = StackHealth()
+    for data in inspected:
+        verdict = classify_container(data)
+        if isinstance(verdict, ContainerHealthFailure):
+            result.failed.append(verdict)
+        elif verdict == "starting":
+            result.starting.append(str(data.get("Id", ""))[:12])
+        else:
+            result.healthy.append(str(data.get("Id", ""))[:12])
+    return result
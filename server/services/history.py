@@ -0,0 +1,112 @@
+"""Consultas del historial de actualizaciones con paginación por cursor (keyset).
+
+El cursor codifica `(timestamp, id)` de la última fila devuelta: la siguiente página se lee
+con el índice `ix_logs_timestamp_id` sin recorrer ni saltar filas anteriores (sin OFFSET).
+"""
+from __future__ import annotations
+
+import base64
+import datetime
+import json
+
+from sqlalchemy import and_, case, exists, func, or_, select
+from sqlalchemy.orm import Session, defer
+
+from server.models.db import UpdateLog, UpdateResult
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _as_utc_naive(value: datetime.datetime) -> datetime.datetime:
+    # SQLite guarda el timestamp UTC sin zona: las comparaciones deben usar el mismo formato.
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.UTC).replace(tzinfo=None)
+    return value
+
+
+def encode_cursor(row: UpdateLog) -> str:
+    raw = json.dumps([_as_utc_naive(row.timestamp).isoformat(), row.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError(cursor) from exc
+
+
+def query_history(
+    db: Session,
+    *,
+    limit: int = 20,
+    cursor: str | None = None,
+    status: str | None = None,
+    project: str | None = None,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    include_details: bool = False,
+) -> tuple[list[UpdateLog], str | None]:
+    """Página de historial (más reciente primero) y cursor de la siguiente, o None si no hay más."""
+    stmt = select(UpdateLog)
+    if not include_details:
+        stmt = stmt.options(defer(UpdateLog.details, raiseload=True))
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(UpdateLog.timestamp < ts, and_(UpdateLog.timestamp == ts, UpdateLog.id < row_id))
+        )
+    if status:
+        stmt = stmt.where(UpdateLog.status == status)
+    if since:
+        stmt = stmt.where(UpdateLog.timestamp >= _as_utc_naive(since))
+    if until:
+        stmt = stmt.where(UpdateLog.timestamp < _as_utc_naive(until))
+    if project:
+        stmt = stmt.where(
+            exists().where(UpdateResult.log_id == UpdateLog.id, UpdateResult.project == project)
+        )
+    stmt = stmt.order_by(UpdateLog.timestamp.desc(), UpdateLog.id.desc()).limit(limit + 1)
+
+    rows = list(db.scalars(stmt))
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def project_stats(
+    db: Session, *, since: datetime.datetime | None = None
+) -> list[dict[str, object]]:
+    """Resumen por stack (ejecuciones, éxitos, fallos, duración media) desde `update_results`."""
+    stmt = select(
+        UpdateResult.project,
+        func.count().label("runs"),
+        func.sum(case((UpdateResult.status == "SUCCESS", 1), else_=0)).label("successes"),
+        func.sum(case((UpdateResult.status == "ERROR", 1), else_=0)).label("failures"),
+        func.sum(case((UpdateResult.status == "SKIPPED", 1), else_=0)).label("skipped"),
+        func.avg(UpdateResult.duration).label("avg_duration"),
+        func.max(UpdateLog.timestamp).label("last_run"),
+    ).join(UpdateLog, UpdateLog.id == UpdateResult.log_id)
+    if since:
+        stmt = stmt.where(UpdateLog.timestamp >= _as_utc_naive(since))
+    stmt = stmt.group_by(UpdateResult.project).order_by(UpdateResult.project)
+
+    stats = []
+    for row in db.execute(stmt):
+        attempted = row.successes + row.failures
+        stats.append(
+            {
+                "project": row.project,
+                "runs": row.runs,
+                "successes": row.successes,
+                "failures": row.failures,
+                "skipped": row.skipped,
+                "success_rate": round(row.successes / attempted, 4) if attempted else None,
+                "avg_duration": round(row.avg_duration, 1) if row.avg_duration is not None else None,
+                "last_run": row.last_run,
+            }
+        )
+    return stats
@@ -0,0 +1,173 @@
+"""Puntualidad de las ejecuciones programadas.
+
+APScheduler no le dice al job para qué hora estaba programado ni si juntó varias ejecuciones
+atrasadas en una (coalesce). `track_run_timing` lo toma de los eventos públicos del scheduler:
+EVENT_JOB_SUBMITTED da las horas entregadas (`scheduled_run_times`) y los de alta, cambio y
+arranque la primera ejecución pendiente de cada job, desde la que se cuentan las fundidas.
+`timed_run(job_id)`, dentro del job, lo deja en `current_run()` mientras corre, para que el
+historial lo registre.
+"""
+from __future__ import annotations
+
+import datetime
+import threading
+from collections import defaultdict, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Literal
+
+from apscheduler.events import (
+    EVENT_JOB_ADDED,
+    EVENT_JOB_MODIFIED,
+    EVENT_JOB_SUBMITTED,
+    EVENT_SCHEDULER_START,
+    JobEvent,
+    JobSubmissionEvent,
+    SchedulerEvent,
+)
+from apscheduler.job import Job
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.base import BaseTrigger
+
+from server.config import SCHEDULER_LATE_THRESHOLD
+
+RunTiming = Literal["on_time", "late", "coalesced"]
+
+# Lo que espera el job a que el scheduler publique su EVENT_JOB_SUBMITTED: se emite justo
+# después de entregarlo al executor, así que el job puede arrancar antes.
+_SUBMISSION_WAIT = 1.0
+
+
+@dataclass(frozen=True)
+class ScheduledRun:
+    scheduled_for: datetime.datetime
+    timing: RunTiming
+    # Ejecuciones atrasadas que se fundieron en esta (1 si no hubo coalesce).
+    runs: int = 1
+
+
+@dataclass(frozen=True)
+class _Submitted:
+    scheduled_for: datetime.datetime
+    runs: int
+    misfire_grace_time: int | None
+
+
+_local = threading.local()
+_cond = threading.Condition()
+_submitted: defaultdict[str, deque[_Submitted]] = defaultdict(deque)
+# Job -> primera ejecución pendiente, tal como la dejó el scheduler tras la anterior.
+_next_pending: dict[str, datetime.datetime] = {}
+
+
+def current_run() -> ScheduledRun | None:
+    """Ejecución programada en curso en este hilo (None fuera del scheduler)."""
+    return getattr(_local, "run", None)
+
+
+def classify_run(
+    scheduled_for: datetime.datetime,
+    *,
+    runs: int = 1,
+    now: datetime.datetime | None = None,
+) -> ScheduledRun:
+    if runs > 1:
+        return ScheduledRun(scheduled_for, "coalesced", runs)
+    # APScheduler da la hora en la zona del scheduler: se compara en UTC.
+    now = (now or datetime.datetime.now(datetime.UTC)).astimezone(datetime.UTC)
+    delay = (now - scheduled_for.astimezone(datetime.UTC)).total_seconds()
+    late = delay > SCHEDULER_LATE_THRESHOLD
+    return ScheduledRun(scheduled_for, "late" if late else "on_time")
+
+
+def _missed_runs(
+    trigger: BaseTrigger, first: datetime.datetime, last: datetime.datetime
+) -> int:
+    """Ejecuciones del trigger desde la primera pendiente hasta `last`, ambas incluidas."""
+    runs = 0
+    run_time: datetime.datetime | None = first
+    while run_time is not None and run_time <= last:
+        runs += 1
+        run_time = trigger.get_next_fire_time(run_time, run_time)
+    return runs
+
+
+def record_submission(
+    job: Job, run_times: list[datetime.datetime], first_pending: datetime.datetime | None
+) -> None:
+    """Apunta las ejecuciones entregadas al executor para que `timed_run` las recoja."""
+    runs = [_Submitted(run_time, 1, job.misfire_grace_time) for run_time in run_times]
+    if job.coalesce and len(run_times) == 1 and first_pending is not None:
+        # Las que hay entre la primera pendiente y la entregada son las que se fundieron.
+        merged = _missed_runs(job.trigger, first_pending, run_times[0])
+        runs = [_Submitted(run_times[0], max(1, merged), job.misfire_grace_time)]
+    with _cond:
+        _submitted[job.id].extend(runs)
+        _cond.notify_all()
+
+
+def track_run_timing(scheduler: BaseScheduler) -> None:
+    """Registra en `scheduler` los listeners que alimentan `timed_run`."""
+
+    def _remember(job: Job | None) -> None:
+        if job is None:
+            return
+        with _cond:
+            if job.next_run_time is None:
+                _next_pending.pop(job.id, None)
+            else:
+                _next_pending[job.id] = job.next_run_time
+
+    def _on_started(_event: SchedulerEvent) -> None:
+        for job in scheduler.get_jobs():
+            _remember(job)
+
+    def _on_changed(event: JobEvent) -> None:
+        _remember(scheduler.get_job(event.job_id, event.jobstore))
+
+    def _on_submitted(event: JobSubmissionEvent) -> None:
+        # El evento llega con el job ya movido a su siguiente ejecución.
+        job = scheduler.get_job(event.job_id, event.jobstore)
+        with _cond:
+            first_pending = _next_pending.get(event.job_id)
+        if job is not None:
+            record_submission(job, list(event.scheduled_run_times), first_pending)
+        _remember(job)
+
+    scheduler.add_listener(_on_started, EVENT_SCHEDULER_START)
+    scheduler.add_listener(_on_changed, EVENT_JOB_ADDED | EVENT_JOB_MODIFIED)
+    scheduler.add_listener(_on_submitted, EVENT_JOB_SUBMITTED)
+
+
+def _take_submission(job_id: str, now: datetime.datetime) -> _Submitted | None:
+    with _cond:
+        _cond.wait_for(lambda: _submitted.get(job_id), timeout=_SUBMISSION_WAIT)
+        pending = _submitted.get(job_id)
+        while pending:
+            run = pending.popleft()
+            grace = run.misfire_grace_time
+            # Igual que APScheduler: las que superan misfire_grace_time no llegan a ejecutarse.
+            if grace is None or (now - run.scheduled_for).total_seconds() <= grace:
+                break
+        else:
+            run = None
+        if not pending:
+            _submitted.pop(job_id, None)
+        return run
+
+
+@contextmanager
+def timed_run(job_id: str) -> Iterator[ScheduledRun | None]:
+    """Deja en `current_run()` la ejecución programada del job mientras dura el bloque."""
+    submitted = _take_submission(job_id, datetime.datetime.now(datetime.UTC))
+    run = (
+        classify_run(submitted.scheduled_for, runs=submitted.runs)
+        if submitted is not None
+        else None
+    )
+    _local.run = run
+    try:
+        yield run
+    finally:
+        _local.run = None
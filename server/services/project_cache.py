@@ -0,0 +1,274 @@
+"""Instantánea en memoria del listado de proyectos para `GET /api/projects`.
+
+La instantánea se refresca en segundo plano y se invalida:
+- al cambiar PROJECTS_ROOT (mtime del directorio: altas, bajas o renombrados de stacks);
+- al modificarse filas de `ProjectSettings` (toggles, rutas);
+- por eventos de Docker (start/stop/die...) de contenedores compose, recalculando solo
+  el estado de los stacks afectados.
+"""
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from server.config import (
+    PROJECTS_CACHE_ENABLED,
+    PROJECTS_CACHE_REFRESH_INTERVAL,
+    PROJECTS_CACHE_TTL,
+    logger,
+)
+from server.database import session_scope
+from server.models.db import ProjectSettings
+from server.services import projects as projects_service
+from server.services.docker_api import (
+    COMPOSE_WORKING_DIR_LABEL,
+    DockerAPIError,
+    DockerEventStream,
+    container_workdir,
+    get_docker_client,
+)
+
+CONTAINER_EVENTS = ["start", "stop", "die", "destroy", "pause", "unpause"]
+# Espera tras el primer evento para agrupar ráfagas (p. ej. `compose up` de varios servicios).
+EVENT_DEBOUNCE_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class ProjectSnapshot:
+    projects: list[dict]
+    refreshed_at: datetime.datetime
+    age: float
+
+
+class ProjectSnapshotCache:
+    def __init__(
+        self,
+        loader: Callable[[], list[dict]],
+        *,
+        fingerprint: Callable[[], Hashable],
+        running_counts: Callable[[], dict[str, int]],
+    ) -> None:
+        self._loader = loader
+        self._fingerprint = fingerprint
+        self._running_counts = running_counts
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._projects: list[dict] | None = None
+        self._refreshed_at = datetime.datetime.now(datetime.UTC)
+        self._refreshed_mono = 0.0
+        self._snapshot_fingerprint: Hashable = None
+        self._generation = 0
+        self._snapshot_generation = -1
+        self._dirty_workdirs: set[str] = set()
+        self.wake = threading.Event()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+
+    def mark_workdir_dirty(self, workdir: str) -> None:
+        with self._lock:
+            self._dirty_workdirs.add(workdir)
+        self.wake.set()
+
+    @property
+    def has_snapshot(self) -> bool:
+        return self._projects is not None
+
+    def _is_fresh(self, max_age: float, fingerprint: Hashable) -> bool:
+        return (
+            self._projects is not None
+            and self._snapshot_generation == self._generation
+            and self._snapshot_fingerprint == fingerprint
+            and time.monotonic() - self._refreshed_mono <= max_age
+        )
+
+    def _snapshot(self) -> ProjectSnapshot:
+        assert self._projects is not None
+        return ProjectSnapshot(
+            projects=self._projects,
+            refreshed_at=self._refreshed_at,
+            age=max(0.0, time.monotonic() - self._refreshed_mono),
+        )
+
+    def get(self, max_age: float | None = None) -> ProjectSnapshot:
+        """Instantánea con antigüedad <= max_age (por defecto PROJECTS_CACHE_TTL)."""
+        if not PROJECTS_CACHE_ENABLED:
+            return ProjectSnapshot(
+                projects=self._loader(),
+                refreshed_at=datetime.datetime.now(datetime.UTC),
+                age=0.0,
+            )
+        limit = PROJECTS_CACHE_TTL if max_age is None else max_age
+        fingerprint = self._fingerprint()
+        with self._lock:
+            if self._is_fresh(limit, fingerprint):
+                return self._snapshot()
+        return self.refresh(max_age=limit)
+
+    def refresh(self, *, max_age: float | None = None) -> ProjectSnapshot:
+        """Reescanea; con max_age, reutiliza el resultado si otro hilo acaba de refrescar."""
+        with self._refresh_lock:
+            fingerprint = self._fingerprint()
+            with self._lock:
+                if max_age is not None and self._is_fresh(max_age, fingerprint):
+                    return self._snapshot()
+                generation = self._generation
+                self._dirty_workdirs.clear()
+            projects = self._loader()
+            with self._lock:
+                self._projects = projects
+                self._refreshed_at = datetime.datetime.now(datetime.UTC)
+                self._refreshed_mono = time.monotonic()
+                self._snapshot_fingerprint = fingerprint
+                # Invalidaciones durante el escaneo dejan la instantánea ya caducada.
+                self._snapshot_generation = generation
+                return self._snapshot()
+
+    def apply_dirty_workdirs(self) -> None:
+        """Recalcula estado y contenedores solo de los stacks con eventos pendientes."""
+        with self._lock:
+            dirty = self._dirty_workdirs
+            self._dirty_workdirs = set()
+            projects = self._projects
+        if not dirty or projects is None:
+            return
+
+        try:
+            counts = self._running_counts()
+        except Exception as exc:
+            logger.warning("No se pudo recalcular el estado de los stacks (%s).", exc)
+            self.invalidate()
+            return
+
+        updated: list[dict] = []
+        for project in projects:
+            candidates = projects_service.compose_workdir_candidates(project["path"])
+            if candidates & dirty:
+                running = sum(counts.get(c, 0) for c in candidates)
+                project = {
+                    **project,
+                    "status": "running" if running > 0 else "stopped",
+                    "containers": running,
+                }
+            updated.append(project)
+
+        with self._lock:
+            if self._projects is projects:
+                self._projects = updated
+
+
+def _load_projects() -> list[dict]:
+    with session_scope() as db:
+        return projects_service.scan_projects_logic(db)
+
+
+project_cache = ProjectSnapshotCache(
+    _load_projects,
+    fingerprint=projects_service.projects_root_fingerprint,
+    running_counts=projects_service.running_containers_by_workdir,
+)
+
+
+def _invalidate_on_settings_change(*_args: object) -> None:
+    project_cache.invalidate()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(ProjectSettings, _event_name, _invalidate_on_settings_change)
+
+
+_stop = threading.Event()
+_threads: list[threading.Thread] = []
+_event_stream: DockerEventStream | None = None
+
+
+def _refresh_loop() -> None:
+    last_full = time.monotonic()
+    while not _stop.is_set():
+        project_cache.wake.wait(timeout=PROJECTS_CACHE_REFRESH_INTERVAL)
+        if _stop.is_set():
+            return
+        if project_cache.wake.is_set():
+            project_cache.wake.clear()
+            _stop.wait(EVENT_DEBOUNCE_SECONDS)
+            project_cache.apply_dirty_workdirs()
+        # Solo se mantiene caliente si alguien pidió ya el listado.
+        if (
+            project_cache.has_snapshot
+            and time.monotonic() - last_full >= PROJECTS_CACHE_REFRESH_INTERVAL
+        ):
+            try:
+                project_cache.refresh()
+            except Exception as exc:
+                logger.warning("Error refrescando la cache de proyectos: %s", exc)
+            last_full = time.monotonic()
+
+
+def _docker_events_loop() -> None:
+    global _event_stream
+    backoff = 1.0
+    while not _stop.is_set():
+        client = get_docker_client()
+        if client is None:
+            _stop.wait(30)
+            continue
+        try:
+            stream = client.events(
+                filters={
+                    "type": ["container"],
+                    "event": CONTAINER_EVENTS,
+                    "label": [COMPOSE_WORKING_DIR_LABEL],
+                }
+            )
+        except DockerAPIError as exc:
+            logger.debug("Sin flujo de eventos de Docker: %s", exc)
+            _stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
+            continue
+
+        _event_stream = stream
+        # Lo ocurrido mientras no había flujo se desconoce: forzar reescaneo.
+        project_cache.invalidate()
+        backoff = 1.0
+        try:
+            for docker_event in stream:
+                workdir = container_workdir(docker_event)
+                if workdir:
+                    project_cache.mark_workdir_dirty(workdir)
+        except DockerAPIError as exc:
+            logger.warning("Flujo de eventos de Docker cortado: %s", exc)
+        finally:
+            stream.close()
+            _event_stream = None
+        _stop.wait(backoff)
+
+
+def start_project_cache() -> None:
+    if not PROJECTS_CACHE_ENABLED or _threads:
+        return
+    _stop.clear()
+    for target, name in (
+        (_refresh_loop, "pullpilot-projects-refresh"),
+        (_docker_events_loop, "pullpilot-docker-events"),
+    ):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def stop_project_cache() -> None:
+    _stop.set()
+    project_cache.wake.set()
+    stream = _event_stream
+    if stream is not None:
+        stream.close()
+    for thread in _threads:
+        thread.join(timeout=2)
+    _threads.clear()
+    project_cache.wake.clear()
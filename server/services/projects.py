@@ -1,21 +1,61 @@
+import asyncio
 import datetime
 import json
+import os
+import queue
+import threading
 import time
 from collections.abc import Callable
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from sqlalchemy import delete, insert, update
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from server.config import HEALTHCHECK_TIMEOUT, PROJECTS_ROOT, logger
+from server.config import (
+    HEALTHCHECK_TIMEOUT,
+    PROJECT_STATUS_SCAN,
+    PROJECTS_PRUNE_MISSING,
+    PROJECTS_ROOT,
+    PROJECTS_SCAN_INOTIFY,
+    UPDATE_SKIP_UNCHANGED,
+    logger,
+)
 from server.locale.log_messages import t
 from server.models.db import ProjectSettings
-from server.services.docker import COMPOSE_CMD, run_command
+from server.services.coordination import project_lock
+from server.services.docker import COMPOSE_CMD, run_command, run_command_async
+from server.services.docker_api import (
+    COMPOSE_WORKING_DIR_LABEL,
+    DockerAPIError,
+    DockerEventStream,
+    container_workdir,
+    get_docker_client,
+)
+from server.services.health import classify_stack_health
+from server.services.stack_discovery import (
+    COMPOSE_FILE_NAMES,
+    StackScanner,
+    find_compose_file,
+)
+from server.services.stack_changes import (
+    image_changes,
+    service_image_ids,
+    service_image_refs,
+    stack_is_current,
+)
+from server.services.update_logs import ProjectUpdateReport
 
 
 IGNORED_PROJECT_NAMES = {"pullpilot", "pullpilot-ui", "docker-updater", "data"}
 
+_stack_scanner = StackScanner(ignored=IGNORED_PROJECT_NAMES, use_inotify=PROJECTS_SCAN_INOTIFY)
+
+HEALTH_EVENT_ACTIONS = ["health_status", "start", "die", "restart", "stop", "destroy", "oom"]
+# Reevaluación periódica aunque no lleguen eventos (p. ej. contenedores sin healthcheck).
+HEALTH_RECHECK_SECONDS = 5.0
+
 
 def _resolved_projects_root() -> Path:
     return PROJECTS_ROOT.resolve()
@@ -36,6 +76,15 @@ def resolve_allowed_project_workdir(raw: str, *, locale: str = "es") -> Path:
     return resolved
 
 
+def projects_root_fingerprint() -> tuple[str, int | None]:
+    """(ruta, mtime) de PROJECTS_ROOT: cambia al crear, borrar o renombrar stacks."""
+    try:
+        mtime = PROJECTS_ROOT.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    return str(PROJECTS_ROOT), mtime
+
+
 def compose_stack_allowed(path: Path) -> bool:
     """True si el directorio es un stack compose válido y está bajo PROJECTS_ROOT."""
     try:
@@ -46,26 +95,52 @@ def compose_stack_allowed(path: Path) -> bool:
     return compose_project_path_ok(resolved)
 
 
-def _dir_has_compose_file(path: Path) -> bool:
-    return (path / "docker-compose.yml").exists() or (path / "docker-compose.yaml").exists()
+def compose_project_path_ok(path: Path) -> bool:
+    """Directorio existente con compose.yaml, docker-compose.yml o variantes (mismo criterio que
+    el escaneo)."""
+    return path.is_dir() and find_compose_file(path) is not None
 
 
-def compose_project_path_ok(path: Path) -> bool:
-    """Directorio existente con docker-compose.yml o .yaml (mismo criterio que el escaneo)."""
-    return path.is_dir() and _dir_has_compose_file(path)
+def compose_workdir_candidates(project_path: str) -> set[str]:
+    """Rutas con las que compose puede haber etiquetado el stack (tal cual y resuelta)."""
+    candidates = {os.path.normpath(project_path)}
+    try:
+        candidates.add(str(Path(project_path).resolve()))
+    except (OSError, RuntimeError):
+        pass
+    return candidates
 
 
 def _compose_ps_q_ids(
-    project_path: str, *, log_exec: bool, locale: str = "es"
+    project_path: str, *, log_exec: bool, locale: str = "es", all: bool = False
 ) -> list[str]:
-    """Container IDs from `docker compose ps -q` (non-empty lines only)."""
+    """IDs de contenedores en ejecución del stack (con all=True, también los parados).
+
+    Usa la Docker Engine API (etiqueta working_dir de compose) y, si no está disponible,
+    `docker compose ps -q` (solo líneas no vacías).
+    """
+    client = get_docker_client()
+    if client is not None:
+        wanted = compose_workdir_candidates(project_path)
+        try:
+            containers = client.list_containers(
+                labels={COMPOSE_WORKING_DIR_LABEL: None}, all=all
+            )
+        except DockerAPIError as exc:
+            logger.warning("Docker API no disponible (%s); usando CLI.", exc)
+        else:
+            return [c["Id"] for c in containers if container_workdir(c) in wanted]
+
     out = run_command(
-        f"{COMPOSE_CMD} ps -q", cwd=project_path, log_exec=log_exec, locale=locale
+        f"{COMPOSE_CMD} ps -q{' -a' if all else ''}",
+        cwd=project_path,
+        log_exec=log_exec,
+        locale=locale,
     )
     return [line.strip() for line in out.splitlines() if line.strip()]
 
 
-def _compose_ps_status(path_str: str) -> tuple[str, int]:
+def compose_ps_status(path_str: str) -> tuple[str, int]:
     try:
         ids = _compose_ps_q_ids(path_str, log_exec=False)
     except Exception:
@@ -75,138 +150,498 @@ def _compose_ps_status(path_str: str) -> tuple[str, int]:
     return status, running_count
 
 
+def running_containers_by_workdir() -> dict[str, int]:
+    """Contenedores compose en ejecución agrupados por working_dir, en una sola consulta.
+
+    Una llamada a la Engine API (o un único `docker ps` como respaldo) sustituye a un
+    `compose ps -q` por stack.
+    """
+    counts: dict[str, int] = {}
+    client = get_docker_client()
+    workdirs: list[str | None] | None = None
+    if client is not None:
+        try:
+            containers = client.list_containers(labels={COMPOSE_WORKING_DIR_LABEL: None})
+        except DockerAPIError as exc:
+            logger.warning("Docker API no disponible (%s); usando CLI.", exc)
+        else:
+            workdirs = [container_workdir(c) for c in containers]
+
+    if workdirs is None:
+        out = run_command(
+            [
+                "docker",
+                "ps",
+                "--filter",
+                f"label={COMPOSE_WORKING_DIR_LABEL}",
+                "--format",
+                f'{{{{.Label "{COMPOSE_WORKING_DIR_LABEL}"}}}}',
+            ],
+            log_exec=False,
+        )
+        workdirs = [os.path.normpath(line.strip()) for line in out.splitlines() if line.strip()]
+
+    for workdir in workdirs:
+        if workdir:
+            counts[workdir] = counts.get(workdir, 0) + 1
+    return counts
+
+
+def _bulk_compose_status(paths: dict[str, Path]) -> dict[str, tuple[str, int]] | None:
+    """Estado de todos los stacks con un único listado; None si el listado falla."""
+    try:
+        counts = running_containers_by_workdir()
+    except Exception as exc:
+        logger.warning(
+            "No se pudo listar contenedores en bloque (%s); consultando stack a stack.", exc
+        )
+        return None
+
+    result: dict[str, tuple[str, int]] = {}
+    for entry, path in paths.items():
+        running_count = sum(counts.get(c, 0) for c in compose_workdir_candidates(str(path)))
+        result[entry] = ("running" if running_count > 0 else "stopped", running_count)
+    return result
+
+
+def _per_project_compose_status(paths: dict[str, Path]) -> dict[str, tuple[str, int]]:
+    """Un `compose ps -q` por stack (modo `per_project` o respaldo del modo en bloque)."""
+    status_by_entry: dict[str, tuple[str, int]] = {}
+    if not paths:
+        return status_by_entry
+    max_workers = min(8, len(paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        future_to_entry = {
+            pool.submit(compose_ps_status, str(path)): entry
+            for entry, path in paths.items()
+        }
+        for fut in as_completed(future_to_entry):
+            entry = future_to_entry[fut]
+            status_by_entry[entry] = fut.result()
+    return status_by_entry
+
+
+def _inspect_containers(container_ids: list[str], *, locale: str) -> list[dict]:
+    """Inspect de todos los contenedores en una sola llamada (API o un único `docker inspect`)."""
+    if not container_ids:
+        return []
+    client = get_docker_client()
+    if client is not None:
+        try:
+            return client.inspect_containers(container_ids)
+        except DockerAPIError as exc:
+            logger.warning("Docker API no disponible (%s); usando CLI.", exc)
+
+    try:
+        return json.loads(
+            run_command(["docker", "inspect", *container_ids], locale=locale) or "[]"
+        )
+    except RuntimeError:
+        if len(container_ids) == 1:
+            raise
+    # `docker inspect` falla entero si alguno de los IDs ya no existe: repetir uno a uno
+    # descartando los que desaparecieron entre el listado y el inspect.
+    inspected: list[dict] = []
+    for container_id in container_ids:
+        try:
+            inspected.extend(
+                json.loads(run_command(["docker", "inspect", container_id], locale=locale))
+            )
+        except RuntimeError:
+            continue
+    return inspected
+
+
+def _compose_health_converged(container_ids: list[str], *, locale: str) -> bool:
+    """True si todo el stack está sano; lanza RuntimeError si algún contenedor falló."""
+    health = classify_stack_health(_inspect_containers(container_ids, locale=locale))
+    if health.failed:
+        raise RuntimeError(health.failed[0].message(locale))
+    return health.converged
+
+
+def _open_compose_health_events(
+    project_path: str,
+) -> tuple[DockerEventStream, queue.Queue[dict | None]] | None:
+    """Suscribe a eventos de salud/ciclo de vida del stack; None si no hay Engine API.
+
+    Un hilo lector vuelca en la cola los eventos del stack y un None al cortarse el flujo.
+    """
+    client = get_docker_client()
+    if client is None:
+        return None
+    try:
+        stream = client.events(
+            filters={
+                "type": ["container"],
+                "event": HEALTH_EVENT_ACTIONS,
+                "label": [COMPOSE_WORKING_DIR_LABEL],
+            }
+        )
+    except DockerAPIError as exc:
+        logger.warning("Sin eventos de Docker (%s); verificando salud por sondeo.", exc)
+        return None
+
+    wanted = compose_workdir_candidates(project_path)
+    events: queue.Queue[dict | None] = queue.Queue()
+
+    def reader() -> None:
+        try:
+            for docker_event in stream:
+                if container_workdir(docker_event) in wanted:
+                    events.put(docker_event)
+        except DockerAPIError as exc:
+            logger.warning("Flujo de eventos de salud cortado: %s", exc)
+        finally:
+            events.put(None)
+
+    threading.Thread(target=reader, name="pullpilot-health-events", daemon=True).start()
+    return stream, events
+
+
 def _wait_for_compose_healthy(
     project_path: str,
     log: Callable[..., None],
     *,
     locale: str,
 ) -> None:
+    """Espera a que el stack converja.
+
+    Con la Engine API se reevalúa en cuanto llega un evento `health_status`/`die`/
+    `restart`... del stack (y cada HEALTH_RECHECK_SECONDS por si se pierde alguno);
+    sin ella se mantiene el sondeo cada 2 s.
+    """
+    watch = _open_compose_health_events(project_path)
+    events = watch[1] if watch is not None else None
     start_time = time.time()
-    while True:
-        elapsed = time.time() - start_time
-        if elapsed > HEALTHCHECK_TIMEOUT:
-            raise RuntimeError(
-                t("health.timeout", locale, timeout=HEALTHCHECK_TIMEOUT)
-            )
-
-        try:
-            container_ids = _compose_ps_q_ids(
-                project_path, log_exec=True, locale=locale
-            )
-        except Exception:
-            container_ids = []
-
-        if not container_ids:
-            if elapsed > 5:
-                raise RuntimeError(t("health.no_containers", locale))
-            time.sleep(1)
-            continue
+    try:
+        while True:
+            elapsed = time.time() - start_time
+            if elapsed > HEALTHCHECK_TIMEOUT:
+                raise RuntimeError(
+                    t("health.timeout", locale, timeout=HEALTHCHECK_TIMEOUT)
+                )
 
-        all_healthy = True
-        for container_id in container_ids:
-            inspect_raw = run_command(
-                ["docker", "inspect", container_id], locale=locale
-            )
-            data = json.loads(inspect_raw)[0]
-            state = data.get("State", {})
-            status = state.get("Status")
-            health = state.get("Health", {}).get("Status")
-            cid = container_id[:12]
-
-            if status == "restarting":
-                raise RuntimeError(t("health.restarting", locale, cid=cid))
-            if status in {"exited", "dead"}:
-                exit_code = state.get("ExitCode")
-                if exit_code != 0:
-                    raise RuntimeError(
-                        t("health.exited", locale, cid=cid, code=exit_code)
-                    )
-
-            if health == "unhealthy":
-                raise RuntimeError(t("health.unhealthy", locale, cid=cid))
-
-            if health == "starting":
-                all_healthy = False
+            try:
+                container_ids = _compose_ps_q_ids(
+                    project_path, log_exec=True, locale=locale
+                )
+            except Exception:
+                container_ids = []
+
+            if not container_ids:
+                if elapsed > 5:
+                    raise RuntimeError(t("health.no_containers", locale))
+                poll_interval = 1.0
+            elif _compose_health_converged(container_ids, locale=locale):
+                log(t("update.health_passed", locale), "SUCCESS")
+                return
+            else:
+                poll_interval = 2.0
+
+            if events is None:
+                time.sleep(poll_interval)
                 continue
 
-            if health is None and status != "running":
-                all_healthy = False
-
-        if all_healthy:
-            log(t("update.health_passed", locale), "SUCCESS")
-            break
-
-        time.sleep(2)
+            # Pasado el timeout por un margen mínimo para que el siguiente ciclo lo detecte.
+            remaining = HEALTHCHECK_TIMEOUT - (time.time() - start_time) + 0.01
+            wait = max(0.0, min(HEALTH_RECHECK_SECONDS, remaining))
+            try:
+                item = events.get(timeout=wait)
+                while item is not None:
+                    item = events.get_nowait()
+            except queue.Empty:
+                continue
+            # Flujo cortado: seguir por sondeo.
+            events = None
+    finally:
+        if watch is not None:
+            watch[0].close()
 
 
 def scan_projects_logic(db: Session) -> list[dict]:
     if not PROJECTS_ROOT.exists():
         return []
 
-    pending_db_write = False
-    ordered: list[tuple[str, Path, ProjectSettings]] = []
-
-    for path in PROJECTS_ROOT.iterdir():
-        entry = path.name
-        if entry.lower() in IGNORED_PROJECT_NAMES:
-            continue
-
-        if not compose_project_path_ok(path):
-            continue
-
-        proj = db.query(ProjectSettings).filter(ProjectSettings.name == entry).first()
-        if not proj:
-            proj = ProjectSettings(name=entry, path=str(path))
-            db.add(proj)
-            pending_db_write = True
+    # Una sola consulta para todos los stacks; altas, rutas y bajas se escriben en una transacción.
+    known = {proj.name: proj for proj in db.query(ProjectSettings)}
+    flags = {name: (proj.excluded, proj.full_stop) for name, proj in known.items()}
+    added: list[dict] = []
+    moved: list[dict] = []
+    ordered: list[tuple[str, Path]] = []
+
+    for entry, path in _stack_scanner.scan(PROJECTS_ROOT).items():
+        proj = known.get(entry)
+        if proj is None:
+            added.append({"name": entry, "path": str(path), "excluded": False, "full_stop": False})
+            flags[entry] = (False, False)
         elif proj.path != str(path):
-            proj.path = str(path)
-            pending_db_write = True
+            moved.append({"id": proj.id, "path": str(path)})
 
-        ordered.append((entry, path, proj))
+        ordered.append((entry, path))
 
-    if pending_db_write:
+    vanished = sorted(set(known) - {entry for entry, _ in ordered})
+    prune = vanished if PROJECTS_PRUNE_MISSING else []
+
+    if added or moved or prune:
+        # INSERT y UPDATE por clave primaria en un executemany cada uno (el flush de la sesión
+        # emitiría una sentencia por fila).
         try:
+            if added:
+                db.execute(insert(ProjectSettings), added)
+            if moved:
+                db.execute(update(ProjectSettings), moved)
+            if prune:
+                db.execute(
+                    delete(ProjectSettings)
+                    .where(ProjectSettings.name.in_(prune))
+                    .execution_options(synchronize_session=False)
+                )
             db.commit()
         except SQLAlchemyError:
             db.rollback()
             logger.warning(
                 "No se pudo persistir cambios del escaneo de proyectos (altas o rutas)."
             )
+        else:
+            if prune:
+                logger.info(
+                    "Stacks sin directorio eliminados de la base de datos: %s", ", ".join(prune)
+                )
 
-    status_by_entry: dict[str, tuple[str, int]] = {}
-    if ordered:
-        max_workers = min(8, len(ordered))
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
-            future_to_entry = {
-                pool.submit(_compose_ps_status, str(path)): entry
-                for entry, path, _ in ordered
-            }
-            for fut in as_completed(future_to_entry):
-                entry = future_to_entry[fut]
-                status_by_entry[entry] = fut.result()
+    paths = dict(ordered)
+    status_by_entry: dict[str, tuple[str, int]] | None = None
+    if paths and PROJECT_STATUS_SCAN == "bulk":
+        status_by_entry = _bulk_compose_status(paths)
+    if status_by_entry is None:
+        status_by_entry = _per_project_compose_status(paths)
 
     found: list[dict] = []
-    for entry, path, proj in ordered:
+    for entry, path in ordered:
         status, running_count = status_by_entry[entry]
+        excluded, full_stop = flags[entry]
         found.append(
             {
                 "name": entry,
                 "path": str(path),
                 "status": status,
                 "containers": running_count,
-                "excluded": proj.excluded,
-                "full_stop": proj.full_stop,
+                "excluded": excluded,
+                "full_stop": full_stop,
             }
         )
 
     return found
 
 
+def _local_image_ids(refs: list[str], *, locale: str) -> dict[str, str]:
+    """ID local (`sha256:...`) de cada referencia; las que no existen en local se omiten."""
+    client = get_docker_client()
+    if client is not None:
+        try:
+            ids: dict[str, str] = {}
+            for ref in refs:
+                try:
+                    ids[ref] = client.inspect_image(ref)["Id"]
+                except DockerAPIError as exc:
+                    if exc.status != 404:
+                        raise
+            return ids
+        except DockerAPIError as exc:
+            logger.warning("Docker API no disponible (%s); usando CLI.", exc)
+
+    out = run_command(
+        ["docker", "image", "inspect", "--format", "{{.Id}}", *refs],
+        log_exec=False,
+        locale=locale,
+    )
+    return dict(zip(refs, out.splitlines(), strict=False))
+
+
+def _compose_config_mtime(workdir: Path) -> float | None:
+    mtimes = []
+    for name in (*COMPOSE_FILE_NAMES, ".env"):
+        try:
+            mtimes.append((workdir / name).stat().st_mtime)
+        except OSError:
+            continue
+    return max(mtimes, default=None)
+
+
+def _git_head_is(workdir_str: str, expected: str | None, *, locale: str) -> bool:
+    if not expected:
+        return False
+    try:
+        head = run_command("git rev-parse HEAD", cwd=workdir_str, log_exec=False, locale=locale)
+    except RuntimeError:
+        return False
+    return head == expected
+
+
+def _stack_unchanged(
+    workdir: Path, git_hash_before: str | None, is_git_repo: bool, locale: str
+) -> bool:
+    if is_git_repo and not _git_head_is(str(workdir), git_hash_before, locale=locale):
+        return False
+    return _stack_already_current(workdir, locale=locale)
+
+
+def _stack_already_current(workdir: Path, *, locale: str) -> bool:
+    """True si recrear el stack no cambiaría nada: mismas imágenes y misma configuración.
+
+    Ante cualquier duda (build local, error consultando Docker...) devuelve False y la
+    actualización sigue el flujo completo.
+    """
+    workdir_str = str(workdir)
+    try:
+        config = json.loads(
+            run_command(
+                f"{COMPOSE_CMD} config --format json",
+                cwd=workdir_str,
+                log_exec=False,
+                locale=locale,
+            )
+        )
+        refs = service_image_refs(config)
+        if refs is None:
+            return False
+        ids = _compose_ps_q_ids(workdir_str, log_exec=False, locale=locale, all=True)
+        containers = _inspect_containers(ids, locale=locale)
+        image_ids = _local_image_ids(sorted(set(refs.values())), locale=locale)
+    except (RuntimeError, ValueError, DockerAPIError) as exc:
+        logger.info("No se pudo comprobar si %s esta al dia (%s).", workdir_str, exc)
+        return False
+    return stack_is_current(
+        config, containers, image_ids, config_mtime=_compose_config_mtime(workdir)
+    )
+
+
+def _service_images(workdir_str: str, *, locale: str) -> dict[str, dict[str, str]]:
+    try:
+        ids = _compose_ps_q_ids(workdir_str, log_exec=False, locale=locale, all=True)
+        return service_image_ids(_inspect_containers(ids, locale=locale))
+    except (RuntimeError, ValueError, DockerAPIError) as exc:
+        logger.info("No se pudieron leer las imagenes de %s (%s).", workdir_str, exc)
+        return {}
+
+
+def _complete_report(
+    report: ProjectUpdateReport,
+    workdir_str: str,
+    *,
+    success: bool,
+    is_git_repo: bool,
+    images_before: dict[str, dict[str, str]],
+    locale: str,
+) -> None:
+    report.status = "SUCCESS" if success else "ERROR"
+    if is_git_repo:
+        try:
+            report.commit_after = run_command(
+                "git rev-parse HEAD", cwd=workdir_str, log_exec=False, locale=locale
+            )
+        except RuntimeError:
+            pass
+    report.image_changes = image_changes(
+        images_before, _service_images(workdir_str, locale=locale)
+    )
+    report.finished_at = datetime.datetime.now(datetime.UTC)
+
+
+def prefetch_compose_images(path: str, *, locale: str = "es") -> bool:
+    """`compose pull` sin tocar los contenedores (fase previa de la actualización global).
+
+    Devuelve False si el stack es un repo git: su compose puede cambiar con el `git pull`
+    de la actualización, así que descarga sus imágenes entonces.
+    """
+    workdir = resolve_allowed_project_workdir(path, locale=locale)
+    if not compose_project_path_ok(workdir) or (workdir / ".git").is_dir():
+        return False
+    run_command(f"{COMPOSE_CMD} pull", cwd=str(workdir), locale=locale)
+    return True
+
+
 def update_single_project_logic(
-    name: str, db: Session, *, locale: str = "es"
+    name: str,
+    db: Session,
+    *,
+    locale: str = "es",
+    images_prefetched: bool = False,
+    report: ProjectUpdateReport | None = None,
+    lock_wait: float = 0,
 ) -> tuple[bool, list[str]]:
-    project = db.query(ProjectSettings).filter(ProjectSettings.name == name).first()
+    """Versión síncrona de `update_project` para hilos sin event loop (scheduler)."""
+    return asyncio.run(
+        update_project(
+            name,
+            db,
+            locale=locale,
+            images_prefetched=images_prefetched,
+            report=report,
+            lock_wait=lock_wait,
+        )
+    )
+
+
+async def update_project(
+    name: str,
+    db: Session,
+    *,
+    locale: str = "es",
+    images_prefetched: bool = False,
+    on_output: Callable[[str], None] | None = None,
+    report: ProjectUpdateReport | None = None,
+    lock_wait: float = 0,
+) -> tuple[bool, list[str]]:
+    """Actualiza un stack: git pull, compose pull, recreate y espera de salud (con rollback).
+
+    Los comandos largos corren con `run_command_async`, sin ocupar un hilo; `on_output`
+    recibe en vivo tanto las líneas del log como la salida de cada comando. Si se pasa
+    `report`, se rellena con tiempos, commits e imágenes que cambiaron. Un lock de fichero
+    impide actualizar el mismo stack a la vez desde dos hilos o workers: con `lock_wait` > 0
+    se espera hasta esos segundos y, si sigue ocupado, el stack se da por omitido (éxito, con
+    `report.status` SKIPPED); con 0 es un error inmediato.
+    """
+    lock = project_lock(name)
+    deadline = time.monotonic() + lock_wait
+    while not lock.acquire(blocking=False):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if lock_wait > 0:
+                if report is not None:
+                    report.status = "SKIPPED"
+                return True, [t("update.skipped_other_worker", locale)]
+            err = t("error.project_update_in_progress", locale)
+            return False, [f"{t('error.error_prefix', locale)} {err}"]
+        await asyncio.sleep(min(1.0, remaining))
+    try:
+        return await _update_project_locked(
+            name,
+            db,
+            locale=locale,
+            images_prefetched=images_prefetched,
+            on_output=on_output,
+            report=report,
+        )
+    finally:
+        lock.release()
+
+
+async def _update_project_locked(
+    name: str,
+    db: Session,
+    *,
+    locale: str,
+    images_prefetched: bool,
+    on_output: Callable[[str], None] | None,
+    report: ProjectUpdateReport | None,
+) -> tuple[bool, list[str]]:
+    if report is not None:
+        report.started_at = datetime.datetime.now(datetime.UTC)
+    # En un hilo: con SQLite ocupado (busy_timeout) la consulta bloquearía el event loop.
+    project = await asyncio.to_thread(
+        lambda: db.query(ProjectSettings).filter(ProjectSettings.name == name).first()
+    )
     if not project:
         err = t("error.db_project_not_found", locale)
         return False, [f"{t('error.error_prefix', locale)} {err}"]
@@ -224,6 +659,11 @@ def update_single_project_logic(
         else:
             prefix = t("log.prefix_info", locale)
         logs.append(f"[{ts}] {prefix} {message}")
+        if on_output is not None:
+            on_output(logs[-1])
+
+    async def run(cmd: str | list[str]) -> str:
+        return await run_command_async(cmd, cwd=workdir_str, locale=locale, on_line=on_output)
 
     log(t("update.header", locale, name=name))
 
@@ -240,12 +680,27 @@ def update_single_project_logic(
 
     git_hash_before: str | None = None
     is_git_repo = (workdir / ".git").is_dir()
+    images_before: dict[str, dict[str, str]] = {}
+    if report is not None:
+        images_before = await asyncio.to_thread(_service_images, workdir_str, locale=locale)
+
+    async def finish(success: bool) -> tuple[bool, list[str]]:
+        if report is not None:
+            report.commit_before = git_hash_before
+            await asyncio.to_thread(
+                _complete_report,
+                report,
+                workdir_str,
+                success=success,
+                is_git_repo=is_git_repo,
+                images_before=images_before,
+                locale=locale,
+            )
+        return success, logs
 
     if is_git_repo:
         try:
-            git_hash_before = run_command(
-                "git rev-parse HEAD", cwd=workdir_str, locale=locale
-            )
+            git_hash_before = await run("git rev-parse HEAD")
             log(
                 t("update.git_snapshot", locale, commit=git_hash_before[:7]),
             )
@@ -255,49 +710,47 @@ def update_single_project_logic(
     try:
         if is_git_repo:
             log(t("update.git_pull", locale))
-            run_command("git pull", cwd=workdir_str, locale=locale)
+            await run("git pull")
+
+        if images_prefetched and not is_git_repo:
+            log(t("update.compose_pull_prefetched", locale))
+        else:
+            log(t("update.compose_pull", locale))
+            await run(f"{COMPOSE_CMD} pull")
 
-        log(t("update.compose_pull", locale))
-        run_command(f"{COMPOSE_CMD} pull", cwd=workdir_str, locale=locale)
+        if UPDATE_SKIP_UNCHANGED and await asyncio.to_thread(
+            _stack_unchanged, workdir, git_hash_before, is_git_repo, locale
+        ):
+            log(t("update.up_to_date", locale), "SUCCESS")
+            logs.append(t("update.completed_banner", locale))
+            return await finish(True)
 
         if project.full_stop:
             log(t("update.full_stop_down", locale))
-            run_command(f"{COMPOSE_CMD} down", cwd=workdir_str, locale=locale)
+            await run(f"{COMPOSE_CMD} down")
         else:
             log(t("update.compose_stop", locale))
-            run_command(f"{COMPOSE_CMD} stop", cwd=workdir_str, locale=locale)
+            await run(f"{COMPOSE_CMD} stop")
 
         log(t("update.compose_up", locale))
-        run_command(
-            f"{COMPOSE_CMD} up -d --build --remove-orphans",
-            cwd=workdir_str,
-            locale=locale,
-        )
+        await run(f"{COMPOSE_CMD} up -d --build --remove-orphans")
 
         log(t("update.health_wait", locale, timeout=HEALTHCHECK_TIMEOUT))
-        _wait_for_compose_healthy(workdir_str, log, locale=locale)
+        await asyncio.to_thread(_wait_for_compose_healthy, workdir_str, log, locale=locale)
 
         logs.append(t("update.completed_banner", locale))
-        return True, logs
+        return await finish(True)
     except Exception as exc:
         log(t("update.critical_failure", locale, exc=exc), "ERROR")
 
         if git_hash_before:
             log(t("update.rollback_start", locale), "WARN")
             try:
-                run_command(
-                    ["git", "reset", "--hard", git_hash_before],
-                    cwd=workdir_str,
-                    locale=locale,
-                )
+                await run(["git", "reset", "--hard", git_hash_before])
                 log(t("update.rollback_git_reset", locale, commit=git_hash_before[:7]))
 
                 log(t("update.rollback_redeploy", locale))
-                run_command(
-                    f"{COMPOSE_CMD} up -d --build --remove-orphans",
-                    cwd=workdir_str,
-                    locale=locale,
-                )
+                await run(f"{COMPOSE_CMD} up -d --build --remove-orphans")
                 log(t("update.rollback_success", locale), "SUCCESS")
                 logs.append(t("update.rollback_note", locale))
             except Exception as rollback_exc:
@@ -305,4 +758,4 @@ def update_single_project_logic(
         else:
             log(t("update.rollback_impossible", locale), "WARN")
 
-        return False, logs
+        return await finish(False)
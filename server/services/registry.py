@@ -0,0 +1,344 @@
+"""Comprobación de imágenes nuevas en el registry sin descargar capas.
+
+Para cada imagen de un stack se resuelve el digest del manifiesto remoto (HEAD a la API
+HTTP v2 del registry con token anónimo; `docker buildx imagetools inspect` como respaldo)
+y se compara con los `RepoDigests` de la imagen local.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from server.config import REGISTRY_CACHE_TTL, REGISTRY_TIMEOUT, logger
+from server.database import session_scope
+from server.models.db import ProjectSettings
+from server.services.docker import COMPOSE_CMD, run_command
+from server.services.docker_api import DockerAPIError, get_docker_client
+from server.services.projects import compose_stack_allowed
+
+DOCKER_HUB_REGISTRY = "registry-1.docker.io"
+MANIFEST_MEDIA_TYPES = ", ".join(
+    [
+        "application/vnd.oci.image.index.v1+json",
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.docker.distribution.manifest.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+    ]
+)
+_AUTH_PARAM_RE = re.compile(r'(\w+)="([^"]*)"')
+# Validez de un token sin expires_in (valor por defecto de la especificación de tokens).
+_DEFAULT_TOKEN_TTL = 60
+
+
+class RegistryError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ImageReference:
+    registry: str
+    repository: str
+    tag: str = "latest"
+    digest: str | None = None
+
+    @classmethod
+    def parse(cls, reference: str) -> ImageReference:
+        """Normaliza como Docker: `nginx` -> registry-1.docker.io/library/nginx:latest."""
+        name, _, digest = reference.partition("@")
+        first, sep, rest = name.partition("/")
+        if sep and ("." in first or ":" in first or first == "localhost"):
+            registry, path = first, rest
+        else:
+            registry, path = "docker.io", name
+        tag = "latest"
+        last_slash = path.rfind("/")
+        colon = path.rfind(":")
+        if colon > last_slash:
+            path, tag = path[:colon], path[colon + 1 :]
+        if registry in ("docker.io", "index.docker.io"):
+            registry = DOCKER_HUB_REGISTRY
+            if "/" not in path:
+                path = f"library/{path}"
+        return cls(registry=registry, repository=path, tag=tag, digest=digest or None)
+
+    @property
+    def base_url(self) -> str:
+        host = self.registry.rsplit(":", 1)[0]
+        # Igual que el daemon: los registries locales se aceptan sin TLS.
+        insecure = host in ("localhost", "::1") or host.startswith("127.")
+        return f"{'http' if insecure else 'https'}://{self.registry}"
+
+
+class RegistryClient:
+    """Cliente mínimo de la Registry HTTP API v2 (solo lectura de manifiestos)."""
+
+    def __init__(self, *, timeout: float = 10.0) -> None:
+        self._timeout = timeout
+        # (realm, service, scope) -> (token, caduca en time.monotonic()).
+        self._tokens: dict[tuple[str, str, str], tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _forget_token(self, key: tuple[str, str, str]) -> None:
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    def _fetch_token(self, challenge: str) -> tuple[tuple[str, str, str], str]:
+        params = dict(_AUTH_PARAM_RE.findall(challenge))
+        realm = params.get("realm")
+        if not challenge.lower().startswith("bearer") or not realm:
+            raise RegistryError(f"Autenticacion no soportada: {challenge!r}")
+        key = (realm, params.get("service", ""), params.get("scope", ""))
+        with self._lock:
+            cached = self._tokens.get(key)
+        if cached and cached[1] > time.monotonic():
+            return key, cached[0]
+        query = urllib.parse.urlencode({k: v for k, v in (("service", key[1]), ("scope", key[2])) if v})
+        try:
+            with urllib.request.urlopen(f"{realm}?{query}", timeout=self._timeout) as resp:
+                body = json.loads(resp.read() or b"{}")
+        except (urllib.error.URLError, ValueError, OSError) as exc:
+            raise RegistryError(f"No se pudo obtener token de {realm}: {exc}") from exc
+        token = body.get("token") or body.get("access_token")
+        if not token:
+            raise RegistryError(f"Respuesta de token sin token desde {realm}")
+        try:
+            ttl = float(body.get("expires_in") or _DEFAULT_TOKEN_TTL)
+        except (TypeError, ValueError):
+            ttl = _DEFAULT_TOKEN_TTL
+        # Margen para no usar un token que caduca durante la petición.
+        expires = time.monotonic() + max(0.0, ttl - 10)
+        with self._lock:
+            self._tokens[key] = (token, expires)
+        return key, token
+
+    def manifest_digest(self, ref: ImageReference) -> str:
+        """Digest del manifiesto (o índice multi-arch) que apunta el tag, con HEAD."""
+        if ref.digest:
+            return ref.digest
+        url = f"{ref.base_url}/v2/{ref.repository}/manifests/{urllib.parse.quote(ref.tag)}"
+        token: str | None = None
+        token_key: tuple[str, str, str] | None = None
+        # Sin token -> token (quizá de la caché) -> token nuevo si el de la caché ya no vale.
+        for attempt in range(3):
+            request = urllib.request.Request(url, method="HEAD")
+            request.add_header("Accept", MANIFEST_MEDIA_TYPES)
+            if token:
+                request.add_header("Authorization", f"Bearer {token}")
+            try:
+                with urllib.request.urlopen(request, timeout=self._timeout) as resp:
+                    digest = resp.headers.get("Docker-Content-Digest")
+            except urllib.error.HTTPError as exc:
+                challenge = exc.headers.get("WWW-Authenticate", "")
+                if exc.code == 401 and token_key is not None:
+                    # Caducado o revocado por el registry: no se vuelve a usar.
+                    self._forget_token(token_key)
+                if exc.code == 401 and attempt < 2 and challenge:
+                    token_key, token = self._fetch_token(challenge)
+                    continue
+                raise RegistryError(f"{url}: HTTP {exc.code}") from exc
+            except (urllib.error.URLError, OSError) as exc:
+                raise RegistryError(f"{url}: {exc}") from exc
+            if not digest:
+                raise RegistryError(f"{url}: respuesta sin Docker-Content-Digest")
+            return digest
+        raise RegistryError(f"{url}: autenticacion rechazada")
+
+
+def _buildx_digest(reference: str) -> str:
+    out = run_command(
+        ["docker", "buildx", "imagetools", "inspect", "--format", "{{json .Manifest}}", reference],
+        log_exec=False,
+    )
+    try:
+        digest = json.loads(out).get("digest")
+    except (ValueError, AttributeError):
+        digest = None
+    if not digest:
+        raise RegistryError(f"buildx no devolvio digest para {reference}")
+    return digest
+
+
+class DigestCache:
+    """Digest remoto por referencia de imagen, reutilizado durante `ttl` segundos."""
+
+    def __init__(self, client: RegistryClient, *, ttl: float) -> None:
+        self._client = client
+        self._ttl = ttl
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def remote_digest(self, reference: str) -> str:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(reference)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        try:
+            digest = self._client.manifest_digest(ImageReference.parse(reference))
+        except RegistryError as exc:
+            logger.info("Registry API fallo para %s (%s); probando buildx.", reference, exc)
+            try:
+                digest = _buildx_digest(reference)
+            except RuntimeError as cli_exc:
+                raise RegistryError(str(cli_exc)) from cli_exc
+        with self._lock:
+            self._entries[reference] = (now + self._ttl, digest)
+        return digest
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+digest_cache = DigestCache(RegistryClient(timeout=REGISTRY_TIMEOUT), ttl=REGISTRY_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class ImageUpdate:
+    reference: str
+    local_digests: list[str]
+    remote_digest: str | None
+    error: str | None = None
+
+    @property
+    def updates_available(self) -> bool | None:
+        if self.remote_digest is None:
+            return None
+        return self.remote_digest not in self.local_digests
+
+
+@dataclass(frozen=True)
+class StackUpdateCheck:
+    name: str
+    checked_at: datetime.datetime
+    images: list[ImageUpdate] = field(default_factory=list)
+    # Algún servicio se construye con `build:`: el registry no dice si hay que reconstruirlo.
+    has_builds: bool = False
+
+    @property
+    def updates_available(self) -> bool | None:
+        """True si alguna imagen tiene versión nueva; None si no se pudo saber de alguna, si
+        no hay imágenes de registry que comparar o si algún servicio usa `build:`."""
+        verdicts = [image.updates_available for image in self.images]
+        if any(v is True for v in verdicts):
+            return True
+        if not verdicts or self.has_builds or any(v is None for v in verdicts):
+            return None
+        return False
+
+
+def _local_repo_digests(reference: str) -> list[str]:
+    """Digests (`sha256:...`) con los que se descargó la imagen local; [] si no existe."""
+    client = get_docker_client()
+    data: dict | None = None
+    if client is not None:
+        try:
+            data = client.inspect_image(reference)
+        except DockerAPIError as exc:
+            if exc.status == 404:
+                return []
+            logger.warning("Docker API no disponible (%s); usando CLI.", exc)
+    if data is None:
+        try:
+            out = run_command(
+                ["docker", "image", "inspect", "--format", "{{json .RepoDigests}}", reference],
+                log_exec=False,
+            )
+        except RuntimeError:
+            return []
+        repo_digests = json.loads(out or "[]") or []
+    else:
+        repo_digests = data.get("RepoDigests") or []
+    return [d.partition("@")[2] for d in repo_digests if "@" in d]
+
+
+def _compose_services(workdir: str) -> list[dict]:
+    config = json.loads(
+        run_command(f"{COMPOSE_CMD} config --format json", cwd=workdir, log_exec=False) or "{}"
+    )
+    return [s for s in (config.get("services") or {}).values() if isinstance(s, dict)]
+
+
+def _registry_images(services: list[dict]) -> list[str]:
+    refs = {
+        str(service["image"])
+        for service in services
+        if service.get("image") and not service.get("build")
+    }
+    return sorted(refs)
+
+
+def stack_image_references(workdir: str) -> list[str]:
+    """Imágenes de registry del stack (los servicios con `build:` se ignoran)."""
+    return _registry_images(_compose_services(workdir))
+
+
+def check_stack_updates(name: str, workdir: str) -> StackUpdateCheck:
+    images: list[ImageUpdate] = []
+    has_builds = False
+    try:
+        services = _compose_services(workdir)
+        has_builds = any(service.get("build") for service in services)
+        references = _registry_images(services)
+    except (RuntimeError, ValueError) as exc:
+        logger.warning("No se pudo leer la configuracion compose de %s: %s", name, exc)
+        references = []
+        images.append(ImageUpdate(reference="", local_digests=[], remote_digest=None, error=str(exc)))
+    for reference in references:
+        local = _local_repo_digests(reference)
+        try:
+            remote: str | None = digest_cache.remote_digest(reference)
+            error = None
+        except RegistryError as exc:
+            remote, error = None, str(exc)
+        images.append(ImageUpdate(reference, local, remote, error))
+    return StackUpdateCheck(
+        name=name,
+        checked_at=datetime.datetime.now(datetime.UTC),
+        images=images,
+        has_builds=has_builds,
+    )
+
+
+_results: dict[str, StackUpdateCheck] = {}
+_results_lock = threading.Lock()
+
+
+def get_update_availability() -> dict[str, StackUpdateCheck]:
+    with _results_lock:
+        return dict(_results)
+
+
+def record_stack_check(check: StackUpdateCheck) -> None:
+    """Guarda una comprobación hecha fuera del job (p. ej. antes de la actualización global)."""
+    with _results_lock:
+        _results[check.name] = check
+
+
+def forget_stack(name: str) -> None:
+    """Descarta el resultado de un stack recién actualizado (ya no es fiable)."""
+    with _results_lock:
+        _results.pop(name, None)
+
+
+def refresh_update_availability() -> list[StackUpdateCheck]:
+    """Comprueba todos los stacks no excluidos y guarda el resultado (job y endpoint)."""
+    with session_scope() as db:
+        rows = db.query(ProjectSettings).filter(ProjectSettings.excluded.is_(False)).all()
+        stacks = [(p.name, p.path) for p in rows if compose_stack_allowed(Path(p.path))]
+
+    checks = [check_stack_updates(name, path) for name, path in stacks]
+    with _results_lock:
+        _results.clear()
+        _results.update({check.name: check for check in checks})
+    pending = sum(1 for check in checks if check.updates_available)
+    logger.info("Comprobacion de registry: %s de %s stacks con imagenes nuevas.", pending, len(checks))
+    return checks
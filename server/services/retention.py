@@ -0,0 +1,126 @@
+"""Retención del historial: borra ejecuciones antiguas y devuelve el espacio al sistema.
+
+Cada lote de borrado y cada paso de `incremental_vacuum` es una transacción corta, con una
+pausa entre ellas, para que las actualizaciones en curso puedan guardar su log sin esperar.
+"""
+from __future__ import annotations
+
+import datetime
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, delete, func, select
+
+from server.config import (
+    HISTORY_RETENTION_BATCH,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_RETENTION_MB,
+    HISTORY_RETENTION_RUNS,
+    logger,
+)
+from server.database import engine as default_engine
+from server.models.db import UpdateLog
+
+# Páginas liberadas por cada `PRAGMA incremental_vacuum` (4 MiB con páginas de 4 KiB).
+VACUUM_STEP_PAGES = 1024
+BATCH_PAUSE_SECONDS = 0.05
+
+
+@dataclass
+class RetentionResult:
+    deleted_runs: int
+    size_before: int
+    size_after: int
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return max(0, self.size_before - self.size_after)
+
+
+def _pragma(engine: Engine, name: str) -> int:
+    with engine.connect() as conn:
+        return int(conn.exec_driver_sql(f"PRAGMA {name}").scalar() or 0)
+
+
+def database_size(engine: Engine) -> int:
+    """Tamaño del fichero principal (páginas totales, incluidas las libres)."""
+    return _pragma(engine, "page_count") * _pragma(engine, "page_size")
+
+
+def _used_size(engine: Engine) -> int:
+    return (_pragma(engine, "page_count") - _pragma(engine, "freelist_count")) * _pragma(
+        engine, "page_size"
+    )
+
+
+def _delete_oldest_batch(
+    engine: Engine, batch: int, *, older_than: datetime.datetime | None = None
+) -> int:
+    stmt = select(UpdateLog.id).order_by(UpdateLog.timestamp, UpdateLog.id).limit(batch)
+    if older_than is not None:
+        stmt = stmt.where(UpdateLog.timestamp < older_than)
+    with engine.begin() as conn:
+        ids = list(conn.scalars(stmt))
+        if ids:
+            # update_results cae en cascada (ON DELETE CASCADE).
+            conn.execute(delete(UpdateLog).where(UpdateLog.id.in_(ids)))
+    if ids:
+        time.sleep(BATCH_PAUSE_SECONDS)
+    return len(ids)
+
+
+def _incremental_vacuum(engine: Engine) -> None:
+    if _pragma(engine, "auto_vacuum") != 2:
+        # Base sin auto_vacuum incremental (migración pendiente): el espacio se reutiliza
+        # igualmente, pero el fichero no encoge.
+        return
+    while _pragma(engine, "freelist_count") > 0:
+        with engine.connect() as conn:
+            # El módulo sqlite3 ejecuta un solo paso de la sentencia (= una página liberada);
+            # executescript la recorre hasta el final.
+            dbapi = conn.connection.driver_connection
+            dbapi.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+
+def enforce_history_retention(
+    *,
+    days: int = HISTORY_RETENTION_DAYS,
+    runs: int = HISTORY_RETENTION_RUNS,
+    max_mb: float = HISTORY_RETENTION_MB,
+    batch: int = HISTORY_RETENTION_BATCH,
+    engine: Engine | None = None,
+) -> RetentionResult:
+    """Aplica los tres criterios (días, número de ejecuciones, MB); 0 desactiva cada uno."""
+    engine = engine or default_engine
+    size_before = database_size(engine)
+    deleted = 0
+
+    if days > 0:
+        # El timestamp se guarda en UTC sin zona.
+        cutoff = datetime.datetime.now(datetime.UTC).replace(tzinfo=None) - datetime.timedelta(
+            days=days
+        )
+        while step := _delete_oldest_batch(engine, batch, older_than=cutoff):
+            deleted += step
+
+    if runs > 0:
+        with engine.connect() as conn:
+            excess = (conn.scalar(select(func.count()).select_from(UpdateLog)) or 0) - runs
+        while excess > 0 and (step := _delete_oldest_batch(engine, min(batch, excess))):
+            deleted += step
+            excess -= step
+
+    if max_mb > 0:
+        limit_bytes = int(max_mb * 1024 * 1024)
+        while _used_size(engine) > limit_bytes and (step := _delete_oldest_batch(engine, batch)):
+            deleted += step
+
+    _incremental_vacuum(engine)
+    result = RetentionResult(deleted, size_before, database_size(engine))
+    logger.info(
+        "Retención del historial: %s ejecuciones borradas, %s bytes recuperados.",
+        result.deleted_runs,
+        result.reclaimed_bytes,
+    )
+    return result
@@ -1,49 +1,101 @@
+import datetime
 import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from threading import Lock
+from typing import NamedTuple
 
+from apscheduler.executors.pool import ThreadPoolExecutor as JobThreadPoolExecutor
+from apscheduler.job import Job
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-
-from server.config import LOG_LOCALE, logger
-from server.database import SessionLocal
+from apscheduler.triggers.interval import IntervalTrigger
+
+from server.config import (
+    GLOBAL_PULL_CONCURRENCY,
+    GLOBAL_UPDATE_CONCURRENCY,
+    GLOBAL_UPDATE_ONLY_AVAILABLE,
+    GLOBAL_UPDATE_PREFETCH,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_RETENTION_INTERVAL,
+    HISTORY_RETENTION_MB,
+    HISTORY_RETENTION_RUNS,
+    LOG_LOCALE,
+    PROJECT_LOCK_WAIT,
+    REGISTRY_CHECK_INTERVAL,
+    SCHEDULER_CATCH_UP,
+    SCHEDULER_COALESCE,
+    SCHEDULER_JOBSTORE,
+    SCHEDULER_LEADER_RETRY,
+    SCHEDULER_MISFIRE_GRACE_TIME,
+    SCHEDULER_SYNC_INTERVAL,
+    logger,
+    uvicorn_workers,
+)
+from server.database import SessionLocal, engine
 from server.locale.log_messages import t
 from server.models.db import ProjectSettings, ScheduledTask
+from server.services import registry
+from server.services.coordination import LOCKS_DIR, FileLock, Leadership
 from server.services.docker import run_command
-from server.services.projects import compose_stack_allowed, update_single_project_logic
-from server.services.update_logs import persist_update_log
-
-
-global_update_status = {
-    "is_running": False,
-    "total": 0,
-    "current": 0,
-    "current_project": "",
-    "processed": [],
-}
-
-scheduler = BackgroundScheduler()
-
-
-def snapshot_global_update_status() -> dict[str, object]:
-    """Copia defensiva para lectores HTTP (evita compartir la lista `processed` con el job)."""
-    s = global_update_status
-    processed = s.get("processed")
-    if isinstance(processed, list):
-        processed_copy: list[object] = list(processed)
-    else:
-        processed_copy = []
-    return {
-        "is_running": s["is_running"],
-        "total": s["total"],
-        "current": s["current"],
-        "current_project": s["current_project"],
-        "processed": processed_copy,
-    }
-
-
-global_update_lock = Lock()
+from server.services.job_timing import timed_run, track_run_timing
+from server.services.project_cache import project_cache
+from server.services.projects import (
+    compose_stack_allowed,
+    prefetch_compose_images,
+    update_single_project_logic,
+)
+from server.services.retention import enforce_history_retention
+from server.services.stagger import stagger_offsets, stagger_trigger
+from server.services.update_logs import ProjectUpdateReport, persist_update_log
+from server.services.update_queue import QueuedResult, update_queue
+from server.services.update_status import update_status
+
+
+class _SharedEngineJobStore(SQLAlchemyJobStore):
+    """Job store en la tabla apscheduler_jobs de la BD de la app."""
+
+    def shutdown(self) -> None:
+        # El base hace engine.dispose(): el engine es el de la app y sigue en uso.
+        pass
+
+
+def _build_scheduler() -> BackgroundScheduler:
+    jobstores = {}
+    if SCHEDULER_JOBSTORE == "sqlalchemy":
+        # Los jobs (y su próxima ejecución) sobreviven a un reinicio: al arrancar se
+        # recuperan las ejecuciones perdidas según misfire_grace_time y coalesce.
+        jobstores["default"] = _SharedEngineJobStore(engine=engine)
+    built = BackgroundScheduler(
+        jobstores=jobstores,
+        executors={"default": JobThreadPoolExecutor(10)},
+        job_defaults={
+            "misfire_grace_time": SCHEDULER_MISFIRE_GRACE_TIME,
+            "coalesce": SCHEDULER_COALESCE,
+            "max_instances": 1,
+        },
+    )
+    track_run_timing(built)
+    return built
+
+
+scheduler = _build_scheduler()
+REGISTRY_CHECK_JOB_ID = "registry_check"
+HISTORY_RETENTION_JOB_ID = "history_retention"
+SCHEDULES_SYNC_JOB_ID = "schedules_sync"
+
+
+# Lock de fichero: con varios workers solo uno ejecuta la actualización global.
+global_update_lock = FileLock(LOCKS_DIR / "global-update.lock")
+_refresh_lock = Lock()
+# Reconciliaciones fuera del hilo de la petición; una sola a la vez.
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pullpilot-scheduler")
+_pending_refresh_lock = Lock()
+_pending_refresh: Future | None = None
 
 
 def build_trigger(task_type: str, expression: str) -> CronTrigger | DateTrigger:
@@ -75,60 +127,212 @@ def build_trigger(task_type: str, expression: str) -> CronTrigger | DateTrigger:
     raise ValueError(f"Tipo de tarea no soportado: {task_type}")
 
 
+def _split_stacks_without_updates(
+    stacks: list[tuple[str, str]],
+) -> tuple[list[tuple[str, str]], list[str]]:
+    """Separa los stacks que el registry da por al día (solo sin git: un `git pull` puede
+    traer cambios que la comprobación de imágenes no ve).
+
+    Se comprueba ahora y no con el resultado del job periódico, que puede tener horas o no
+    existir en este worker; el digest remoto sale de la caché con TTL. Si no se puede saber,
+    el stack se actualiza."""
+    candidates = [(name, path) for name, path in stacks if not (Path(path) / ".git").is_dir()]
+
+    def _check(stack: tuple[str, str]) -> registry.StackUpdateCheck | None:
+        name, path = stack
+        try:
+            check = registry.check_stack_updates(name, path)
+        except Exception as exc:
+            logger.warning("No se pudo comprobar el registry para %s: %s", name, exc)
+            return None
+        registry.record_stack_check(check)
+        return check
+
+    workers = max(1, min(GLOBAL_PULL_CONCURRENCY, len(candidates)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        checks = dict(zip((name for name, _path in candidates), pool.map(_check, candidates)))
+
+    pending: list[tuple[str, str]] = []
+    skipped: list[str] = []
+    for name, path in stacks:
+        check = checks.get(name)
+        if check is not None and check.updates_available is False:
+            skipped.append(name)
+        else:
+            pending.append((name, path))
+    return pending, skipped
+
+
+def _prefetch_images(stacks: list[tuple[str, str]], loc: str) -> set[str]:
+    """Lanza `compose pull` de todos los stacks en paralelo y devuelve los ya descargados.
+
+    Un fallo aquí no es definitivo: ese stack vuelve a intentar el pull en su actualización
+    y el error queda en su log.
+    """
+    prefetched: set[str] = set()
+    if not stacks:
+        return prefetched
+    total = len(stacks)
+    done = 0
+    with update_status.mutate() as state:
+        state["phase"] = "pull"
+        state["current_project"] = t(
+            "scheduler.status_prefetching", loc, done=0, total=total
+        )
+    logger.info("Descargando imagenes de %s stacks (max %s en paralelo).", total, GLOBAL_PULL_CONCURRENCY)
+    with ThreadPoolExecutor(
+        max_workers=min(GLOBAL_PULL_CONCURRENCY, total), thread_name_prefix="pullpilot-pull"
+    ) as pool:
+        futures = {
+            pool.submit(prefetch_compose_images, path, locale=loc): name for name, path in stacks
+        }
+        for fut in as_completed(futures):
+            name = futures[fut]
+            try:
+                if fut.result():
+                    prefetched.add(name)
+            except Exception as exc:
+                logger.warning("Prefetch fallido para %s (se reintentara al actualizar): %s", name, exc)
+            done += 1
+            with update_status.mutate() as state:
+                state["current_project"] = t(
+                    "scheduler.status_prefetching", loc, done=done, total=total
+                )
+    return prefetched
+
+
+def _update_project_in_own_session(
+    name: str,
+    loc: str,
+    images_prefetched: bool = False,
+    report: ProjectUpdateReport | None = None,
+) -> tuple[bool, list[str]]:
+    """Cada actualización usa su propia sesión: en modo paralelo corren en hilos distintos."""
+    db = SessionLocal()
+    try:
+        return update_single_project_logic(
+            name,
+            db,
+            locale=loc,
+            images_prefetched=images_prefetched,
+            report=report,
+            lock_wait=PROJECT_LOCK_WAIT,
+        )
+    except Exception as exc:
+        return False, [t("scheduler.internal_loop_error", loc, exc=exc)]
+    finally:
+        db.close()
+        registry.forget_stack(name)
+
+
+def _finalize_report(report: ProjectUpdateReport, success: bool) -> ProjectUpdateReport:
+    # La actualización puede fallar antes de rellenarlo (excepción, stack inválido...).
+    # SKIPPED: otro worker tenía el stack bloqueado más de PROJECT_LOCK_WAIT.
+    if report.status != "SKIPPED":
+        report.status = "SUCCESS" if success else "ERROR"
+    if report.finished_at is None:
+        report.finished_at = datetime.datetime.now(datetime.UTC)
+    return report
+
+
+def _run_tracked_update(
+    name: str, loc: str, images_prefetched: bool = False
+) -> QueuedResult[tuple[bool, list[str], ProjectUpdateReport]]:
+    def _update() -> tuple[bool, list[str], ProjectUpdateReport]:
+        update_status.project_started(name)
+        report = ProjectUpdateReport(name, started_at=datetime.datetime.now(datetime.UTC))
+        success, logs = _update_project_in_own_session(name, loc, images_prefetched, report)
+        update_status.project_finished(
+            name, t("log.status_ok", loc) if success else t("log.status_error", loc)
+        )
+        return success, logs, _finalize_report(report, success)
+
+    outcome = update_queue.run(name, _update, source="scheduled")
+    if outcome.deduplicated:
+        # La ejecutó otra petición: el progreso de la global también debe contar este stack.
+        success = outcome.result[0]
+        update_status.project_started(name)
+        update_status.project_finished(
+            name, t("log.status_ok", loc) if success else t("log.status_error", loc)
+        )
+    return outcome
+
+
 def global_update_job(locale: str | None = None) -> None:
     loc = locale if locale is not None else LOG_LOCALE
 
     if not global_update_lock.acquire(blocking=False):
         logger.warning("Actualizacion global ya en curso. Omitiendo tarea.")
         return
+    # Con el backend compartido, la actualización puede estar en marcha en otro worker.
+    if not update_status.begin_run():
+        global_update_lock.release()
+        logger.warning("Actualizacion global ya en curso en otro proceso. Omitiendo tarea.")
+        return
 
-    global_update_status["is_running"] = True
-    global_update_status["processed"] = []
     db = SessionLocal()
     try:
         logger.info("Iniciando tarea programada: Actualizacion Global Segura")
 
         rows = db.query(ProjectSettings).filter(ProjectSettings.excluded.is_(False)).all()
-        projects = [p for p in rows if compose_stack_allowed(Path(p.path))]
-        global_update_status["total"] = len(projects)
-        global_update_status["current"] = 0
-
-        global_logs: dict[str, list[str] | str] = {}
+        stacks = [(p.name, p.path) for p in rows if compose_stack_allowed(Path(p.path))]
+        skipped: list[str] = []
+        if GLOBAL_UPDATE_ONLY_AVAILABLE:
+            stacks, skipped = _split_stacks_without_updates(stacks)
+        names = [name for name, _path in stacks]
+        with update_status.mutate() as state:
+            state["total"] = len(names)
+            state["current"] = 0
+
+        prefetched = _prefetch_images(stacks, loc) if GLOBAL_UPDATE_PREFETCH else set()
+        with update_status.mutate() as state:
+            state["phase"] = "update"
+            state["current_project"] = ""
+
+        results: dict[str, QueuedResult[tuple[bool, list[str], ProjectUpdateReport]]] = {}
+        concurrency = min(GLOBAL_UPDATE_CONCURRENCY, len(names))
+        if concurrency <= 1:
+            for index, name in enumerate(names):
+                if index > 0:
+                    time.sleep(2)
+                results[name] = _run_tracked_update(name, loc, name in prefetched)
+        else:
+            logger.info("Actualizando %s stacks en paralelo (max %s).", len(names), concurrency)
+            with ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix="pullpilot-update"
+            ) as pool:
+                futures = {
+                    name: pool.submit(_run_tracked_update, name, loc, name in prefetched)
+                    for name in names
+                }
+                for name, fut in futures.items():
+                    results[name] = fut.result()
+
+        # Historial en el orden de los proyectos, independientemente del orden de llegada.
+        global_logs: dict[str, list[str] | str] = {
+            name: [t("scheduler.no_updates_available", loc)] for name in skipped
+        }
+        reports = [ProjectUpdateReport(name, status="SKIPPED") for name in skipped]
         success_count = 0
         error_count = 0
-
-        for index, project in enumerate(projects):
-            global_update_status["current"] = index + 1
-            global_update_status["current_project"] = project.name
-
-            if index > 0:
-                time.sleep(2)
-
-            try:
-                success, logs = update_single_project_logic(
-                    project.name, db, locale=loc
-                )
-            except Exception as exc:
-                success = False
-                logs = [t("scheduler.internal_loop_error", loc, exc=exc)]
-
-            global_logs[project.name] = logs
-            global_update_status["processed"].append(
-                {
-                    "name": project.name,
-                    "status": t("log.status_ok", loc)
-                    if success
-                    else t("log.status_error", loc),
-                }
-            )
-
+        for name in names:
+            (success, logs, report), deduplicated = results[name]
+            if deduplicated:
+                # Las filas de update_results ya las guarda la entrada de quien la ejecutó.
+                global_logs[name] = [t("update.deduplicated", loc), *logs]
+            else:
+                global_logs[name] = logs
+                reports.append(report)
+            if report.status == "SKIPPED":
+                continue
             if success:
                 success_count += 1
             else:
                 error_count += 1
 
         if error_count == 0:
-            global_update_status["current_project"] = t("scheduler.status_pruning", loc)
+            with update_status.mutate() as state:
+                state["current_project"] = t("scheduler.status_pruning", loc)
             try:
                 logger.info("Iniciando espera de seguridad de 5s antes del prune...")
                 time.sleep(5)
@@ -156,11 +360,13 @@ def global_update_job(locale: str | None = None) -> None:
             status=status,
             summary=summary,
             details=global_logs,
+            results=reports,
+            locale=loc,
         )
     finally:
         db.close()
-        global_update_status["is_running"] = False
-        global_update_status["current_project"] = ""
+        project_cache.invalidate()
+        update_status.finish_run()
         global_update_lock.release()
 
 
@@ -181,18 +387,39 @@ def job_wrapper(target: str) -> None:
                 target,
             )
             return
-        success, logs = update_single_project_logic(target, db, locale=sloc)
 
-        summary = (
-            t("scheduler.scheduled_ok", sloc, target=target)
-            if success
-            else t("scheduler.scheduled_error", sloc, target=target)
+        def _update() -> tuple[bool, list[str], ProjectUpdateReport]:
+            report = ProjectUpdateReport(target, started_at=datetime.datetime.now(datetime.UTC))
+            success, logs = update_single_project_logic(
+                target, db, locale=sloc, report=report, lock_wait=PROJECT_LOCK_WAIT
+            )
+            return success, logs, _finalize_report(report, success)
+
+        (success, logs, report), deduplicated = update_queue.run(
+            target, _update, source="scheduled"
         )
+        project_cache.invalidate()
+        registry.forget_stack(target)
+        if deduplicated:
+            logger.info(
+                "Tarea programada %s atendida por otra actualizacion en cola; ya esta en el historial.",
+                target,
+            )
+            return
+
+        if report.status == "SKIPPED":
+            summary = t("scheduler.scheduled_skipped", sloc, target=target)
+        elif success:
+            summary = t("scheduler.scheduled_ok", sloc, target=target)
+        else:
+            summary = t("scheduler.scheduled_error", sloc, target=target)
         persist_update_log(
             db,
             status="SUCCESS" if success else "ERROR",
             summary=summary,
             details={target: logs},
+            results=[report],
+            locale=sloc,
         )
     except Exception as exc:
         logger.error("Error en tarea programada %s: %s", target, exc)
@@ -202,6 +429,8 @@ def job_wrapper(target: str) -> None:
                 status="ERROR",
                 summary=t("scheduler.scheduled_exception", sloc, target=target),
                 details={target: [str(exc)]},
+                results=[ProjectUpdateReport(target)],
+                locale=sloc,
             )
         except Exception as log_exc:
             logger.error("No se pudo persistir log de error para %s: %s", target, log_exc)
@@ -209,40 +438,243 @@ def job_wrapper(target: str) -> None:
         db.close()
 
 
-def refresh_scheduler_jobs() -> None:
-    scheduler.remove_all_jobs()
+def scheduled_task_job(job_id: str, target: str) -> None:
+    """Job de una tarea programada: el historial registra para qué hora estaba prevista."""
+    with timed_run(job_id):
+        job_wrapper(target)
+
+
+def registry_check_job() -> None:
+    try:
+        registry.refresh_update_availability()
+    except Exception as exc:
+        logger.error("Error comprobando imagenes nuevas en el registry: %s", exc)
+
+
+def history_retention_job() -> None:
+    try:
+        enforce_history_retention()
+    except Exception as exc:
+        logger.error("Error aplicando la retencion del historial: %s", exc)
+
+
+class _JobSpec(NamedTuple):
+    func: Callable[..., None]
+    trigger: BaseTrigger
+    args: tuple = ()
+    misfire_grace_time: int = SCHEDULER_MISFIRE_GRACE_TIME
+    coalesce: bool = SCHEDULER_COALESCE
+    max_instances: int = 1
+
+
+def _task_job_spec(task: ScheduledTask, trigger: BaseTrigger) -> _JobSpec:
+    # Los campos vacíos de la tarea usan los valores globales.
+    return _JobSpec(
+        scheduled_task_job,
+        trigger,
+        (f"job_{task.id}", task.target),
+        misfire_grace_time=(
+            SCHEDULER_MISFIRE_GRACE_TIME
+            if task.misfire_grace_time is None
+            else task.misfire_grace_time
+        ),
+        coalesce=SCHEDULER_COALESCE if task.coalesce is None else task.coalesce,
+        max_instances=task.max_instances or 1,
+    )
+
+
+def _desired_jobs() -> dict[str, _JobSpec]:
+    jobs: dict[str, _JobSpec] = {}
+    if REGISTRY_CHECK_INTERVAL > 0:
+        jobs[REGISTRY_CHECK_JOB_ID] = _JobSpec(
+            registry_check_job, IntervalTrigger(minutes=REGISTRY_CHECK_INTERVAL)
+        )
+    retention_enabled = HISTORY_RETENTION_DAYS or HISTORY_RETENTION_RUNS or HISTORY_RETENTION_MB
+    if HISTORY_RETENTION_INTERVAL > 0 and retention_enabled:
+        jobs[HISTORY_RETENTION_JOB_ID] = _JobSpec(
+            history_retention_job, IntervalTrigger(hours=HISTORY_RETENTION_INTERVAL)
+        )
+    if uvicorn_workers() > 1 and SCHEDULER_SYNC_INTERVAL > 0:
+        jobs[SCHEDULES_SYNC_JOB_ID] = _JobSpec(
+            schedules_sync_job, IntervalTrigger(seconds=SCHEDULER_SYNC_INTERVAL)
+        )
 
     db = SessionLocal()
-    count = 0
     try:
         tasks = db.query(ScheduledTask).filter(ScheduledTask.active.is_(True)).all()
-
+        offsets = stagger_offsets(tasks)
         for task in tasks:
             try:
-                job_id = f"job_{task.id}"
                 trigger = build_trigger(task.task_type, task.expression)
-                scheduler.add_job(
-                    job_wrapper,
-                    trigger,
-                    args=[task.target],
-                    id=job_id,
-                    replace_existing=True,
-                )
-                count += 1
-            except Exception as exc:
+            except ValueError as exc:
                 logger.error("Error cargando tarea %s: %s", task.id, exc)
+                continue
+            jobs[f"job_{task.id}"] = _task_job_spec(
+                task, stagger_trigger(trigger, task.id, offsets)
+            )
     finally:
         db.close()
+    return jobs
 
-    logger.info("Scheduler refrescado: %s tareas activas.", count)
 
+def _same_job(job: Job, spec: _JobSpec) -> bool:
+    # Los triggers no definen __eq__; su repr incluye todos los campos (y la zona horaria).
+    return job.func is spec.func and tuple(job.args) == spec.args and (
+        str(job.trigger) == str(spec.trigger)
+        and getattr(job.trigger, "timezone", None) == getattr(spec.trigger, "timezone", None)
+        and job.misfire_grace_time == spec.misfire_grace_time
+        and job.coalesce == spec.coalesce
+        and job.max_instances == spec.max_instances
+    )
 
-def start_scheduler() -> None:
+
+def _already_fired(spec: _JobSpec) -> bool:
+    # APScheduler retira los jobs de fecha tras ejecutarlos: no se vuelven a añadir.
+    trigger = spec.trigger
+    return isinstance(trigger, DateTrigger) and trigger.run_date <= datetime.datetime.now(
+        trigger.run_date.tzinfo
+    )
+
+
+def refresh_scheduler_jobs() -> None:
+    """Reconcilia los jobs del scheduler con la BD: solo añade, cambia o quita los que
+    difieren, así que los demás conservan su próxima ejecución."""
+    if not scheduler_leadership.is_leader:
+        # El líder verá el cambio en la BD con schedules_sync_job.
+        return
+    with _refresh_lock:
+        desired = _desired_jobs()
+        current = {job.id: job for job in scheduler.get_jobs()}
+        added = changed = removed = 0
+        for job_id, spec in desired.items():
+            job = current.get(job_id)
+            if job is not None and _same_job(job, spec):
+                continue
+            if job is None and _already_fired(spec):
+                continue
+            scheduler.add_job(
+                spec.func,
+                spec.trigger,
+                args=spec.args,
+                id=job_id,
+                replace_existing=True,
+                misfire_grace_time=spec.misfire_grace_time,
+                coalesce=spec.coalesce,
+                max_instances=spec.max_instances,
+            )
+            if job is None:
+                added += 1
+            else:
+                changed += 1
+        for job_id in current.keys() - desired.keys():
+            scheduler.remove_job(job_id)
+            removed += 1
+
+    if added or changed or removed:
+        logger.info(
+            "Scheduler reconciliado: %s nuevas, %s modificadas, %s eliminadas (%s jobs).",
+            added,
+            changed,
+            removed,
+            len(desired),
+        )
+
+
+def request_scheduler_refresh() -> Future:
+    """Reconcilia en segundo plano (sin bloquear la petición HTTP). Las peticiones que
+    llegan antes de que empiece la reconciliación pendiente se agrupan con ella."""
+    global _pending_refresh
+
+    with _pending_refresh_lock:
+        pending = _pending_refresh
+        if pending is not None and not pending.running() and not pending.done():
+            return pending
+        _pending_refresh = _refresh_executor.submit(_refresh_safely)
+        return _pending_refresh
+
+
+def _refresh_safely() -> None:
+    try:
+        refresh_scheduler_jobs()
+    except Exception as exc:
+        logger.error("Error reconciliando el scheduler: %s", exc)
+
+
+def schedules_sync_job() -> None:
+    """En el worker líder: recoge las tareas que otro worker cambió en la BD."""
+    refresh_scheduler_jobs()
+
+
+def schedule_next_run_time(
+    task: ScheduledTask, offsets: dict[int, int | None]
+) -> datetime.datetime | None:
+    """Próxima ejecución de una tarea; si este worker no tiene el job (no es el líder, o la
+    reconciliación aún no terminó) se calcula a partir del trigger y de `stagger_offsets`."""
+    if not task.active:
+        return None
+    job = scheduler.get_job(f"job_{task.id}")
+    if job is not None:
+        return getattr(job, "next_run_time", None)
+    try:
+        trigger = build_trigger(task.task_type, task.expression)
+    except ValueError:
+        return None
+    now = datetime.datetime.now(datetime.UTC)
+    if isinstance(trigger, DateTrigger):
+        return trigger.run_date if trigger.run_date > now else None
+    return stagger_trigger(trigger, task.id, offsets).get_next_fire_time(None, now)
+
+
+def _catch_up_missed_runs() -> None:
+    """Con el job store persistente, los jobs vuelven con la próxima ejecución que tenían al
+    parar. Con SCHEDULER_CATCH_UP=run APScheduler ejecuta las pendientes (dentro de
+    misfire_grace_time, fundidas si coalesce); con skip se saltan a la siguiente futura."""
+    now = datetime.datetime.now(datetime.UTC)
+    missed = [
+        job
+        for job in scheduler.get_jobs()
+        if job.next_run_time is not None and job.next_run_time < now
+    ]
+    if not missed:
+        return
+    if SCHEDULER_CATCH_UP == "run":
+        logger.info("Recuperando %s ejecuciones programadas perdidas.", len(missed))
+        return
+    for job in missed:
+        next_run = job.trigger.get_next_fire_time(None, now)
+        if next_run is None or next_run < now:
+            scheduler.remove_job(job.id)
+        else:
+            job.modify(next_run_time=next_run)
+    logger.info("Omitidas %s ejecuciones programadas perdidas.", len(missed))
+
+
+def _start_as_leader() -> None:
     if not scheduler.running:
-        scheduler.start()
+        # shutdown() cierra el pool del executor: al recuperar el liderazgo se usa uno nuevo.
+        scheduler.remove_executor("default")
+        scheduler.add_executor(JobThreadPoolExecutor(10), "default")
+        # En pausa hasta decidir qué hacer con las ejecuciones perdidas mientras estaba parado.
+        scheduler.start(paused=True)
+        _catch_up_missed_runs()
     refresh_scheduler_jobs()
+    scheduler.resume()
+
+
+# Con varios workers de uvicorn, solo el que tiene el lock ejecuta el scheduler; el resto
+# toma el relevo si ese worker muere.
+scheduler_leadership = Leadership(
+    FileLock(LOCKS_DIR / "scheduler.lock"),
+    retry=SCHEDULER_LEADER_RETRY,
+    on_elected=_start_as_leader,
+)
+
+
+def start_scheduler() -> None:
+    scheduler_leadership.start()
 
 
 def stop_scheduler() -> None:
     if scheduler.running:
         scheduler.shutdown(wait=False)
+    scheduler_leadership.stop()
@@ -0,0 +1,124 @@
+"""Detección de stacks sin cambios tras `git pull` + `compose pull`.
+
+Funciones puras: reciben `compose config --format json`, el inspect de los contenedores y
+los IDs de las imágenes locales, y deciden si recrear el stack cambiaría algo.
+"""
+from __future__ import annotations
+
+import datetime
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from server.services.docker_api import COMPOSE_SERVICE_LABEL
+
+# Políticas con las que un contenedor parado con código 0 es un servicio one-shot terminado.
+_ONESHOT_RESTART_POLICIES = {None, "", "no", "on-failure"}
+
+
+def parse_docker_time(value: str | None) -> datetime.datetime | None:
+    """Fechas RFC3339 de Docker (con nanosegundos, que `fromisoformat` no admite)."""
+    if not value:
+        return None
+    text = value.replace("Z", "+00:00")
+    main, sep, rest = text.partition(".")
+    if sep:
+        digits = rest[: len(rest) - len(rest.lstrip("0123456789"))]
+        text = f"{main}.{digits[:6]}{rest[len(digits):]}"
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def service_image_refs(config: Mapping[str, Any]) -> dict[str, str] | None:
+    """Imagen de cada servicio; None si alguno se construye localmente o no declara imagen.
+
+    Los servicios con `build:` se reconstruyen en cada `up --build`, así que no se pueden
+    dar por actualizados comparando imágenes.
+    """
+    services = config.get("services") or {}
+    refs: dict[str, str] = {}
+    for name, service in services.items():
+        if not isinstance(service, Mapping) or service.get("build") or not service.get("image"):
+            return None
+        if service.get("scale") == 0 or (service.get("deploy") or {}).get("replicas") == 0:
+            continue
+        refs[name] = str(service["image"])
+    return refs or None
+
+
+def stack_is_current(
+    config: Mapping[str, Any],
+    containers: Iterable[Mapping[str, Any]],
+    image_ids: Mapping[str, str],
+    *,
+    config_mtime: float | None = None,
+) -> bool:
+    """True si cada servicio corre ya la imagen local actual y nada se editó después.
+
+    `image_ids` mapea referencia de imagen -> ID local (`sha256:...`). `config_mtime` es la
+    última modificación de los ficheros compose/.env: si es posterior al último arranque de
+    algún contenedor, el stack puede haber cambiado de configuración y se recrea.
+    """
+    refs = service_image_refs(config)
+    if refs is None:
+        return False
+    services = config.get("services") or {}
+
+    seen: set[str] = set()
+    for data in containers:
+        labels = (data.get("Config") or {}).get("Labels") or {}
+        service = labels.get(COMPOSE_SERVICE_LABEL)
+        if service not in refs:
+            # Huérfano o servicio eliminado: `--remove-orphans` tendría trabajo.
+            return False
+        wanted = image_ids.get(refs[service])
+        if not wanted or data.get("Image") != wanted:
+            return False
+
+        state = data.get("State") or {}
+        if state.get("Status") != "running":
+            restart = services[service].get("restart") or None
+            if state.get("ExitCode") != 0 or restart not in _ONESHOT_RESTART_POLICIES:
+                return False
+
+        if config_mtime is not None:
+            started = parse_docker_time(state.get("StartedAt"))
+            if started is None or started.timestamp() < config_mtime:
+                return False
+        seen.add(service)
+
+    return seen == set(refs)
+
+
+def service_image_ids(containers: Iterable[Mapping[str, Any]]) -> dict[str, dict[str, str]]:
+    """Imagen de cada servicio según sus contenedores: `{servicio: {"image": ref, "id": sha}}`."""
+    images: dict[str, dict[str, str]] = {}
+    for data in containers:
+        labels = (data.get("Config") or {}).get("Labels") or {}
+        service = labels.get(COMPOSE_SERVICE_LABEL)
+        if service and data.get("Image"):
+            images[service] = {
+                "image": str((data.get("Config") or {}).get("Image") or ""),
+                "id": str(data["Image"]),
+            }
+    return images
+
+
+def image_changes(
+    before: Mapping[str, Mapping[str, str]], after: Mapping[str, Mapping[str, str]]
+) -> list[dict[str, str | None]]:
+    """Servicios cuya imagen cambió (o que aparecieron/desaparecieron) entre dos instantáneas."""
+    changes: list[dict[str, str | None]] = []
+    for service in sorted(set(before) | set(after)):
+        old, new = before.get(service) or {}, after.get(service) or {}
+        if old.get("id") != new.get("id"):
+            changes.append(
+                {
+                    "service": service,
+                    "image": new.get("image") or old.get("image"),
+                    "before": old.get("id"),
+                    "after": new.get("id"),
+                }
+            )
+    return changes
@@ -0,0 +1,235 @@
+"""Descubrimiento incremental de stacks bajo PROJECTS_ROOT.
+
+`StackScanner` recuerda el mtime de PROJECTS_ROOT y el de cada subdirectorio: el listado de la
+raíz solo se repite si cambia su mtime (altas, bajas o renombrados) y un stack solo se vuelve a
+examinar si cambia el de su directorio (crear, borrar o renombrar su fichero compose). Con
+inotify (Linux, opcional) ni siquiera se hace stat de los stacks sin eventos; no sirve en NFS,
+donde los cambios hechos desde otra máquina no generan eventos.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import threading
+import time
+from collections.abc import Collection
+from dataclasses import dataclass
+from pathlib import Path
+
+from server.config import logger
+
+# Orden de preferencia de `docker compose` cuando hay varios en el mismo directorio.
+COMPOSE_FILE_NAMES = ("compose.yaml", "compose.yml", "docker-compose.yaml", "docker-compose.yml")
+
+
+def find_compose_file(path: Path) -> Path | None:
+    for name in COMPOSE_FILE_NAMES:
+        candidate = path / name
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+@dataclass(frozen=True)
+class _Entry:
+    mtime: int | None
+    compose_file: Path | None
+
+
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x01000000
+_WATCH_MASK = (
+    _IN_ATTRIB
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+# Un mtime tan reciente puede repetirse en sistemas de ficheros de grano grueso (1 s en algunos
+# NFS): esas entradas no se dan por vistas y se vuelven a examinar en el siguiente scan.
+_SETTLE_NS = 2_000_000_000
+_STALE = object()
+
+
+def _settled(mtime: int) -> int | None:
+    return mtime if time.time_ns() - mtime > _SETTLE_NS else None
+
+
+def _stacks(entries: dict[str, _Entry]) -> dict[str, Path]:
+    return {name: e.compose_file for name, e in entries.items() if e.compose_file is not None}
+
+
+class InotifyWatcher:
+    """Vigila la raíz y cada stack sin hilos: los eventos se leen (sin bloquear) en cada scan."""
+
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._names: dict[int, str | None] = {}
+        self._watched: dict[str | None, int] = {}
+
+    def watch(self, path: Path, name: str | None) -> bool:
+        """`name` None es la propia raíz. False si no se pudo (p. ej. max_user_watches)."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            return False
+        self._names[wd] = name
+        self._watched[name] = wd
+        return True
+
+    def is_watched(self, name: str | None) -> bool:
+        return name in self._watched
+
+    def unwatch(self, name: str | None) -> None:
+        wd = self._watched.pop(name, None)
+        if wd is not None:
+            self._names.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def reset(self) -> None:
+        for name in list(self._watched):
+            self.unwatch(name)
+
+    def drain(self) -> set[str | None] | None:
+        """Nombres con eventos (None = la raíz); None si la cola se desbordó."""
+        changed: set[str | None] = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                raw = data[offset + _EVENT_HEADER.size : offset + _EVENT_HEADER.size + length]
+                offset += _EVENT_HEADER.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                name = self._names.get(wd, _STALE)
+                if name is _STALE:
+                    # Watch ya retirado: quedan eventos en cola de antes de quitarlo.
+                    continue
+                if mask & _IN_IGNORED:
+                    del self._names[wd]
+                    if self._watched.get(name) == wd:
+                        del self._watched[name]
+                changed.add(name)
+                if name is None and raw:
+                    # Evento en la raíz: afecta también a la entrada nombrada.
+                    changed.add(os.fsdecode(raw.rstrip(b"\0")))
+        return None if overflow else changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class StackScanner:
+    def __init__(self, *, ignored: Collection[str] = (), use_inotify: bool = False) -> None:
+        self._ignored = {name.lower() for name in ignored}
+        self._lock = threading.Lock()
+        self._root: Path | None = None
+        self._root_mtime: int | None = None
+        self._entries: dict[str, _Entry] = {}
+        # Aumenta cada vez que cambia el conjunto de stacks o alguno de sus ficheros compose.
+        self.version = 0
+        self._watcher: InotifyWatcher | None = None
+        if use_inotify:
+            try:
+                self._watcher = InotifyWatcher()
+            except (OSError, AttributeError) as exc:
+                logger.warning("inotify no disponible (%s); se usarán solo los mtime.", exc)
+
+    def _reset(self, root: Path | None) -> None:
+        self._root = root
+        self._root_mtime = None
+        self._entries = {}
+        if self._watcher is not None:
+            self._watcher.reset()
+
+    def _examine(self, root: Path, name: str) -> _Entry:
+        path = root / name
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return _Entry(None, None)
+        if not path.is_dir():
+            return _Entry(_settled(mtime), None)
+        if self._watcher is not None and not self._watcher.is_watched(name):
+            self._watcher.watch(path, name)
+        return _Entry(_settled(mtime), find_compose_file(path))
+
+    def _current(self, root: Path, name: str, known: _Entry | None) -> _Entry:
+        if known is not None and known.mtime is not None:
+            try:
+                if (root / name).stat().st_mtime_ns == known.mtime:
+                    return known
+            except OSError:
+                return _Entry(None, None)
+        return self._examine(root, name)
+
+    def scan(self, root: Path) -> dict[str, Path]:
+        """Stacks válidos (nombre -> directorio) en el orden del listado de la raíz."""
+        with self._lock:
+            if root != self._root:
+                self._reset(root)
+            try:
+                root_mtime = root.stat().st_mtime_ns
+            except OSError:
+                if _stacks(self._entries):
+                    self.version += 1
+                self._reset(root)
+                return {}
+
+            watcher = self._watcher
+            changed = watcher.drain() if watcher is not None else None
+            if watcher is not None and not watcher.is_watched(None):
+                watcher.watch(root, None)
+                changed = None
+
+            relist = root_mtime != self._root_mtime or (watcher is not None and changed is None)
+            if relist:
+                try:
+                    names = [entry.name for entry in os.scandir(root)]
+                except OSError:
+                    names = []
+                for gone in self._entries.keys() - set(names):
+                    if watcher is not None:
+                        watcher.unwatch(gone)
+            else:
+                names = list(self._entries)
+
+            entries: dict[str, _Entry] = {}
+            for name in names:
+                if name.lower() in self._ignored:
+                    continue
+                known = self._entries.get(name)
+                if watcher is not None and changed is not None and watcher.is_watched(name):
+                    # Con watch activo basta con los eventos: sin ellos no se toca el disco.
+                    dirty = known is None or name in changed
+                    entries[name] = self._examine(root, name) if dirty else known
+                else:
+                    entries[name] = self._current(root, name, known)
+
+            if _stacks(entries) != _stacks(self._entries):
+                self.version += 1
+            self._entries = entries
+            self._root_mtime = _settled(root_mtime)
+            return {name: root / name for name in _stacks(entries)}
@@ -0,0 +1,86 @@
+"""Escalonado de tareas programadas que comparten expresión cron.
+
+Con muchas tareas `daily` a `0 0 * * *` todos los stacks harían pull a la vez. Las tareas cron
+activas cuya expresión coincide con la de otra se desplazan dentro de SCHEDULER_STAGGER_WINDOW:
+- hash: desfase fijo derivado de la tarea (estable entre reinicios y reconciliaciones);
+- jitter: desfase aleatorio en cada ejecución.
+Aun así coincidan, las actualizaciones pasan por la cola común (`update_queue`).
+"""
+from __future__ import annotations
+
+import datetime
+import hashlib
+from collections import defaultdict
+from collections.abc import Iterable
+
+from apscheduler.triggers.base import BaseTrigger
+
+from server.config import SCHEDULER_STAGGER_MODE, SCHEDULER_STAGGER_WINDOW
+from server.models.db import ScheduledTask
+
+
+class OffsetTrigger(BaseTrigger):
+    """Envuelve otro trigger y retrasa cada disparo `offset` segundos (más `jitter` aleatorio)."""
+
+    def __init__(self, trigger: BaseTrigger, offset: int = 0, jitter: int | None = None) -> None:
+        self.trigger = trigger
+        self.offset = offset
+        self.jitter = jitter
+
+    @property
+    def timezone(self):
+        return getattr(self.trigger, "timezone", None)
+
+    def get_next_fire_time(
+        self, previous_fire_time: datetime.datetime | None, now: datetime.datetime
+    ) -> datetime.datetime | None:
+        delta = datetime.timedelta(seconds=self.offset)
+        previous = previous_fire_time - delta if previous_fire_time else None
+        next_time = self.trigger.get_next_fire_time(previous, now - delta)
+        if next_time is None:
+            return None
+        return self._apply_jitter(next_time + delta, self.jitter, now)
+
+    def __str__(self) -> str:
+        jitter = f", jitter={self.jitter}s" if self.jitter else ""
+        return f"{self.trigger} +{self.offset}s{jitter}"
+
+    def __repr__(self) -> str:
+        return f"<OffsetTrigger ({self.trigger!r}, offset={self.offset}, jitter={self.jitter})>"
+
+
+def _hash_offset(task: ScheduledTask, window: int) -> int:
+    digest = hashlib.sha256(f"{task.id}:{task.target}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") % window
+
+
+def stagger_offsets(tasks: Iterable[ScheduledTask]) -> dict[int, int | None]:
+    """Tareas escalonadas -> desfase fijo en segundos (None en modo jitter, donde cambia en
+    cada ejecución). Las que no aparecen se ejecutan a la hora exacta de su expresión."""
+    if SCHEDULER_STAGGER_WINDOW <= 0:
+        return {}
+    groups: dict[str, list[ScheduledTask]] = defaultdict(list)
+    for task in tasks:
+        if task.active and task.task_type == "cron":
+            groups[" ".join(task.expression.split())].append(task)
+    offsets: dict[int, int | None] = {}
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        for task in group:
+            offsets[task.id] = (
+                None
+                if SCHEDULER_STAGGER_MODE == "jitter"
+                else _hash_offset(task, SCHEDULER_STAGGER_WINDOW)
+            )
+    return offsets
+
+
+def stagger_trigger(
+    trigger: BaseTrigger, task_id: int, offsets: dict[int, int | None]
+) -> BaseTrigger:
+    if task_id not in offsets:
+        return trigger
+    if SCHEDULER_STAGGER_MODE == "jitter":
+        return OffsetTrigger(trigger, jitter=SCHEDULER_STAGGER_WINDOW)
+    return OffsetTrigger(trigger, offsets[task_id] or 0)
@@ -0,0 +1,182 @@
+"""Registro de actualizaciones de un stack lanzadas desde la API.
+
+Cada ejecución es un `UpdateJob` con ID propio que corre como tarea asyncio en el event loop
+del servidor; sus líneas de log se difunden en vivo (SSE) a medida que se producen.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Literal
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from server.config import UPDATE_JOBS_HISTORY, logger
+from server.database import session_scope
+from server.locale.log_messages import t
+from server.services import projects as projects_service
+from server.services import registry
+from server.services.events import Broadcaster
+from server.services.project_cache import project_cache
+from server.services.update_logs import ProjectUpdateReport, persist_update_log
+from server.services.update_queue import update_queue
+
+JobStatus = Literal["running", "success", "error"]
+
+
+@dataclass
+class UpdateJob:
+    project: str
+    locale: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: JobStatus = "running"
+    started_at: datetime.datetime = field(
+        default_factory=lambda: datetime.datetime.now(datetime.UTC)
+    )
+    finished_at: datetime.datetime | None = None
+    success: bool | None = None
+    history_saved: bool = False
+    logs: list[str] = field(default_factory=list)
+    events: Broadcaster = field(default_factory=Broadcaster, repr=False)
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    def to_dict(self, *, include_logs: bool = False) -> dict:
+        data: dict = {
+            "id": self.id,
+            "project": self.project,
+            "status": self.status,
+            "success": self.success,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "history_saved": self.history_saved,
+        }
+        if include_logs:
+            data["logs"] = list(self.logs)
+        return data
+
+
+class UpdateJobRegistry:
+    def __init__(self, *, keep: int = 50) -> None:
+        self._keep = keep
+        self._jobs: OrderedDict[str, UpdateJob] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> UpdateJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list[UpdateJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def running_for(self, project: str) -> UpdateJob | None:
+        with self._lock:
+            return next(
+                (j for j in self._jobs.values() if j.project == project and j.status == "running"),
+                None,
+            )
+
+    def start(self, project: str, *, locale: str) -> UpdateJob:
+        """Lanza la actualización en segundo plano (o devuelve la que ya corre para el stack)."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.project == project and job.status == "running":
+                    return job
+            job = UpdateJob(project=project, locale=locale)
+            self._jobs[job.id] = job
+            self._prune_locked()
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def _prune_locked(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.status != "running"]
+        while len(self._jobs) > self._keep and finished:
+            self._jobs.pop(finished.pop(0))
+
+    async def _run(self, job: UpdateJob) -> None:
+        loc = job.locale
+        job.events.publish("status", job.to_dict())
+        try:
+            await self._update(job)
+        except (Exception, asyncio.CancelledError) as exc:
+            # Sin esto el job quedaría "running" y los clientes SSE esperando para siempre.
+            if isinstance(exc, asyncio.CancelledError):
+                message = f"{t('error.error_prefix', loc)} {t('error.update_cancelled', loc)}"
+            else:
+                message = t("scheduler.internal_loop_error", loc, exc=exc)
+            logger.error("Actualización de %s interrumpida: %r", job.project, exc)
+            job.logs = [*job.logs, message]
+            job.success = False
+            job.status = "error"
+            job.finished_at = datetime.datetime.now(datetime.UTC)
+            job.events.publish("done", job.to_dict())
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+        finally:
+            job.events.close()
+
+    async def _update(self, job: UpdateJob) -> None:
+        loc = job.locale
+
+        def on_output(line: str) -> None:
+            job.events.publish("log", {"line": line})
+
+        async def _update() -> tuple[bool, list[str], ProjectUpdateReport]:
+            report = ProjectUpdateReport(job.project, started_at=job.started_at)
+            try:
+                with session_scope() as db:
+                    success, logs = await projects_service.update_project(
+                        job.project, db, locale=loc, on_output=on_output, report=report
+                    )
+            except Exception as exc:
+                success, logs = False, [t("scheduler.internal_loop_error", loc, exc=exc)]
+            report.status = "SUCCESS" if success else "ERROR"
+            if report.finished_at is None:
+                report.finished_at = datetime.datetime.now(datetime.UTC)
+            return success, logs, report
+
+        (success, logs, report), deduplicated = await update_queue.run_async(
+            job.project, _update, source="manual"
+        )
+        project_cache.invalidate()
+        registry.forget_stack(job.project)
+
+        if deduplicated:
+            # La atendió una petición idéntica que ya estaba en cola: su log llega entero al final
+            # y el historial ya lo guarda quien la ejecutó.
+            for line in logs:
+                on_output(line)
+        else:
+            status_word = t("log.status_ok", loc) if success else t("log.status_error", loc)
+            try:
+                await asyncio.to_thread(
+                    _persist,
+                    status="SUCCESS" if success else "ERROR",
+                    summary=t("summary.project", loc, name=job.project, status=status_word),
+                    details={job.project: logs},
+                    results=[report],
+                    locale=loc,
+                )
+                job.history_saved = True
+            except SQLAlchemyError as exc:
+                logger.error("No se pudo guardar el historial de %s: %s", job.project, exc)
+
+        if not success:
+            logger.error("Actualización fallida para %s:\n%s", job.project, "\n".join(logs))
+        job.logs = logs
+        job.success = success
+        job.status = "success" if success else "error"
+        job.finished_at = datetime.datetime.now(datetime.UTC)
+        job.events.publish("done", job.to_dict())
+
+
+def _persist(**kwargs) -> None:
+    with session_scope() as db:
+        persist_update_log(db, **kwargs)
+
+
+update_jobs = UpdateJobRegistry(keep=UPDATE_JOBS_HISTORY)
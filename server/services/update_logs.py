@@ -1,9 +1,69 @@
+import datetime
 import json
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from server.models.db import UpdateLog
+from server.config import HISTORY_MAX_LOG_BYTES, LOG_LOCALE
+from server.locale.log_messages import t
+from server.services.job_timing import ScheduledRun, current_run
+from server.models.db import UpdateLog, UpdateResult
+
+
+@dataclass
+class ProjectUpdateReport:
+    """Datos de la actualización de un stack que se guardan en `update_results`."""
+
+    project: str
+    # SUCCESS, ERROR o SKIPPED.
+    status: str = "ERROR"
+    started_at: datetime.datetime | None = None
+    finished_at: datetime.datetime | None = None
+    commit_before: str | None = None
+    commit_after: str | None = None
+    image_changes: list[dict] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at).total_seconds(), 3)
+
+    def to_row(self) -> UpdateResult:
+        return UpdateResult(
+            project=self.project,
+            status=self.status,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            duration=self.duration,
+            commit_before=self.commit_before,
+            commit_after=self.commit_after,
+            image_changes=json.dumps(self.image_changes) if self.image_changes else None,
+        )
+
+
+def truncate_log_tail(
+    value: list[str] | str, *, max_bytes: int, locale: str
+) -> list[str] | str:
+    """Conserva el final del log (donde están los errores) dentro de `max_bytes`."""
+    lines = value.splitlines() if isinstance(value, str) else list(value)
+    if not max_bytes or sum(len(line.encode()) + 1 for line in lines) <= max_bytes:
+        return value
+    kept: list[str] = []
+    size = 0
+    for line in reversed(lines):
+        size += len(line.encode()) + 1
+        if size > max_bytes:
+            if not kept:
+                # Una sola línea enorme: se queda su final.
+                kept.append(line.encode()[-max_bytes:].decode("utf-8", errors="ignore"))
+            break
+        kept.append(line)
+    kept.reverse()
+    truncated = [t("history.log_truncated", locale, lines=len(lines) - len(kept)), *kept]
+    return "\n".join(truncated) if isinstance(value, str) else truncated
 
 
 def persist_update_log(
@@ -12,9 +72,27 @@ def persist_update_log(
     status: str,
     summary: str,
     details: dict,
+    results: Iterable[ProjectUpdateReport] = (),
+    locale: str = LOG_LOCALE,
+    scheduled_run: ScheduledRun | None = None,
 ) -> None:
-    """Persist one history row. Rolls back the session on failure and re-raises."""
+    """Persist one history row (and its per-project results). Rolls back the session on
+    failure and re-raises. `scheduled_run` defaults to the scheduler run of this thread."""
+    scheduled_run = scheduled_run or current_run()
+    details = {
+        name: truncate_log_tail(value, max_bytes=HISTORY_MAX_LOG_BYTES, locale=locale)
+        if isinstance(value, (list, str))
+        else value
+        for name, value in details.items()
+    }
     row = UpdateLog(status=status, summary=summary, details=json.dumps(details))
+    if scheduled_run is not None:
+        # Como timestamp: UTC sin zona (APScheduler la da en la zona del scheduler).
+        row.scheduled_for = scheduled_run.scheduled_for.astimezone(datetime.UTC).replace(
+            tzinfo=None
+        )
+        row.run_timing = scheduled_run.timing
+    row.results = [report.to_row() for report in results]
     db.add(row)
     try:
         db.commit()
@@ -0,0 +1,220 @@
+"""Cola central de actualizaciones de stacks (API, tareas programadas y actualización global).
+
+La cola decide el turno y el que pide la actualización la ejecuta en su propio hilo o
+corrutina:
+- un mismo stack nunca se actualiza dos veces a la vez;
+- como mucho UPDATE_QUEUE_CONCURRENCY actualizaciones corren en paralelo;
+- las peticiones manuales pasan por delante de las programadas (FIFO dentro de cada prioridad);
+- una petición para un stack que ya tiene otra pendiente no se repite: espera y recibe el
+  resultado de esa, marcado como `deduplicated` para que solo quien la ejecutó lo guarde en el
+  historial.
+
+Entre workers de uvicorn, la exclusión por stack la da el lock de fichero de `update_project`.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import itertools
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Generic, Literal, NamedTuple, TypeVar
+
+from server.config import UPDATE_QUEUE_CONCURRENCY
+
+UpdateSource = Literal["manual", "scheduled"]
+PRIORITIES: dict[str, int] = {"manual": 0, "scheduled": 1}
+
+T = TypeVar("T")
+
+
+class QueuedResult(NamedTuple, Generic[T]):
+    result: T
+    # True si la ejecutó otra petición idéntica que ya estaba en cola.
+    deduplicated: bool = False
+
+
+@dataclass(eq=False)
+class UpdateTicket:
+    project: str
+    source: UpdateSource
+    priority: int
+    seq: int
+    enqueued_at: datetime.datetime = field(
+        default_factory=lambda: datetime.datetime.now(datetime.UTC)
+    )
+    enqueued_mono: float = field(default_factory=time.monotonic)
+    started_mono: float | None = None
+    # Peticiones atendidas por este ticket (1 + las deduplicadas).
+    requests: int = 1
+    cancelled: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+
+    def sort_key(self) -> tuple[int, int]:
+        return self.priority, self.seq
+
+    def outcome(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class UpdateQueue:
+    def __init__(self, *, concurrency: int) -> None:
+        self.concurrency = max(1, concurrency)
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._pending: list[UpdateTicket] = []
+        self._running: dict[str, UpdateTicket] = {}
+        self._started = 0
+        self._completed = 0
+        self._deduplicated = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _enqueue(self, project: str, source: UpdateSource) -> tuple[UpdateTicket, bool]:
+        priority = PRIORITIES[source]
+        with self._cond:
+            for ticket in self._pending:
+                if ticket.project == project:
+                    ticket.requests += 1
+                    self._deduplicated += 1
+                    if priority < ticket.priority:
+                        ticket.priority, ticket.source = priority, source
+                        self._cond.notify_all()
+                    return ticket, False
+            ticket = UpdateTicket(project, source, priority, next(self._seq))
+            self._pending.append(ticket)
+            return ticket, True
+
+    def _next_startable(self) -> UpdateTicket | None:
+        if len(self._running) >= self.concurrency:
+            return None
+        candidates = [t for t in self._pending if t.project not in self._running]
+        return min(candidates, key=UpdateTicket.sort_key, default=None)
+
+    def _wait_turn(self, ticket: UpdateTicket) -> bool:
+        """Bloquea hasta que le toca; False si se canceló mientras esperaba."""
+        with self._cond:
+            while not ticket.cancelled and self._next_startable() is not ticket:
+                self._cond.wait()
+            if ticket.cancelled:
+                return False
+            self._pending.remove(ticket)
+            self._running[ticket.project] = ticket
+            ticket.started_mono = time.monotonic()
+            waited = ticket.started_mono - ticket.enqueued_mono
+            self._started += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            # Con huecos libres puede arrancar también el siguiente.
+            self._cond.notify_all()
+            return True
+
+    def _finish(
+        self, ticket: UpdateTicket, result: Any = None, error: BaseException | None = None
+    ) -> None:
+        with self._cond:
+            if self._running.get(ticket.project) is ticket:
+                del self._running[ticket.project]
+                self._completed += 1
+            elif ticket in self._pending:
+                self._pending.remove(ticket)
+            ticket.result = result
+            ticket.error = error
+            ticket.done.set()
+            self._cond.notify_all()
+
+    def _abandon(self, ticket: UpdateTicket) -> None:
+        with self._cond:
+            ticket.cancelled = True
+        self._finish(ticket, error=asyncio.CancelledError())
+
+    def run(
+        self, project: str, fn: Callable[[], T], *, source: UpdateSource
+    ) -> QueuedResult[T]:
+        """Ejecuta `fn` en este hilo cuando le toque (o devuelve, con `deduplicated`, el
+        resultado de la petición pendiente idéntica)."""
+        ticket, is_new = self._enqueue(project, source)
+        if not is_new:
+            ticket.done.wait()
+            if ticket.cancelled:
+                # Quien la pidió primero se fue antes de su turno: esta petición sigue en pie.
+                return self.run(project, fn, source=source)
+            return QueuedResult(ticket.outcome(), deduplicated=True)
+        self._wait_turn(ticket)
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._finish(ticket, error=exc)
+            raise
+        self._finish(ticket, result)
+        return QueuedResult(result)
+
+    async def run_async(
+        self, project: str, fn: Callable[[], Awaitable[T]], *, source: UpdateSource
+    ) -> QueuedResult[T]:
+        """Como `run`, para corrutinas: la espera de turno no bloquea el event loop."""
+        ticket, is_new = self._enqueue(project, source)
+        if not is_new:
+            await asyncio.to_thread(ticket.done.wait)
+            if ticket.cancelled:
+                return await self.run_async(project, fn, source=source)
+            return QueuedResult(ticket.outcome(), deduplicated=True)
+        try:
+            await asyncio.to_thread(self._wait_turn, ticket)
+        except asyncio.CancelledError:
+            self._abandon(ticket)
+            raise
+        try:
+            result = await fn()
+        except BaseException as exc:
+            self._finish(ticket, error=exc)
+            raise
+        self._finish(ticket, result)
+        return QueuedResult(result)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            pending = sorted(self._pending, key=UpdateTicket.sort_key)
+            running = list(self._running.values())
+            started = self._started
+            return {
+                "concurrency": self.concurrency,
+                "depth": len(pending),
+                "running": [
+                    {
+                        "project": t.project,
+                        "source": t.source,
+                        "enqueued_at": t.enqueued_at,
+                        "waited": round((t.started_mono or now) - t.enqueued_mono, 3),
+                        "running_for": round(now - (t.started_mono or now), 3),
+                        "requests": t.requests,
+                    }
+                    for t in running
+                ],
+                "pending": [
+                    {
+                        "project": t.project,
+                        "source": t.source,
+                        "position": position,
+                        "enqueued_at": t.enqueued_at,
+                        "waiting": round(now - t.enqueued_mono, 3),
+                        "blocked_by_project": t.project in self._running,
+                        "requests": t.requests,
+                    }
+                    for position, t in enumerate(pending, start=1)
+                ],
+                "completed": self._completed,
+                "deduplicated": self._deduplicated,
+                "avg_wait": round(self._total_wait / started, 3) if started else None,
+                "max_wait": round(self._max_wait, 3),
+            }
+
+
+update_queue = UpdateQueue(concurrency=UPDATE_QUEUE_CONCURRENCY)
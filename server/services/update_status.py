@@ -0,0 +1,308 @@
+"""Estado de la actualización global, compartido por el scheduler y la API.
+
+Todo cambio pasa por `UpdateStatusStore.mutate()`: se aplica bajo lock, incrementa la versión
+y se difunde a los clientes SSE (el ID del evento es la versión). El backend `memory` vive en
+el proceso; el backend `sqlite` guarda el estado en un fichero de DATA_DIR para que todos los
+workers de uvicorn vean lo mismo.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any
+
+from server.config import (
+    UPDATE_STATUS_BACKEND,
+    UPDATE_STATUS_DB_PATH,
+    UPDATE_STATUS_POLL_INTERVAL,
+    logger,
+    uvicorn_workers,
+)
+from server.services.events import Broadcaster, ServerEvent
+
+# Campos internos que no se exponen en la API.
+_PRIVATE_FIELDS = ("owner",)
+
+
+def _initial_state() -> dict[str, Any]:
+    return {
+        "version": 0,
+        "is_running": False,
+        "total": 0,
+        "current": 0,
+        "current_project": "",
+        # "pull" durante la fase previa de descargas, "update" mientras se recrean los stacks.
+        "phase": "",
+        "in_progress": [],
+        "processed": [],
+        "started_at": None,
+        # Por stack: inicio, fin y duración (s) de su actualización en la ejecución en curso.
+        "timings": {},
+        # Proceso que ejecuta la actualización (ver _process_token).
+        "owner": None,
+    }
+
+
+def _now_iso() -> str:
+    return datetime.datetime.now(datetime.UTC).isoformat()
+
+
+def _proc_start_time(pid: int) -> str | None:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="ascii")
+    except OSError:
+        return None
+    # El nombre del proceso (campo 2) puede contener espacios: se parte tras el último ")".
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def _process_token(pid: int | None = None) -> str:
+    """PID más instante de arranque: un PID reutilizado tras un reinicio no cuenta como vivo."""
+    pid = os.getpid() if pid is None else pid
+    return f"{pid}:{_proc_start_time(pid) or ''}"
+
+
+def _owner_alive(token: str | None) -> bool:
+    if not token:
+        return False
+    pid_raw, _, started = token.partition(":")
+    try:
+        pid = int(pid_raw)
+    except ValueError:
+        return False
+    if started:
+        return _proc_start_time(pid) == started
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MemoryStatusBackend:
+    """Estado en el propio proceso (un solo worker)."""
+
+    shared = False
+
+    def __init__(self) -> None:
+        self.instance = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._state = _initial_state()
+
+    def version(self) -> int:
+        return self._state["version"]
+
+    def read(self) -> dict[str, Any]:
+        with self._lock:
+            return copy.deepcopy(self._state)
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            # Se muta una copia: si el bloque falla, el estado publicado no queda a medias.
+            state = copy.deepcopy(self._state)
+            yield state
+            state["version"] = self._state["version"] + 1
+            self._state = state
+
+
+class SqliteStatusBackend:
+    """Una fila JSON en un fichero SQLite; `BEGIN IMMEDIATE` serializa a los escritores de
+    todos los procesos."""
+
+    shared = True
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS update_status ("
+                "id INTEGER PRIMARY KEY CHECK (id = 1), "
+                "instance TEXT NOT NULL, version INTEGER NOT NULL, data TEXT NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO update_status (id, instance, version, data) "
+                "VALUES (1, ?, 0, ?)",
+                (uuid.uuid4().hex[:8], json.dumps(_initial_state())),
+            )
+            (self.instance,) = conn.execute(
+                "SELECT instance FROM update_status WHERE id = 1"
+            ).fetchone()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexión por operación: el estado se toca desde hilos y procesos distintos.
+        return sqlite3.connect(self._path, timeout=30, isolation_level=None)
+
+    def version(self) -> int:
+        with closing(self._connect()) as conn:
+            (version,) = conn.execute("SELECT version FROM update_status WHERE id = 1").fetchone()
+        return version
+
+    def read(self) -> dict[str, Any]:
+        with closing(self._connect()) as conn:
+            version, data = conn.execute(
+                "SELECT version, data FROM update_status WHERE id = 1"
+            ).fetchone()
+        state = json.loads(data)
+        state["version"] = version
+        return state
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version, data = conn.execute(
+                    "SELECT version, data FROM update_status WHERE id = 1"
+                ).fetchone()
+                state = json.loads(data)
+                yield state
+                state["version"] = version + 1
+                conn.execute(
+                    "UPDATE update_status SET version = ?, data = ? WHERE id = 1",
+                    (state["version"], json.dumps(state)),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+
+StatusBackend = MemoryStatusBackend | SqliteStatusBackend
+
+
+def _public(state: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in state.items() if k not in _PRIVATE_FIELDS}
+
+
+class UpdateStatusStore:
+    def __init__(self, backend: StatusBackend) -> None:
+        self._backend = backend
+        self._lock = threading.Lock()
+        # Basta el último evento: un cliente atrasado recibe directamente el estado actual.
+        self.events = Broadcaster(history=1)
+        self._recover_abandoned_run()
+
+    @property
+    def shared(self) -> bool:
+        return self._backend.shared
+
+    def version(self) -> int:
+        return self._backend.version()
+
+    def etag(self, version: int | None = None) -> str:
+        version = self.version() if version is None else version
+        return f'"{self._backend.instance}-{version}"'
+
+    def snapshot(self) -> dict[str, Any]:
+        """Copia para lectores HTTP (no comparte listas con el job)."""
+        return _public(self._backend.read())
+
+    @contextmanager
+    def mutate(self) -> Iterator[dict[str, Any]]:
+        """Cambio atómico del estado; al salir se publica la nueva versión."""
+        # El lock del store también ordena las publicaciones: las versiones salen crecientes.
+        with self._lock:
+            with self._backend.transaction() as state:
+                yield state
+            self.events.publish("status", _public(state), event_id=state["version"])
+
+    def _recover_abandoned_run(self) -> None:
+        # Un proceso que murió a mitad de actualización deja is_running=True en el backend sqlite.
+        state = self._backend.read()
+        if state["is_running"] and not _owner_alive(state.get("owner")):
+            logger.warning("Estado de actualización global huérfano: se marca como terminada.")
+            self.finish_run()
+        else:
+            self.events.publish("status", _public(state), event_id=state["version"])
+
+    def begin_run(self) -> bool:
+        """Marca el inicio de una actualización global; False si otro proceso ya tiene una."""
+        with self.mutate() as state:
+            if state["is_running"] and _owner_alive(state.get("owner")):
+                return False
+            state.update(
+                is_running=True,
+                total=0,
+                current=0,
+                current_project="",
+                phase="",
+                in_progress=[],
+                processed=[],
+                started_at=_now_iso(),
+                timings={},
+                owner=_process_token(),
+            )
+        return True
+
+    def project_started(self, name: str) -> None:
+        with self.mutate() as state:
+            state["current"] += 1
+            state["in_progress"].append(name)
+            state["current_project"] = ", ".join(state["in_progress"])
+            state["timings"][name] = {
+                "started_at": _now_iso(),
+                "finished_at": None,
+                "duration": None,
+            }
+
+    def project_finished(self, name: str, status: str) -> None:
+        with self.mutate() as state:
+            if name in state["in_progress"]:
+                state["in_progress"].remove(name)
+            state["current_project"] = ", ".join(state["in_progress"])
+            finished = datetime.datetime.now(datetime.UTC)
+            timing = state["timings"].setdefault(
+                name, {"started_at": finished.isoformat(), "duration": None}
+            )
+            timing["finished_at"] = finished.isoformat()
+            started = datetime.datetime.fromisoformat(timing["started_at"])
+            timing["duration"] = round((finished - started).total_seconds(), 1)
+            state["processed"].append(
+                {"name": name, "status": status, "duration": timing["duration"]}
+            )
+
+    def finish_run(self) -> None:
+        with self.mutate() as state:
+            state.update(
+                is_running=False, current_project="", phase="", in_progress=[], owner=None
+            )
+
+    async def subscribe(
+        self, last_event_id: int | None = None
+    ) -> AsyncGenerator[ServerEvent, None]:
+        if not self.shared:
+            async for item in self.events.subscribe(last_event_id):
+                yield item
+            return
+        # Los cambios de otros workers no pasan por este proceso: se vigila la versión.
+        seen = last_event_id
+        while True:
+            if await asyncio.to_thread(self.version) != seen:
+                snapshot = await asyncio.to_thread(self.snapshot)
+                seen = snapshot["version"]
+                yield ServerEvent(seen, "status", snapshot)
+            await asyncio.sleep(UPDATE_STATUS_POLL_INTERVAL)
+
+
+def _make_backend() -> StatusBackend:
+    backend = UPDATE_STATUS_BACKEND
+    if backend == "auto":
+        backend = "sqlite" if uvicorn_workers() > 1 else "memory"
+    if backend == "sqlite":
+        return SqliteStatusBackend(UPDATE_STATUS_DB_PATH)
+    return MemoryStatusBackend()
+
+
+update_status = UpdateStatusStore(_make_backend())
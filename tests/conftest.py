@@ -6,12 +6,19 @@ os.environ["AUTH_USER"] = ""
 os.environ["AUTH_PASS"] = ""
 os.environ["ALLOW_NO_AUTH"] = "true"
 os.environ.setdefault("SESSION_SECRET", "pullpilot-test-session-secret")
+# Sin daemon real: los tests que usan la Engine API montan un socket falso (fixture fake_docker).
+os.environ["DOCKER_API_ENABLED"] = "false"
 if "DATA_DIR" not in os.environ:
     os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="pullpilot_test_")
 
+import shutil
+from pathlib import Path
+
 import pytest
 from fastapi.testclient import TestClient
 
+import server.services.docker_api as docker_api_module
+from fake_docker import FakeDockerDaemon
 from server.app import app
 
 
@@ -19,3 +26,15 @@ from server.app import app
 def client() -> TestClient:
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture()
+def fake_docker(monkeypatch: pytest.MonkeyPatch) -> FakeDockerDaemon:
+    # Ruta corta: los sockets unix no admiten rutas de más de ~108 bytes.
+    sock_dir = Path(tempfile.mkdtemp(prefix="ppd"))
+    daemon = FakeDockerDaemon(sock_dir / "docker.sock")
+    with daemon:
+        monkeypatch.setattr(docker_api_module, "DOCKER_API_ENABLED", True)
+        monkeypatch.setattr(docker_api_module, "DOCKER_SOCKET", daemon.socket_path)
+        yield daemon
+    shutil.rmtree(sock_dir, ignore_errors=True)
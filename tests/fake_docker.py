@@ -0,0 +1,213 @@
+"""Daemon Docker falso sobre un socket unix para probar la Engine API sin Docker."""
+from __future__ import annotations
+
+import json
+import queue
+import socketserver
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Any
+
+
+def make_container(
+    container_id: str,
+    *,
+    workdir: str,
+    project: str | None = None,
+    service: str = "app",
+    status: str = "running",
+    health: str | None = None,
+    exit_code: int = 0,
+) -> dict[str, Any]:
+    labels = {
+        "com.docker.compose.project": project or Path(workdir).name,
+        "com.docker.compose.project.working_dir": workdir,
+        "com.docker.compose.service": service,
+    }
+    state: dict[str, Any] = {"Status": status, "Running": status == "running", "ExitCode": exit_code}
+    if health is not None:
+        state["Health"] = {"Status": health}
+    return {"Id": container_id, "Labels": labels, "State": state}
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeDockerDaemon:
+    """Sirve un subconjunto de la API: `/_ping`, `/containers/json`,
+    `/containers/{id}/json` y `/events` (flujo chunked alimentado con `emit`)."""
+
+    def __init__(self, socket_path: Path) -> None:
+        self.socket_path = str(socket_path)
+        self.containers: dict[str, dict[str, Any]] = {}
+        self.requests: list[str] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: _Server | None = None
+        self._subscribers: list[queue.Queue] = []
+        self._closing = threading.Event()
+
+    def add(self, container: dict[str, Any]) -> None:
+        with self._lock:
+            self.containers[container["Id"]] = container
+
+    def set_state(
+        self, container_id: str, *, status: str | None = None, health: str | None = None
+    ) -> None:
+        with self._lock:
+            state = self.containers[container_id]["State"]
+            if status is not None:
+                state["Status"] = status
+                state["Running"] = status == "running"
+            if health is not None:
+                state["Health"] = {"Status": health}
+
+    def emit(self, action: str, container_id: str) -> None:
+        """Publica un evento de contenedor a los clientes conectados a `/events`."""
+        with self._lock:
+            container = self.containers.get(container_id, {})
+            subscribers = list(self._subscribers)
+        payload = {
+            "Type": "container",
+            "Action": action,
+            "status": action,
+            "id": container_id,
+            "Actor": {"ID": container_id, "Attributes": dict(container.get("Labels", {}))},
+        }
+        for q in subscribers:
+            q.put(payload)
+
+    def wait_for_subscribers(self, count: int = 1, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if len(self._subscribers) >= count:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                with daemon._lock:
+                    daemon.connections += 1
+
+            def address_string(self) -> str:
+                return "fake-docker"
+
+            def log_message(self, *_args: Any) -> None:
+                pass
+
+            def _send(self, status: int, payload: Any, content_type: str = "application/json") -> None:
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                parsed = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(parsed.query)
+                with daemon._lock:
+                    daemon.requests.append(parsed.path)
+                    containers = list(daemon.containers.values())
+
+                if parsed.path == "/events":
+                    self._stream_events()
+                    return
+                if parsed.path == "/_ping":
+                    self._send(200, b"OK", "text/plain")
+                    return
+                if parsed.path == "/containers/json":
+                    self._send(200, _filter_containers(containers, query))
+                    return
+                if parsed.path.startswith("/containers/") and parsed.path.endswith("/json"):
+                    cid = urllib.parse.unquote(parsed.path[len("/containers/") : -len("/json")])
+                    match = next((c for c in containers if c["Id"].startswith(cid)), None)
+                    if match is None:
+                        self._send(404, {"message": f"No such container: {cid}"})
+                        return
+                    self._send(200, _inspect_payload(match))
+                    return
+                self._send(404, {"message": "page not found"})
+
+            def _stream_events(self) -> None:
+                q: queue.Queue = queue.Queue()
+                with daemon._lock:
+                    daemon._subscribers.append(q)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.wfile.flush()
+                try:
+                    while not daemon._closing.is_set():
+                        try:
+                            item = q.get(timeout=0.05)
+                        except queue.Empty:
+                            continue
+                        data = json.dumps(item).encode() + b"\n"
+                        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    with daemon._lock:
+                        daemon._subscribers.remove(q)
+                    self.close_connection = True
+
+        return Handler
+
+    def __enter__(self) -> FakeDockerDaemon:
+        self._closing.clear()
+        self._server = _Server(self.socket_path, self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._closing.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _filter_containers(
+    containers: list[dict[str, Any]], query: dict[str, list[str]]
+) -> list[dict[str, Any]]:
+    include_all = query.get("all", ["0"])[0] in ("1", "true")
+    filters = json.loads(query.get("filters", ["{}"])[0])
+    label_filters = filters.get("label", [])
+    out = []
+    for c in containers:
+        if not include_all and c["State"]["Status"] != "running":
+            continue
+        labels = c["Labels"]
+        ok = True
+        for lf in label_filters:
+            key, sep, value = lf.partition("=")
+            if key not in labels or (sep and labels[key] != value):
+                ok = False
+                break
+        if ok:
+            out.append({"Id": c["Id"], "Labels": labels, "State": c["State"]["Status"]})
+    return out
+
+
+def _inspect_payload(container: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "Id": container["Id"],
+        "State": container["State"],
+        "Config": {"Labels": container["Labels"]},
+    }
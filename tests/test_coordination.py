@@ -0,0 +1,104 @@
+import asyncio
+import subprocess
+import sys
+import threading
+
+import server.services.projects as projects_module
+from server.services.coordination import FileLock, Leadership, project_lock
+from server.services.update_logs import ProjectUpdateReport
+
+HOLDER = """
+import sys
+from pathlib import Path
+from server.services.coordination import FileLock
+
+lock = FileLock(Path(sys.argv[1]))
+lock.acquire()
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def test_file_lock_is_exclusive_across_processes(tmp_path) -> None:
+    path = tmp_path / "locks" / "shared.lock"
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLDER, str(path)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "ready"
+        lock = FileLock(path)
+        assert lock.acquire(blocking=False) is False
+        # Al morir el proceso el kernel suelta el lock.
+        holder.kill()
+        holder.wait()
+        assert lock.acquire(blocking=False) is True
+        lock.release()
+    finally:
+        if holder.poll() is None:
+            holder.kill()
+            holder.wait()
+
+
+def test_file_lock_excludes_threads_of_the_same_process(tmp_path) -> None:
+    first = FileLock(tmp_path / "a.lock")
+    second = FileLock(tmp_path / "a.lock")
+    with first:
+        result: list[bool] = []
+        worker = threading.Thread(target=lambda: result.append(second.acquire(blocking=False)))
+        worker.start()
+        worker.join()
+        assert result == [False]
+    assert second.acquire(blocking=False) is True
+    second.release()
+
+
+def test_leadership_fails_over_when_leader_stops(tmp_path) -> None:
+    elected: list[str] = []
+    elected_event = threading.Event()
+
+    def _on_elected(name: str):
+        def _callback() -> None:
+            elected.append(name)
+            elected_event.set()
+
+        return _callback
+
+    leader = Leadership(FileLock(tmp_path / "s.lock"), retry=0.05, on_elected=_on_elected("a"))
+    standby = Leadership(FileLock(tmp_path / "s.lock"), retry=0.05, on_elected=_on_elected("b"))
+    leader.start()
+    elected_event.clear()
+    standby.start()
+    assert elected == ["a"]
+    assert leader.is_leader and not standby.is_leader
+
+    leader.stop()
+    assert elected_event.wait(2)
+    assert elected == ["a", "b"]
+    assert standby.is_leader
+    standby.stop()
+
+
+def test_update_project_refuses_stack_locked_elsewhere() -> None:
+    lock = project_lock("locked-stack")
+    with lock:
+        success, logs = asyncio.run(
+            projects_module.update_project("locked-stack", None, locale="en")
+        )
+    assert success is False
+    assert "already being updated" in logs[0]
+
+
+def test_update_project_skips_stack_still_locked_after_waiting() -> None:
+    report = ProjectUpdateReport("busy-stack")
+    with project_lock("busy-stack"):
+        success, logs = asyncio.run(
+            projects_module.update_project(
+                "busy-stack", None, locale="en", report=report, lock_wait=0.2
+            )
+        )
+    assert success is True
+    assert report.status == "SKIPPED"
+    assert "another worker" in logs[0]
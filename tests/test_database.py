@@ -0,0 +1,62 @@
+import threading
+
+from server.database import Base, create_sqlite_engine
+from server.models.db import UpdateLog
+from server.services.update_logs import persist_update_log
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+
+
+def test_file_engine_enables_wal_and_pragmas(tmp_path) -> None:
+    engine = create_sqlite_engine(tmp_path / "pp.db")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    engine.dispose()
+
+
+def test_reads_do_not_fail_while_history_is_written(tmp_path) -> None:
+    engine = create_sqlite_engine(tmp_path / "pp.db")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    writes = 200
+    details = {"stack": ["line " * 40] * 50}
+    errors: list[Exception] = []
+    done = threading.Event()
+    reads = [0]
+
+    def writer() -> None:
+        try:
+            with Session() as db:
+                for i in range(writes):
+                    persist_update_log(db, status="SUCCESS", summary=f"run {i}", details=details)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            done.set()
+
+    def reader() -> None:
+        try:
+            while not done.is_set():
+                with Session() as db:
+                    db.execute(
+                        select(UpdateLog.id).order_by(UpdateLog.timestamp.desc()).limit(20)
+                    ).all()
+                reads[0] += 1
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader) for _ in range(4)
+    ]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join(timeout=60)
+
+    assert not errors
+    assert reads[0] > 0
+    with Session() as db:
+        assert db.scalar(select(func.count(UpdateLog.id))) == writes
+    engine.dispose()
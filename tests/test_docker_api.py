@@ -0,0 +1,87 @@
+import pytest
+import server.services.projects as projects_module
+from fake_docker import FakeDockerDaemon, make_container
+from server.services.docker_api import (
+    DockerAPIError,
+    DockerEngineClient,
+    container_workdir,
+    get_docker_client,
+)
+
+
+def test_client_reuses_keepalive_connections(fake_docker: FakeDockerDaemon) -> None:
+    fake_docker.add(make_container("a" * 64, workdir="/stacks/web"))
+    client = DockerEngineClient(fake_docker.socket_path, pool_size=2)
+    try:
+        assert client.ping()
+        for _ in range(5):
+            assert len(client.list_containers()) == 1
+    finally:
+        client.close()
+    assert fake_docker.connections == 1
+
+
+def test_list_compose_containers_filters_by_project(fake_docker: FakeDockerDaemon) -> None:
+    fake_docker.add(make_container("a" * 64, workdir="/stacks/web"))
+    fake_docker.add(make_container("b" * 64, workdir="/stacks/db"))
+    fake_docker.add(make_container("c" * 64, workdir="/stacks/db", status="exited"))
+    client = DockerEngineClient(fake_docker.socket_path)
+
+    running = client.list_compose_containers(project="db")
+    assert [c["Id"] for c in running] == ["b" * 64]
+    assert len(client.list_compose_containers(project="db", all=True)) == 2
+
+
+def test_inspect_containers_skips_vanished(fake_docker: FakeDockerDaemon) -> None:
+    fake_docker.add(make_container("a" * 64, workdir="/stacks/web", health="healthy"))
+    client = DockerEngineClient(fake_docker.socket_path)
+
+    data = client.inspect_containers(["a" * 64, "f" * 64])
+    assert len(data) == 1
+    assert data[0]["State"]["Health"]["Status"] == "healthy"
+
+
+def test_missing_socket_raises_api_error(tmp_path) -> None:
+    client = DockerEngineClient(str(tmp_path / "nope.sock"))
+    assert client.ping() is False
+    with pytest.raises(DockerAPIError):
+        client.list_containers()
+
+
+def test_compose_ids_use_api_instead_of_cli(
+    fake_docker: FakeDockerDaemon, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fake_docker.add(make_container("a" * 64, workdir="/stacks/web"))
+    fake_docker.add(make_container("b" * 64, workdir="/stacks/other"))
+
+    def _no_cli(*_args, **_kwargs):
+        raise AssertionError("no debería usarse el CLI")
+
+    monkeypatch.setattr(projects_module, "run_command", _no_cli)
+    assert get_docker_client() is not None
+    ids = projects_module._compose_ps_q_ids("/stacks/web", log_exec=False)
+    assert ids == ["a" * 64]
+
+
+def test_compose_ids_fall_back_to_cli_without_socket(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[object] = []
+
+    def _fake_cli(cmd, *_args, **_kwargs):
+        calls.append(cmd)
+        return "abc\n\ndef\n"
+
+    monkeypatch.setattr(projects_module, "run_command", _fake_cli)
+    assert projects_module._compose_ps_q_ids("/stacks/web", log_exec=False) == ["abc", "def"]
+    assert len(calls) == 1
+
+
+def test_event_stream_delivers_container_events(fake_docker: FakeDockerDaemon) -> None:
+    fake_docker.add(make_container("a" * 64, workdir="/stacks/web"))
+    client = DockerEngineClient(fake_docker.socket_path)
+
+    with client.events(filters={"type": ["container"]}, timeout=5) as stream:
+        assert fake_docker.wait_for_subscribers()
+        fake_docker.emit("die", "a" * 64)
+        event = next(iter(stream))
+    assert event["Action"] == "die"
+    assert container_workdir(event) == "/stacks/web"
@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import server.services.projects as projects_module
+from fake_docker import FakeDockerDaemon, make_container
+from server.services.health import classify_stack_health
+
+WORKDIR = "/stacks/web"
+INSPECT_DIR = Path(__file__).parent / "data" / "docker_inspect"
+
+
+def _recorded(name: str) -> list[dict]:
+    return json.loads((INSPECT_DIR / name).read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize(
+    ("payload", "healthy", "starting", "failed"),
+    [
+        ("healthy_stack.json", 2, 0, []),
+        ("starting_stack.json", 1, 1, []),
+        ("oneshot_exited_zero.json", 1, 1, []),
+        ("exited_error_stack.json", 1, 0, [("exited", 137)]),
+        ("unhealthy_stack.json", 0, 0, [("unhealthy", None)]),
+        ("restarting_stack.json", 1, 0, [("restarting", None)]),
+    ],
+)
+def test_classify_recorded_inspect_payloads(payload, healthy, starting, failed) -> None:
+    result = classify_stack_health(_recorded(payload))
+    assert len(result.healthy) == healthy
+    assert len(result.starting) == starting
+    assert [(f.reason, f.exit_code) for f in result.failed] == failed
+    assert result.converged is (payload == "healthy_stack.json")
+
+
+def test_classify_empty_inspect_is_not_converged() -> None:
+    assert classify_stack_health([]).converged is False
+
+
+def test_failure_message_uses_short_id() -> None:
+    failure = classify_stack_health(_recorded("exited_error_stack.json")).failed[0]
+    message = failure.message("en")
+    assert "e9f0a1b2c3d4" in message
+    assert "137" in message
+
+
+def test_cli_inspect_is_one_batched_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    payload = _recorded("starting_stack.json")
+    calls: list[list[str]] = []
+
+    def _fake_cli(cmd, *_args, **_kwargs):
+        calls.append(cmd)
+        return json.dumps(payload)
+
+    monkeypatch.setattr(projects_module, "run_command", _fake_cli)
+    ids = [c["Id"] for c in payload]
+    assert projects_module._compose_health_converged(ids, locale="en") is False
+    assert calls == [["docker", "inspect", *ids]]
+
+
+def test_cli_inspect_skips_vanished_container(monkeypatch: pytest.MonkeyPatch) -> None:
+    payload = _recorded("healthy_stack.json")
+    by_id = {c["Id"]: c for c in payload}
+
+    def _fake_cli(cmd, *_args, **_kwargs):
+        ids = cmd[2:]
+        if any(i not in by_id for i in ids):
+            raise RuntimeError("Error: No such object")
+        return json.dumps([by_id[i] for i in ids])
+
+    monkeypatch.setattr(projects_module, "run_command", _fake_cli)
+    inspected = projects_module._inspect_containers([*by_id, "gone"], locale="en")
+    assert [c["Id"] for c in inspected] == list(by_id)
+
+
+def _later(delay: float, fn) -> threading.Thread:
+    def run() -> None:
+        time.sleep(delay)
+        fn()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_health_wait_resolves_on_health_event(
+    fake_docker: FakeDockerDaemon, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cid = "a" * 64
+    fake_docker.add(make_container(cid, workdir=WORKDIR, health="starting"))
+    # Sin eventos, la siguiente reevaluación tardaría 30 s: la prueba falla si no se usan.
+    monkeypatch.setattr(projects_module, "HEALTH_RECHECK_SECONDS", 30.0)
+    logs: list[tuple] = []
+
+    def become_healthy() -> None:
+        fake_docker.wait_for_subscribers()
+        fake_docker.set_state(cid, health="healthy")
+        fake_docker.emit("health_status: healthy", cid)
+
+    _later(0.2, become_healthy)
+    start = time.monotonic()
+    projects_module._wait_for_compose_healthy(
+        WORKDIR, lambda *a: logs.append(a), locale="en"
+    )
+    assert time.monotonic() - start < 5
+    assert logs and logs[-1][1] == "SUCCESS"
+
+
+def test_health_wait_fails_fast_on_unhealthy_event(
+    fake_docker: FakeDockerDaemon, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cid = "b" * 64
+    fake_docker.add(make_container(cid, workdir=WORKDIR, health="starting"))
+    monkeypatch.setattr(projects_module, "HEALTH_RECHECK_SECONDS", 30.0)
+
+    def become_unhealthy() -> None:
+        fake_docker.wait_for_subscribers()
+        fake_docker.set_state(cid, health="unhealthy")
+        fake_docker.emit("health_status: unhealthy", cid)
+
+    _later(0.2, become_unhealthy)
+    with pytest.raises(RuntimeError, match="unhealthy"):
+        projects_module._wait_for_compose_healthy(WORKDIR, lambda *a: None, locale="en")
+
+
+def test_health_wait_ignores_other_stacks(
+    fake_docker: FakeDockerDaemon, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cid = "c" * 64
+    other = "d" * 64
+    fake_docker.add(make_container(cid, workdir=WORKDIR, health="starting"))
+    fake_docker.add(make_container(other, workdir="/stacks/other", health="starting"))
+    monkeypatch.setattr(projects_module, "HEALTH_RECHECK_SECONDS", 0.3)
+    monkeypatch.setattr(projects_module, "HEALTHCHECK_TIMEOUT", 1)
+
+    def other_dies() -> None:
+        fake_docker.wait_for_subscribers()
+        fake_docker.set_state(other, status="exited", health="unhealthy")
+        fake_docker.emit("die", other)
+
+    _later(0.1, other_dies)
+    with pytest.raises(RuntimeError, match="Timeout"):
+        projects_module._wait_for_compose_healthy(WORKDIR, lambda *a: None, locale="en")
+
+
+def test_health_wait_polls_without_engine_api(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(projects_module, "_compose_ps_q_ids", lambda *a, **k: ["x" * 64])
+    states = iter(["starting", "healthy"])
+    monkeypatch.setattr(
+        projects_module,
+        "_inspect_containers",
+        lambda ids, **k: [
+            {"Id": ids[0], "State": {"Status": "running", "Health": {"Status": next(states)}}}
+        ],
+    )
+    sleeps: list[float] = []
+    monkeypatch.setattr(projects_module.time, "sleep", sleeps.append)
+
+    projects_module._wait_for_compose_healthy(WORKDIR, lambda *a: None, locale="en")
+    assert sleeps == [2.0]
@@ -0,0 +1,268 @@
+import datetime
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from server.database import SessionLocal, engine
+from server.migrations import run_migrations
+from server.services.coordination import LOCKS_DIR, FileLock
+from server.models.db import UpdateLog, UpdateResult
+from sqlalchemy import text
+
+BASE_TIME = datetime.datetime(2026, 3, 1, 12, 0, tzinfo=datetime.UTC)
+
+
+@pytest.fixture
+def history_rows(client):
+    db = SessionLocal()
+    try:
+        db.query(UpdateLog).delete()
+        for i in range(25):
+            status = "ERROR" if i % 5 == 0 else "SUCCESS"
+            log = UpdateLog(
+                # Pares de filas con el mismo timestamp: el cursor debe desempatar por id.
+                timestamp=BASE_TIME + datetime.timedelta(minutes=i // 2),
+                status=status,
+                summary=f"run {i}",
+                details=json.dumps({f"stack-{i % 3}": [f"log {i}"]}),
+            )
+            log.results = [UpdateResult(project=f"stack-{i % 3}", status=status, duration=i)]
+            db.add(log)
+        db.commit()
+        yield
+        db.query(UpdateLog).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _pages(client: TestClient, **params) -> list[list[dict]]:
+    pages: list[list[dict]] = []
+    cursor = None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/history", params=query)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+
+
+def test_history_keyset_pagination_walks_every_row_once(client, history_rows) -> None:
+    pages = _pages(client, limit=10)
+    assert [len(p) for p in pages] == [10, 10, 5]
+    summaries = [row["summary"] for page in pages for row in page]
+    assert summaries == [f"run {i}" for i in range(24, -1, -1)]
+    assert all(row["details"] is None for page in pages for row in page)
+
+
+def test_history_filters(client, history_rows) -> None:
+    errors = client.get("/api/history", params={"status": "ERROR", "limit": 50}).json()
+    assert [r["summary"] for r in errors] == ["run 20", "run 15", "run 10", "run 5", "run 0"]
+
+    stack = client.get("/api/history", params={"project": "stack-1", "limit": 50}).json()
+    assert {r["summary"] for r in stack} == {f"run {i}" for i in range(25) if i % 3 == 1}
+
+    window = client.get(
+        "/api/history",
+        params={
+            "since": (BASE_TIME + datetime.timedelta(minutes=10)).isoformat(),
+            "until": (BASE_TIME + datetime.timedelta(minutes=11)).isoformat(),
+        },
+    ).json()
+    assert [r["summary"] for r in window] == ["run 21", "run 20"]
+
+
+def test_history_details_on_request(client, history_rows) -> None:
+    newest = client.get("/api/history", params={"limit": 1, "include_details": "true"}).json()[0]
+    assert json.loads(newest["details"]) == {"stack-0": ["log 24"]}
+
+    entry = client.get(f"/api/history/{newest['id']}")
+    assert entry.json()["details"] is None
+    entry = client.get(f"/api/history/{newest['id']}", params={"include_details": "true"})
+    assert entry.json()["details"] == newest["details"]
+    assert client.get("/api/history/999999").status_code == 404
+
+
+def test_history_details_are_stored_compressed_and_streamed(client, history_rows) -> None:
+    newest = client.get("/api/history", params={"limit": 1}).json()[0]
+    with engine.connect() as conn:
+        kind = conn.execute(
+            text("SELECT typeof(details) FROM logs WHERE id = :id"), {"id": newest["id"]}
+        ).scalar()
+    assert kind == "blob"
+
+    url = f"/api/history/{newest['id']}/details"
+    deflated = client.get(url, headers={"Accept-Encoding": "deflate"})
+    assert deflated.headers["content-encoding"] == "deflate"
+    assert deflated.json() == {"stack-0": ["log 24"]}
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == {"stack-0": ["log 24"]}
+    assert client.get("/api/history/999999/details").status_code == 404
+
+
+def test_history_details_without_details_is_no_content(client) -> None:
+    db = SessionLocal()
+    try:
+        row = UpdateLog(status="SUCCESS", summary="empty", details="")
+        db.add(row)
+        db.commit()
+        log_id = row.id
+    finally:
+        db.close()
+    response = client.get(f"/api/history/{log_id}/details")
+    # El registro existe: no es un 404.
+    assert response.status_code == 204
+    assert response.content == b""
+
+
+def test_legacy_plain_text_details_are_read_and_compressed_by_migration(client) -> None:
+    db = SessionLocal()
+    try:
+        db.query(UpdateLog).delete()
+        db.commit()
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO logs (timestamp, status, summary, details) "
+                    "VALUES ('2025-01-01 00:00:00', 'SUCCESS', 'old', :details)"
+                ),
+                {"details": json.dumps({"legacy": ["plain"]})},
+            )
+        row_id = db.query(UpdateLog.id).scalar()
+        url = f"/api/history/{row_id}/details"
+        assert client.get(url).json() == {"legacy": ["plain"]}
+
+        with engine.begin() as conn:
+            conn.execute(
+                text("DELETE FROM schema_migrations WHERE id = '0003_compress_history_details'")
+            )
+        assert run_migrations(engine) == ["0003_compress_history_details"]
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT typeof(details) FROM logs")).scalar() == "blob"
+        assert client.get(url).json() == {"legacy": ["plain"]}
+    finally:
+        db.query(UpdateLog).delete()
+        db.commit()
+        db.close()
+
+
+def test_long_project_logs_keep_their_tail(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    import server.services.update_logs as update_logs_module
+
+    monkeypatch.setattr(update_logs_module, "HISTORY_MAX_LOG_BYTES", 100)
+    lines = [f"line {i:03d}" for i in range(100)]
+    assert update_logs_module.truncate_log_tail(lines, max_bytes=0, locale="en") == lines
+
+    db = SessionLocal()
+    try:
+        update_logs_module.persist_update_log(
+            db, status="ERROR", summary="long", details={"web": lines}, locale="en"
+        )
+        row = db.query(UpdateLog).order_by(UpdateLog.id.desc()).first()
+        kept = json.loads(row.details)["web"]
+        db.delete(row)
+        db.commit()
+    finally:
+        db.close()
+    # 9 bytes por línea (con el salto): caben 11.
+    assert kept[0] == "[... log truncated: 89 earlier line(s) omitted ...]"
+    assert kept[1:] == lines[-11:]
+
+
+def test_history_rejects_invalid_cursor(client) -> None:
+    assert client.get("/api/history", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_migrations_create_history_index_once(client) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_logs_timestamp_id"))
+        conn.execute(text("DELETE FROM schema_migrations"))
+    assert run_migrations(engine) == [
+        "0001_logs_timestamp_index",
+        "0002_backfill_update_results",
+        "0003_compress_history_details",
+        "0004_incremental_auto_vacuum",
+        "0005_schedule_options_and_run_timing",
+    ]
+    assert run_migrations(engine) == []
+    with engine.connect() as conn:
+        indexes = conn.execute(text("PRAGMA index_list('logs')")).all()
+    assert "ix_logs_timestamp_id" in {row[1] for row in indexes}
+
+
+def test_migrations_wait_for_another_worker(client) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM schema_migrations WHERE id = '0001_logs_timestamp_index'"))
+    results: list[list[str]] = []
+    other_worker = FileLock(LOCKS_DIR / "migrations.lock")
+    with other_worker:
+        waiting = threading.Thread(target=lambda: results.append(run_migrations(engine)))
+        waiting.start()
+        waiting.join(0.2)
+        assert waiting.is_alive()
+        # El otro worker registra la migración mientras tiene el lock.
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_migrations (id) VALUES ('0001_logs_timestamp_index')")
+            )
+    waiting.join(2)
+    # Al entrar relee las registradas: no repite la que aplicó el otro.
+    assert results == [[]]
+
+
+def test_backfill_builds_results_from_details(client) -> None:
+    db = SessionLocal()
+    try:
+        db.query(UpdateLog).delete()
+        single = UpdateLog(status="ERROR", summary="one", details=json.dumps({"solo": ["x"]}))
+        global_run = UpdateLog(
+            status="ERROR",
+            summary="global",
+            details=json.dumps(
+                {
+                    "ok": ["[INFO] ...", "=== PROCESS COMPLETED SUCCESSFULLY ==="],
+                    "bad": ["[ERR] boom"],
+                    "idle": ["Omitido: el registry no tiene imagenes nuevas para este stack."],
+                    "safe_cleanup": "skipped",
+                }
+            ),
+        )
+        broken = UpdateLog(status="SUCCESS", summary="legacy", details="not json")
+        db.add_all([single, global_run, broken])
+        db.commit()
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM schema_migrations WHERE id = '0002_backfill_update_results'"))
+        assert run_migrations(engine) == ["0002_backfill_update_results"]
+
+        results = {
+            (r.log.summary, r.project): r.status for r in db.query(UpdateResult).all()
+        }
+        assert results == {
+            ("one", "solo"): "ERROR",
+            ("global", "ok"): "SUCCESS",
+            ("global", "bad"): "ERROR",
+            ("global", "idle"): "SKIPPED",
+        }
+    finally:
+        db.query(UpdateLog).delete()
+        db.commit()
+        db.close()
+
+
+def test_project_stats_and_entry_results(client, history_rows) -> None:
+    stats = {s["project"]: s for s in client.get("/api/history/projects").json()}
+    # stack-0: i = 0, 3, ..., 24 -> 9 ejecuciones; fallan las múltiplos de 5 (0, 15).
+    assert stats["stack-0"]["runs"] == 9
+    assert stats["stack-0"]["failures"] == 2
+    assert stats["stack-0"]["success_rate"] == round(7 / 9, 4)
+    assert stats["stack-0"]["avg_duration"] == 12.0
+
+    newest = client.get("/api/history", params={"limit": 1}).json()[0]
+    assert newest["results"] is None
+    entry = client.get(f"/api/history/{newest['id']}").json()
+    assert entry["results"][0]["project"] == "stack-0"
+    assert entry["results"][0]["image_changes"] == []
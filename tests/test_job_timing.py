@@ -0,0 +1,99 @@
+import datetime
+import threading
+
+import server.services.job_timing as job_timing
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from server.database import SessionLocal
+from server.models.db import UpdateLog
+from server.services.job_timing import (
+    ScheduledRun,
+    classify_run,
+    current_run,
+    timed_run,
+    track_run_timing,
+)
+from server.services.update_logs import persist_update_log
+
+UTC = datetime.UTC
+
+
+def test_classify_run() -> None:
+    now = datetime.datetime(2026, 1, 1, 3, 0, tzinfo=UTC)
+    assert classify_run(now - datetime.timedelta(seconds=5), now=now).timing == "on_time"
+    assert classify_run(now - datetime.timedelta(minutes=10), now=now).timing == "late"
+    local = now.astimezone(datetime.timezone(datetime.timedelta(hours=-5)))
+    assert classify_run(local, now=now).timing == "on_time"
+    merged = classify_run(now, runs=3, now=now)
+    assert (merged.timing, merged.runs) == ("coalesced", 3)
+
+
+def _run_in_scheduler(coalesce: bool) -> ScheduledRun:
+    seen: list[ScheduledRun | None] = []
+    done = threading.Event()
+
+    def _record() -> None:
+        with timed_run("timed"):
+            seen.append(current_run())
+        done.set()
+
+    scheduler = BackgroundScheduler(timezone=UTC)
+    track_run_timing(scheduler)
+    start = datetime.datetime.now(UTC) - datetime.timedelta(minutes=5, seconds=30)
+    scheduler.add_job(
+        _record,
+        IntervalTrigger(minutes=1, start_date=start),
+        id="timed",
+        misfire_grace_time=3600,
+        coalesce=coalesce,
+        next_run_time=start,
+    )
+    scheduler.start()
+    try:
+        assert done.wait(2)
+    finally:
+        scheduler.shutdown(wait=False)
+    assert current_run() is None
+    return seen[0]
+
+
+def test_scheduler_reports_coalesced_runs() -> None:
+    run = _run_in_scheduler(coalesce=True)
+    assert (run.timing, run.runs) == ("coalesced", 6)
+
+
+def test_scheduler_reports_late_runs() -> None:
+    run = _run_in_scheduler(coalesce=False)
+    assert (run.timing, run.runs) == ("late", 1)
+
+
+def test_timed_run_outside_the_scheduler_has_no_timing(monkeypatch) -> None:
+    monkeypatch.setattr(job_timing, "_SUBMISSION_WAIT", 0.01)
+    with timed_run("never-submitted") as run:
+        assert run is None
+        assert current_run() is None
+
+
+def test_history_records_run_timing(client) -> None:
+    # Hora local del scheduler (UTC+2): se guarda en UTC sin zona, como timestamp.
+    local_tz = datetime.timezone(datetime.timedelta(hours=2))
+    scheduled_for = datetime.datetime(2026, 1, 1, 5, 0, tzinfo=local_tz)
+    db = SessionLocal()
+    try:
+        persist_update_log(
+            db,
+            status="SUCCESS",
+            summary="cron",
+            details={},
+            locale="en",
+            scheduled_run=ScheduledRun(scheduled_for, "coalesced", 2),
+        )
+        log_id = db.query(UpdateLog.id).order_by(UpdateLog.id.desc()).scalar()
+    finally:
+        db.close()
+
+    entry = client.get(f"/api/history/{log_id}").json()
+    assert entry["run_timing"] == "coalesced"
+    assert entry["scheduled_for"].startswith("2026-01-01T03:00")
+    listed = {row["id"]: row for row in client.get("/api/history").json()}
+    assert listed[log_id]["run_timing"] == "coalesced"
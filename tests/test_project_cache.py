@@ -0,0 +1,115 @@
+import pytest
+from fastapi.testclient import TestClient
+from server.database import SessionLocal
+from server.models.db import ProjectSettings
+from server.services.project_cache import ProjectSnapshotCache, project_cache
+
+
+class _Loader:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.projects = [
+            {"name": "web", "path": "/stacks/web", "status": "stopped", "containers": 0,
+             "excluded": False, "full_stop": False},
+            {"name": "db", "path": "/stacks/db", "status": "stopped", "containers": 0,
+             "excluded": False, "full_stop": False},
+        ]
+
+    def __call__(self) -> list[dict]:
+        self.calls += 1
+        return [dict(p) for p in self.projects]
+
+
+def _cache(loader: _Loader, fingerprint: list, counts: dict | None = None) -> ProjectSnapshotCache:
+    return ProjectSnapshotCache(
+        loader,
+        fingerprint=lambda: fingerprint[0],
+        running_counts=lambda: counts or {},
+    )
+
+
+def test_snapshot_is_reused_until_max_age() -> None:
+    loader = _Loader()
+    cache = _cache(loader, [1])
+    cache.get(max_age=60)
+    snapshot = cache.get(max_age=60)
+    assert loader.calls == 1
+    assert snapshot.age >= 0
+    cache.get(max_age=0)
+    assert loader.calls == 2
+
+
+def test_invalidate_and_fingerprint_force_rescan() -> None:
+    loader = _Loader()
+    fingerprint = [1]
+    cache = _cache(loader, fingerprint)
+    cache.get(max_age=60)
+    cache.invalidate()
+    cache.get(max_age=60)
+    assert loader.calls == 2
+    fingerprint[0] = 2
+    cache.get(max_age=60)
+    assert loader.calls == 3
+
+
+def test_dirty_workdirs_update_only_affected_stacks() -> None:
+    loader = _Loader()
+    cache = _cache(loader, [1], counts={"/stacks/web": 3})
+    cache.get(max_age=60)
+    cache.mark_workdir_dirty("/stacks/web")
+    cache.apply_dirty_workdirs()
+
+    projects = {p["name"]: p for p in cache.get(max_age=60).projects}
+    assert loader.calls == 1
+    assert (projects["web"]["status"], projects["web"]["containers"]) == ("running", 3)
+    assert projects["db"]["status"] == "stopped"
+
+
+def test_project_settings_change_invalidates_global_cache(client: TestClient) -> None:
+    client.get("/api/projects")
+    with project_cache._lock:
+        generation = project_cache._generation
+    db = SessionLocal()
+    try:
+        db.add(ProjectSettings(name="cache-invalidation", path="/nowhere"))
+        db.commit()
+    finally:
+        db.close()
+    with project_cache._lock:
+        assert project_cache._generation > generation
+
+
+def test_projects_endpoint_reports_snapshot_age(client: TestClient) -> None:
+    response = client.get("/api/projects", params={"max_age": 0})
+    assert response.status_code == 200
+    assert "x-projects-refreshed-at" in response.headers
+    assert float(response.headers["x-projects-snapshot-age"]) >= 0
+
+
+@pytest.mark.parametrize("value", ["-1", "abc"])
+def test_projects_endpoint_rejects_bad_max_age(client: TestClient, value: str) -> None:
+    assert client.get("/api/projects", params={"max_age": value}).status_code == 422
+
+
+def test_docker_events_mark_stacks_dirty(fake_docker, monkeypatch: pytest.MonkeyPatch) -> None:
+    import server.services.project_cache as cache_module
+    from fake_docker import make_container
+
+    loader = _Loader()
+    cache = _cache(loader, [1], counts={"/stacks/web": 1})
+    cache.get(max_age=60)
+    monkeypatch.setattr(cache_module, "project_cache", cache)
+    monkeypatch.setattr(cache_module, "PROJECTS_CACHE_ENABLED", True)
+    fake_docker.add(make_container("a" * 64, workdir="/stacks/web"))
+
+    cache_module.start_project_cache()
+    try:
+        assert fake_docker.wait_for_subscribers()
+        fake_docker.emit("start", "a" * 64)
+        assert cache.wake.wait(timeout=5)
+    finally:
+        cache_module.stop_project_cache()
+    # El hilo de refresco pudo aplicarlo ya; si no, aplicar lo pendiente.
+    cache.apply_dirty_workdirs()
+    web = next(p for p in cache._projects if p["name"] == "web")
+    assert web["containers"] == 1
@@ -0,0 +1,155 @@
+from pathlib import Path
+
+import pytest
+import server.services.projects as projects_module
+from fake_docker import FakeDockerDaemon, make_container
+from server.database import SessionLocal, engine
+from server.models.db import ProjectSettings
+from sqlalchemy import event
+
+
+def _make_stacks(root: Path, names: list[str]) -> None:
+    for name in names:
+        d = root / name
+        d.mkdir(parents=True)
+        (d / "docker-compose.yml").write_text("services: {}\n", encoding="utf-8")
+
+
+def _scan() -> dict[str, dict]:
+    db = SessionLocal()
+    try:
+        return {p["name"]: p for p in projects_module.scan_projects_logic(db)}
+    finally:
+        db.close()
+
+
+def test_bulk_scan_lists_containers_once(
+    fake_docker: FakeDockerDaemon, monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    root = tmp_path / "bulk_root"
+    _make_stacks(root, ["alpha", "beta", "gamma"])
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", root)
+    fake_docker.add(make_container("a1" * 32, workdir=str(root / "alpha")))
+    fake_docker.add(make_container("a2" * 32, workdir=str(root / "alpha"), service="db"))
+    fake_docker.add(make_container("b1" * 32, workdir=str(root / "beta"), status="exited"))
+
+    def _no_cli(*_args, **_kwargs):
+        raise AssertionError("no debería usarse el CLI")
+
+    monkeypatch.setattr(projects_module, "run_command", _no_cli)
+
+    found = _scan()
+    assert (found["alpha"]["status"], found["alpha"]["containers"]) == ("running", 2)
+    assert (found["beta"]["status"], found["beta"]["containers"]) == ("stopped", 0)
+    assert found["gamma"]["status"] == "stopped"
+    assert fake_docker.requests.count("/containers/json") == 1
+
+
+def test_bulk_scan_cli_fallback_is_single_command(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    root = tmp_path / "cli_root"
+    _make_stacks(root, ["one", "two"])
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", root)
+    calls: list[object] = []
+
+    def _fake_cli(cmd, *_args, **_kwargs):
+        calls.append(cmd)
+        return f"{root / 'one'}\n{root / 'one'}\n"
+
+    monkeypatch.setattr(projects_module, "run_command", _fake_cli)
+
+    found = _scan()
+    assert found["one"]["containers"] == 2
+    assert found["two"]["status"] == "stopped"
+    assert len(calls) == 1
+    assert calls[0][:2] == ["docker", "ps"]
+
+
+def test_bulk_scan_failure_falls_back_to_per_project(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    root = tmp_path / "fallback_root"
+    _make_stacks(root, ["one"])
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", root)
+
+    def _fake_cli(cmd, *_args, **_kwargs):
+        if isinstance(cmd, list):
+            raise RuntimeError("docker ps roto")
+        return "abc\n"
+
+    monkeypatch.setattr(projects_module, "run_command", _fake_cli)
+
+    assert _scan()["one"]["containers"] == 1
+
+
+def _count_statements(monkeypatch: pytest.MonkeyPatch, root: Path) -> tuple[dict, int]:
+    statements: list[str] = []
+
+    def _record(_conn, _cursor, statement, *_args) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        found = _scan()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return found, len(statements)
+
+
+def test_scan_queries_do_not_grow_with_stacks(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    # Micro-benchmark: 1000 stacks. Antes, una SELECT por directorio (más las altas).
+    root = tmp_path / "many_root"
+    names = [f"stack{i:04d}" for i in range(1000)]
+    _make_stacks(root, names)
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", root)
+    monkeypatch.setattr(
+        projects_module,
+        "_bulk_compose_status",
+        lambda paths: {entry: ("stopped", 0) for entry in paths},
+    )
+
+    found, first = _count_statements(monkeypatch, root)
+    assert len(found) == 1000
+    assert first <= 5
+
+    found, second = _count_statements(monkeypatch, root)
+    assert found["stack0999"]["excluded"] is False
+    assert second == 1
+
+    # Cambio de ruta de todos los stacks: una SELECT y un UPDATE por lotes.
+    moved = tmp_path / "many_moved"
+    root.rename(moved)
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", moved)
+    found, third = _count_statements(monkeypatch, moved)
+    assert found["stack0000"]["path"] == str(moved / "stack0000")
+    assert third <= 5
+
+
+def test_scan_prunes_vanished_stacks_when_enabled(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    root = tmp_path / "prune_root"
+    _make_stacks(root, ["keep", "gone"])
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", root)
+    monkeypatch.setattr(
+        projects_module,
+        "_bulk_compose_status",
+        lambda paths: {entry: ("stopped", 0) for entry in paths},
+    )
+    _scan()
+    (root / "gone" / "docker-compose.yml").unlink()
+
+    def _names() -> set[str]:
+        with SessionLocal() as db:
+            return {p.name for p in db.query(ProjectSettings)}
+
+    assert set(_scan()) == {"keep"}
+    assert "gone" in _names()
+
+    monkeypatch.setattr(projects_module, "PROJECTS_PRUNE_MISSING", True)
+    _scan()
+    assert "gone" not in _names()
+    assert "keep" in _names()
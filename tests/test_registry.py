@@ -0,0 +1,196 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import server.services.registry as registry_module
+from fastapi.testclient import TestClient
+from server.services.registry import (
+    DigestCache,
+    ImageReference,
+    RegistryClient,
+    check_stack_updates,
+)
+
+TOKEN = "anon-token"
+DIGEST = "sha256:" + "1" * 64
+
+
+class _StandInRegistry:
+    """Registry v2 mínimo: token anónimo vía /token y HEAD de manifiestos."""
+
+    def __init__(self) -> None:
+        self.manifests: dict[tuple[str, str], str] = {}
+        # Se puede cambiar para simular que el registry rota (o caduca) el token.
+        self.token = TOKEN
+        self.requests: list[str] = []
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                registry.requests.append(f"GET {self.path}")
+                if self.path.startswith("/token"):
+                    body = json.dumps({"token": registry.token, "expires_in": 300}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_response(404)
+                self.end_headers()
+
+            def do_HEAD(self) -> None:
+                registry.requests.append(f"HEAD {self.path}")
+                if self.headers.get("Authorization") != f"Bearer {registry.token}":
+                    realm = f"http://127.0.0.1:{registry.port}/token"
+                    self.send_response(401)
+                    self.send_header(
+                        "WWW-Authenticate",
+                        f'Bearer realm="{realm}",service="stand-in",scope="repository:x:pull"',
+                    )
+                    self.end_headers()
+                    return
+                repo, _, tag = self.path[len("/v2/") :].partition("/manifests/")
+                digest = registry.manifests.get((repo, tag))
+                self.send_response(200 if digest else 404)
+                if digest:
+                    self.send_header("Docker-Content-Digest", digest)
+                self.end_headers()
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stand_in_registry():
+    registry = _StandInRegistry()
+    yield registry
+    registry.close()
+
+
+@pytest.mark.parametrize(
+    "reference, expected",
+    [
+        ("nginx", ("registry-1.docker.io", "library/nginx", "latest")),
+        ("grafana/grafana:11.0", ("registry-1.docker.io", "grafana/grafana", "11.0")),
+        ("ghcr.io/org/app:v1", ("ghcr.io", "org/app", "v1")),
+        ("localhost:5000/app", ("localhost:5000", "app", "latest")),
+    ],
+)
+def test_parse_image_reference(reference: str, expected: tuple[str, str, str]) -> None:
+    ref = ImageReference.parse(reference)
+    assert (ref.registry, ref.repository, ref.tag) == expected
+
+
+def test_manifest_digest_uses_anonymous_token(stand_in_registry: _StandInRegistry) -> None:
+    stand_in_registry.manifests[("team/app", "1.0")] = DIGEST
+    client = RegistryClient(timeout=5)
+    ref = ImageReference.parse(f"127.0.0.1:{stand_in_registry.port}/team/app:1.0")
+
+    assert client.manifest_digest(ref) == DIGEST
+    assert client.manifest_digest(ref) == DIGEST
+    # El token se reutiliza: un solo GET /token para dos consultas.
+    assert sum(r.startswith("GET /token") for r in stand_in_registry.requests) == 1
+    assert not any(r.startswith("GET /v2/") for r in stand_in_registry.requests)
+
+
+def test_manifest_digest_refreshes_rotated_token(stand_in_registry: _StandInRegistry) -> None:
+    stand_in_registry.manifests[("team/app", "1.0")] = DIGEST
+    client = RegistryClient(timeout=5)
+    ref = ImageReference.parse(f"127.0.0.1:{stand_in_registry.port}/team/app:1.0")
+    assert client.manifest_digest(ref) == DIGEST
+
+    stand_in_registry.token = "rotated-token"
+    # El token guardado ya no vale: se pide otro en la misma llamada, sin fallar.
+    assert client.manifest_digest(ref) == DIGEST
+    assert sum(r.startswith("GET /token") for r in stand_in_registry.requests) == 2
+
+
+def test_token_cache_honours_expires_in(
+    stand_in_registry: _StandInRegistry, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stand_in_registry.manifests[("team/app", "1.0")] = DIGEST
+    client = RegistryClient(timeout=5)
+    ref = ImageReference.parse(f"127.0.0.1:{stand_in_registry.port}/team/app:1.0")
+    client.manifest_digest(ref)
+    now = registry_module.time.monotonic()
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: now + 301)
+    client.manifest_digest(ref)
+    assert sum(r.startswith("GET /token") for r in stand_in_registry.requests) == 2
+
+
+def test_digest_cache_honours_ttl(stand_in_registry: _StandInRegistry) -> None:
+    stand_in_registry.manifests[("team/app", "1.0")] = DIGEST
+    reference = f"127.0.0.1:{stand_in_registry.port}/team/app:1.0"
+    cache = DigestCache(RegistryClient(timeout=5), ttl=60)
+    cache.remote_digest(reference)
+    heads = len([r for r in stand_in_registry.requests if r.startswith("HEAD")])
+    cache.remote_digest(reference)
+    assert len([r for r in stand_in_registry.requests if r.startswith("HEAD")]) == heads
+
+    expired = DigestCache(RegistryClient(timeout=5), ttl=0)
+    expired.remote_digest(reference)
+    expired.remote_digest(reference)
+    assert len([r for r in stand_in_registry.requests if r.startswith("HEAD")]) > heads + 1
+
+
+def test_check_stack_updates_compares_repo_digests(
+    stand_in_registry: _StandInRegistry, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    base = f"127.0.0.1:{stand_in_registry.port}"
+    stand_in_registry.manifests[("team/web", "1.0")] = DIGEST
+    stand_in_registry.manifests[("team/worker", "1.0")] = "sha256:" + "2" * 64
+    config = {
+        "services": {
+            "web": {"image": f"{base}/team/web:1.0"},
+            "worker": {"image": f"{base}/team/worker:1.0"},
+            "dev": {"image": "local/dev", "build": {"context": "."}},
+        }
+    }
+    monkeypatch.setattr(registry_module, "run_command", lambda *_a, **_k: json.dumps(config))
+    monkeypatch.setattr(registry_module, "_local_repo_digests", lambda _ref: [DIGEST])
+    monkeypatch.setattr(
+        registry_module, "digest_cache", DigestCache(RegistryClient(timeout=5), ttl=60)
+    )
+
+    check = check_stack_updates("app", "/stacks/app")
+    verdicts = {image.reference.rsplit("/", 1)[-1]: image.updates_available for image in check.images}
+    assert verdicts == {"web:1.0": False, "worker:1.0": True}
+    assert check.updates_available is True
+
+
+def test_build_services_make_availability_unknown(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _stack(services: dict):
+        monkeypatch.setattr(
+            registry_module, "run_command", lambda *_a, **_k: json.dumps({"services": services})
+        )
+        return check_stack_updates("app", "/stacks/app")
+
+    monkeypatch.setattr(registry_module, "_local_repo_digests", lambda _ref: [DIGEST])
+    monkeypatch.setattr(registry_module.digest_cache, "remote_digest", lambda _ref: DIGEST)
+    build_only = _stack({"app": {"image": "local/app", "build": {"context": "."}}})
+    assert build_only.images == [] and build_only.updates_available is None
+    mixed = _stack({"app": {"build": "."}, "db": {"image": "postgres:16"}})
+    assert mixed.updates_available is None
+    assert _stack({"db": {"image": "postgres:16"}}).updates_available is False
+
+
+def test_projects_expose_updates_available(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(registry_module, "run_command", lambda *_a, **_k: json.dumps({"services": {}}))
+    response = client.post("/api/projects/updates/check")
+    assert response.status_code == 200
+    # Sin imágenes de registry no hay nada que comparar: desconocido, no "al día".
+    for item in response.json():
+        assert item["updates_available"] is None
+    projects = client.get("/api/projects").json()
+    assert all("updates_available" in p for p in projects)
+    assert client.get("/api/projects/updates").status_code == 200
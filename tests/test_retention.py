@@ -0,0 +1,109 @@
+import datetime
+import json
+import os
+
+import pytest
+import server.services.retention as retention_module
+import server.services.scheduler as scheduler_module
+from server.database import Base, SessionLocal, create_sqlite_engine
+from server.migrations import run_migrations
+from server.models.db import UpdateLog, UpdateResult
+from sqlalchemy.orm import sessionmaker
+
+NOW = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+@pytest.fixture
+def history_db(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(retention_module, "BATCH_PAUSE_SECONDS", 0)
+    engine = create_sqlite_engine(tmp_path / "retention.db")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        for i in range(300):
+            log = UpdateLog(
+                timestamp=NOW - datetime.timedelta(days=300 - i, hours=-1),
+                status="SUCCESS",
+                summary=f"run {i}",
+                # Aleatorio: no se comprime, así el borrado libera páginas de verdad.
+                details=json.dumps({"web": [os.urandom(1500).hex()]}),
+            )
+            log.results = [UpdateResult(project="web", status="SUCCESS")]
+            db.add(log)
+        db.commit()
+    yield engine, Session
+    engine.dispose()
+
+
+def test_retention_by_days_deletes_old_runs_and_their_results(history_db) -> None:
+    engine, Session = history_db
+    result = retention_module.enforce_history_retention(
+        days=100, runs=0, max_mb=0, batch=7, engine=engine
+    )
+    assert result.deleted_runs == 200
+    with Session() as db:
+        assert db.query(UpdateLog).count() == 100
+        assert db.query(UpdateResult).count() == 100
+        oldest = db.query(UpdateLog).order_by(UpdateLog.timestamp).first()
+        assert oldest.summary == "run 200"
+
+
+def test_retention_by_runs_and_size_reclaims_space(history_db) -> None:
+    engine, Session = history_db
+    by_runs = retention_module.enforce_history_retention(
+        days=0, runs=50, max_mb=0, batch=40, engine=engine
+    )
+    assert by_runs.deleted_runs == 250
+    assert by_runs.reclaimed_bytes > 0
+    assert by_runs.size_after < by_runs.size_before
+
+    # Unos 40 KiB por debajo del tamaño actual: hay que borrar algunas filas, no todas.
+    target_mb = (retention_module._used_size(engine) - 40 * 1024) / (1024 * 1024)
+    by_size = retention_module.enforce_history_retention(
+        days=0, runs=0, max_mb=target_mb, batch=5, engine=engine
+    )
+    assert 0 < by_size.deleted_runs < 50
+    assert retention_module._used_size(engine) <= target_mb * 1024 * 1024
+    with Session() as db:
+        assert db.query(UpdateLog).count() == 50 - by_size.deleted_runs
+        newest = db.query(UpdateLog).order_by(UpdateLog.timestamp.desc()).first()
+        assert newest.summary == "run 299"
+
+
+def test_retention_job_is_registered(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(scheduler_module, "HISTORY_RETENTION_DAYS", 30)
+    monkeypatch.setattr(scheduler_module, "HISTORY_RETENTION_INTERVAL", 12)
+    scheduler_module.refresh_scheduler_jobs()
+    assert scheduler_module.scheduler.get_job(scheduler_module.HISTORY_RETENTION_JOB_ID)
+
+    monkeypatch.setattr(scheduler_module, "HISTORY_RETENTION_INTERVAL", 0)
+    scheduler_module.refresh_scheduler_jobs()
+    assert scheduler_module.scheduler.get_job(scheduler_module.HISTORY_RETENTION_JOB_ID) is None
+
+
+def test_retention_endpoint_reports_reclaimed_bytes(client) -> None:
+    db = SessionLocal()
+    try:
+        ancient = UpdateLog(
+            timestamp=NOW - datetime.timedelta(days=3650),
+            status="SUCCESS",
+            summary="ancient",
+            details="{}",
+        )
+        db.add(ancient)
+        db.commit()
+        ancient_id = ancient.id
+    finally:
+        db.close()
+    body = client.post("/api/history/retention").json()
+    assert {"deleted_runs", "reclaimed_bytes", "database_bytes"} <= set(body)
+    # Sin HISTORY_RETENTION_* configurado no se borra nada: la retención es opt-in.
+    assert body["deleted_runs"] == 0
+    db = SessionLocal()
+    try:
+        assert db.get(UpdateLog, ancient_id) is not None
+        db.query(UpdateLog).filter(UpdateLog.id == ancient_id).delete()
+        db.commit()
+    finally:
+        db.close()
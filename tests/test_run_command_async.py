@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import time
+from collections import deque
+
+import pytest
+from server.services.docker import _pump_lines, run_command_async
+
+
+def _python(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+def test_streams_lines_and_keeps_only_tail() -> None:
+    seen: list[str] = []
+    code = "import sys\nfor i in range(50): print(i)\nsys.stderr.write('warn\\n')"
+
+    out = asyncio.run(
+        run_command_async(_python(code), log_exec=False, on_line=seen.append, tail_lines=5)
+    )
+
+    assert out.splitlines() == ["45", "46", "47", "48", "49"]
+    assert len([line for line in seen if line.isdigit()]) == 50
+    assert "warn" in seen
+
+
+def test_carriage_returns_split_progress_lines() -> None:
+    seen: list[str] = []
+    code = "import sys\nsys.stdout.write('10%\\r50%\\r100%\\n')"
+    asyncio.run(run_command_async(_python(code), log_exec=False, on_line=seen.append))
+    assert seen == ["10%", "50%", "100%"]
+
+
+def test_nonzero_exit_raises_with_stderr_tail() -> None:
+    code = "import sys\nsys.stderr.write('boom\\n')\nsys.exit(3)"
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(run_command_async(_python(code), log_exec=False, locale="en"))
+
+
+def test_timeout_kills_process() -> None:
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="timeout"):
+        asyncio.run(
+            run_command_async(
+                _python("import time\ntime.sleep(30)"), log_exec=False, locale="en", timeout=0.5
+            )
+        )
+    assert time.monotonic() - started < 10
+
+
+def test_cancellation_kills_process() -> None:
+    async def scenario() -> None:
+        task = asyncio.create_task(
+            run_command_async(_python("import time\ntime.sleep(30)"), log_exec=False)
+        )
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    assert time.monotonic() - started < 10
+
+
+class _ChunkedStream:
+    def __init__(self, *chunks: bytes) -> None:
+        self._chunks = list(chunks)
+
+    async def read(self, _n: int) -> bytes:
+        return self._chunks.pop(0) if self._chunks else b""
+
+
+def test_multibyte_characters_split_across_reads() -> None:
+    check = "✔".encode()
+    stream = _ChunkedStream(b"Pulled " + check[:1], check[1:] + b" web\n\xe2\xa0", b"\xbf db")
+    seen: list[str] = []
+    asyncio.run(_pump_lines(stream, deque(), seen.append))
+    assert seen == ["Pulled ✔ web", "⠿ db"]
@@ -0,0 +1,381 @@
+import datetime
+import json
+import threading
+
+import pytest
+import server.services.scheduler as scheduler_module
+from server.database import SessionLocal, engine
+from server.models.db import ProjectSettings, ScheduledTask, UpdateLog, UpdateResult
+from server.services import registry
+from server.services.update_queue import UpdateQueue
+from server.services.update_status import update_status
+
+STACKS = ["par-a", "par-b", "par-c", "par-d"]
+
+
+@pytest.fixture
+def parallel_stacks(client, monkeypatch: pytest.MonkeyPatch):
+    db = SessionLocal()
+    try:
+        for name in STACKS:
+            db.add(ProjectSettings(name=name, path=f"/stacks/{name}"))
+        db.commit()
+    finally:
+        db.close()
+    monkeypatch.setattr(scheduler_module, "compose_stack_allowed", lambda path: path.name in STACKS)
+    monkeypatch.setattr(scheduler_module, "run_command", lambda *_a, **_k: "")
+    monkeypatch.setattr(scheduler_module.time, "sleep", lambda _s: None)
+    monkeypatch.setattr(scheduler_module, "prefetch_compose_images", lambda *_a, **_k: True)
+    yield
+    db = SessionLocal()
+    try:
+        db.query(ProjectSettings).filter(ProjectSettings.name.in_(STACKS)).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _last_log() -> UpdateLog:
+    db = SessionLocal()
+    try:
+        return db.query(UpdateLog).order_by(UpdateLog.id.desc()).first()
+    finally:
+        db.close()
+
+
+def test_global_update_respects_concurrency_limit(
+    parallel_stacks, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+    snapshots: list[list] = []
+
+    def _fake_update(name, _db, locale=None, **_kwargs):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        snapshots.append(update_status.snapshot()["in_progress"])
+        # El último en empezar termina primero: el historial debe mantener el orden.
+        threading.Event().wait(0.05 * (len(STACKS) - STACKS.index(name)))
+        with lock:
+            active["now"] -= 1
+        return name != "par-c", [f"log {name}"]
+
+    monkeypatch.setattr(scheduler_module, "GLOBAL_UPDATE_CONCURRENCY", 2)
+    monkeypatch.setattr(scheduler_module, "update_single_project_logic", _fake_update)
+
+    scheduler_module.global_update_job(locale="en")
+
+    assert active["peak"] == 2
+    assert any(len(s) == 2 for s in snapshots)
+    log = _last_log()
+    assert log.status == "ERROR"
+    details = json.loads(log.details)
+    assert list(details)[: len(STACKS)] == STACKS
+    db = SessionLocal()
+    try:
+        results = db.query(UpdateResult).filter(UpdateResult.log_id == log.id).all()
+    finally:
+        db.close()
+    assert {r.project for r in results} == set(STACKS)
+    assert "ERROR" in {r.status for r in results}
+    assert all(r.duration is not None for r in results)
+    # Con errores no se hace prune.
+    assert "CLEANUP SKIPPED" in details["safe_cleanup"]
+    status = update_status.snapshot()
+    assert status["is_running"] is False
+    assert status["in_progress"] == []
+    assert status["current"] == len(STACKS)
+    assert len(status["processed"]) == len(STACKS)
+
+
+def test_global_update_sequential_by_default(
+    parallel_stacks, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    order: list[str] = []
+    threads: set[str] = set()
+
+    def _fake_update(name, _db, locale=None, **_kwargs):
+        order.append(name)
+        threads.add(threading.current_thread().name)
+        return True, []
+
+    monkeypatch.setattr(scheduler_module, "GLOBAL_UPDATE_CONCURRENCY", 1)
+    monkeypatch.setattr(scheduler_module, "update_single_project_logic", _fake_update)
+
+    scheduler_module.global_update_job(locale="en")
+
+    assert order == STACKS
+    assert threads == {threading.current_thread().name}
+    assert _last_log().status == "SUCCESS"
+
+
+def test_global_update_pulls_every_stack_before_recreating(
+    parallel_stacks, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    events: list[tuple[str, str]] = []
+
+    def _fake_prefetch(path, *, locale="es"):
+        name = path.rsplit("/", 1)[-1]
+        events.append(("pull", name))
+        if name == "par-b":
+            raise RuntimeError("registry down")
+        return name != "par-c"
+
+    def _fake_update(name, _db, locale=None, images_prefetched=False, **_kwargs):
+        events.append(("update", name))
+        assert images_prefetched is (name in {"par-a", "par-d"})
+        return True, []
+
+    monkeypatch.setattr(scheduler_module, "GLOBAL_UPDATE_PREFETCH", True)
+    monkeypatch.setattr(scheduler_module, "prefetch_compose_images", _fake_prefetch)
+    monkeypatch.setattr(scheduler_module, "update_single_project_logic", _fake_update)
+
+    scheduler_module.global_update_job(locale="en")
+
+    phases = [phase for phase, _name in events]
+    assert phases == ["pull"] * len(STACKS) + ["update"] * len(STACKS)
+    assert update_status.snapshot()["phase"] == ""
+
+
+def test_status_changes_are_pushed_with_increasing_versions(
+    parallel_stacks, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    published: list[dict] = []
+    original = update_status.events.publish
+
+    def _record(event, data, **kwargs):
+        published.append(data)
+        return original(event, data, **kwargs)
+
+    monkeypatch.setattr(update_status.events, "publish", _record)
+    monkeypatch.setattr(scheduler_module, "GLOBAL_UPDATE_CONCURRENCY", 1)
+    monkeypatch.setattr(
+        scheduler_module, "update_single_project_logic", lambda *_a, **_k: (True, [])
+    )
+
+    scheduler_module.global_update_job(locale="en")
+
+    versions = [p["version"] for p in published]
+    assert versions == sorted(set(versions))
+    assert {"par-a"} in [set(p["in_progress"]) for p in published]
+    assert published[-1]["is_running"] is False
+    assert update_status.snapshot()["version"] == versions[-1]
+
+
+def test_update_status_stream_resumes_from_last_event_id(
+    client, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from server.services.events import Broadcaster
+
+    events = Broadcaster(history=1)
+    events.publish("status", {"is_running": False, "version": 1})
+    events.close()
+    monkeypatch.setattr(update_status, "events", events)
+
+    with client.stream("GET", "/api/update-status/stream") as response:
+        body = "".join(response.iter_text())
+    assert "event: status" in body and "id: 1" in body
+
+    with client.stream(
+        "GET", "/api/update-status/stream", headers={"Last-Event-ID": "1"}
+    ) as response:
+        assert "event: status" not in "".join(response.iter_text())
+
+
+def _add_task(target: str, expression: str, task_type: str = "cron") -> int:
+    db = SessionLocal()
+    try:
+        task = ScheduledTask(
+            target=target, task_type=task_type, expression=expression, active=True
+        )
+        db.add(task)
+        db.commit()
+        return task.id
+    finally:
+        db.close()
+
+
+def test_refresh_only_touches_changed_jobs(client) -> None:
+    keep = _add_task("keep", "0 3 * * *")
+    edit = _add_task("edit", "0 4 * * *")
+    drop = _add_task("drop", "0 5 * * *")
+    scheduler_module.refresh_scheduler_jobs()
+    before = scheduler_module.scheduler.get_job(f"job_{keep}")
+    assert before is not None
+
+    # Alta antes de la baja: SQLite reutiliza el último id borrado.
+    added = _add_task("new", "0 7 * * *")
+    db = SessionLocal()
+    try:
+        db.query(ScheduledTask).filter(ScheduledTask.id == edit).update(
+            {"expression": "30 6 * * *"}
+        )
+        db.query(ScheduledTask).filter(ScheduledTask.id == drop).delete()
+        db.commit()
+    finally:
+        db.close()
+    scheduler_module.refresh_scheduler_jobs()
+
+    after = scheduler_module.scheduler.get_job(f"job_{keep}")
+    # El job sin cambios no se vuelve a añadir: conserva su próxima ejecución.
+    assert after.next_run_time == before.next_run_time
+    assert (after.next_run_time.hour, after.next_run_time.minute) == (3, 0)
+    edited = scheduler_module.scheduler.get_job(f"job_{edit}")
+    assert (edited.next_run_time.hour, edited.next_run_time.minute) == (6, 30)
+    assert scheduler_module.scheduler.get_job(f"job_{drop}") is None
+    assert scheduler_module.scheduler.get_job(f"job_{added}").args == (f"job_{added}", "new")
+
+
+def test_schedule_api_reconciles_in_background_and_reports_next_run(client) -> None:
+    response = client.post(
+        "/api/schedules",
+        json={"target": "GLOBAL", "task_type": "cron", "frequency": "daily", "hour": 2},
+    )
+    assert response.status_code == 200
+    task = response.json()
+    assert task["next_run_time"] is not None
+
+    scheduler_module.request_scheduler_refresh().result(timeout=5)
+    job = scheduler_module.scheduler.get_job(f"job_{task['id']}")
+    assert job is not None
+    listed = {row["id"]: row for row in client.get("/api/schedules").json()}
+    assert listed[task["id"]]["next_run_time"].startswith(
+        job.next_run_time.isoformat()[:16]
+    )
+
+    assert client.delete(f"/api/schedules/{task['id']}").status_code == 200
+    scheduler_module.request_scheduler_refresh().result(timeout=5)
+    assert scheduler_module.scheduler.get_job(f"job_{task['id']}") is None
+
+
+def test_jobs_persist_across_scheduler_restarts(client) -> None:
+    task_id = _add_task("persisted", "15 4 * * *")
+    scheduler_module.refresh_scheduler_jobs()
+    before = scheduler_module.scheduler.get_job(f"job_{task_id}").next_run_time
+
+    scheduler_module.stop_scheduler()
+    with engine.connect() as conn:
+        stored = conn.exec_driver_sql("SELECT id FROM apscheduler_jobs").scalars().all()
+    assert f"job_{task_id}" in stored
+    scheduler_module.start_scheduler()
+    assert scheduler_module.scheduler.get_job(f"job_{task_id}").next_run_time == before
+
+
+def test_skip_catch_up_moves_missed_runs_forward(client, monkeypatch: pytest.MonkeyPatch) -> None:
+    cron = _add_task("missed-cron", "0 2 * * *")
+    scheduler_module.refresh_scheduler_jobs()
+    now = datetime.datetime.now(datetime.UTC)
+    scheduler_module.scheduler.pause()
+    try:
+        scheduler_module.scheduler.modify_job(
+            f"job_{cron}", next_run_time=now - datetime.timedelta(days=1)
+        )
+        monkeypatch.setattr(scheduler_module, "SCHEDULER_CATCH_UP", "skip")
+        scheduler_module._catch_up_missed_runs()
+    finally:
+        scheduler_module.scheduler.resume()
+
+    next_run = scheduler_module.scheduler.get_job(f"job_{cron}").next_run_time
+    assert now < next_run <= now + datetime.timedelta(days=1)
+    assert (next_run.hour, next_run.minute) == (2, 0)
+
+
+def test_schedule_api_applies_misfire_options(client) -> None:
+    response = client.post(
+        "/api/schedules",
+        json={
+            "target": "GLOBAL",
+            "frequency": "daily",
+            "hour": 5,
+            "misfire_grace_time": 120,
+            "coalesce": False,
+            "max_instances": 2,
+        },
+    )
+    assert response.status_code == 200
+    task = response.json()
+    assert (task["misfire_grace_time"], task["coalesce"], task["max_instances"]) == (120, False, 2)
+
+    scheduler_module.request_scheduler_refresh().result(timeout=5)
+    job = scheduler_module.scheduler.get_job(f"job_{task['id']}")
+    assert (job.misfire_grace_time, job.coalesce, job.max_instances) == (120, False, 2)
+
+    invalid = client.post(
+        "/api/schedules", json={"target": "GLOBAL", "frequency": "daily", "max_instances": 0}
+    )
+    assert invalid.status_code == 422
+    assert client.delete(f"/api/schedules/{task['id']}").status_code == 200
+
+
+def test_only_available_rechecks_registry_at_run_time(tmp_path, monkeypatch) -> None:
+    def _check(name: str, available: bool | None) -> registry.StackUpdateCheck:
+        remote = None if available is None else ("sha256:new" if available else "sha256:old")
+        image = registry.ImageUpdate(f"{name}:latest", ["sha256:old"], remote)
+        return registry.StackUpdateCheck(name, datetime.datetime.now(datetime.UTC), [image])
+
+    verdicts = {"fresh": False, "published": True, "unknown": None}
+
+    def _check_stack_updates(name: str, _workdir: str) -> registry.StackUpdateCheck:
+        if name == "broken":
+            raise RuntimeError("compose config falló")
+        return _check(name, verdicts[name])
+
+    # El resultado del job periódico está desfasado: "published" tiene ya imagen nueva.
+    registry.record_stack_check(_check("published", False))
+    monkeypatch.setattr(registry, "check_stack_updates", _check_stack_updates)
+    (tmp_path / "git" / ".git").mkdir(parents=True)
+    stacks = [(name, str(tmp_path / name)) for name in (*verdicts, "broken")]
+    stacks.append(("git", str(tmp_path / "git")))
+
+    pending, skipped = scheduler_module._split_stacks_without_updates(stacks)
+    assert skipped == ["fresh"]
+    assert [name for name, _path in pending] == ["published", "unknown", "broken", "git"]
+    assert registry.get_update_availability()["published"].updates_available is True
+    registry.forget_stack("published")
+    registry.forget_stack("fresh")
+    registry.forget_stack("unknown")
+
+
+def test_deduplicated_scheduled_runs_write_one_history_row(
+    parallel_stacks, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    queue = UpdateQueue(concurrency=1)
+    release = threading.Event()
+    calls: list[str] = []
+
+    def _fake_update(name, _db, locale=None, **_kwargs):
+        calls.append(name)
+        if name == "par-a":
+            release.wait(2)
+        return True, [f"log {name}"]
+
+    monkeypatch.setattr(scheduler_module, "update_queue", queue)
+    monkeypatch.setattr(scheduler_module, "update_single_project_logic", _fake_update)
+    first_id = _last_log().id if _last_log() else 0
+
+    blocker = threading.Thread(target=scheduler_module.job_wrapper, args=("par-a",))
+    blocker.start()
+    while not queue.snapshot()["running"]:
+        threading.Event().wait(0.005)
+    # Dos disparos de "par-b" mientras la cola está ocupada: se funden en una ejecución.
+    waiting = [
+        threading.Thread(target=scheduler_module.job_wrapper, args=("par-b",)) for _ in range(2)
+    ]
+    for thread in waiting:
+        thread.start()
+    while not (queue.snapshot()["pending"] and queue.snapshot()["pending"][0]["requests"] == 2):
+        threading.Event().wait(0.005)
+    release.set()
+    for thread in [blocker, *waiting]:
+        thread.join(2)
+
+    assert calls == ["par-a", "par-b"]
+    db = SessionLocal()
+    try:
+        logs = db.query(UpdateLog).filter(UpdateLog.id > first_id).all()
+        rows = db.query(UpdateResult).filter(UpdateResult.log_id > first_id).all()
+    finally:
+        db.close()
+    assert sorted(next(iter(json.loads(log.details))) for log in logs) == ["par-a", "par-b"]
+    assert sorted(r.project for r in rows) == ["par-a", "par-b"]
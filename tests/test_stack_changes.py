@@ -0,0 +1,132 @@
+import pytest
+import server.services.projects as projects_module
+from server.database import SessionLocal
+from server.models.db import ProjectSettings
+from server.services.stack_changes import (
+    image_changes,
+    parse_docker_time,
+    service_image_ids,
+    stack_is_current,
+)
+from server.services.update_logs import ProjectUpdateReport
+
+CONFIG = {
+    "services": {
+        "web": {"image": "nginx:1.27"},
+        "migrate": {"image": "app:latest", "restart": "no"},
+    }
+}
+IMAGE_IDS = {"nginx:1.27": "sha256:nginx", "app:latest": "sha256:app"}
+
+
+def _container(service: str, image: str, *, status: str = "running", exit_code: int = 0) -> dict:
+    return {
+        "Id": f"{service}-id",
+        "Image": image,
+        "Config": {"Labels": {"com.docker.compose.service": service}},
+        "State": {
+            "Status": status,
+            "ExitCode": exit_code,
+            "StartedAt": "2026-01-02T03:04:05.123456789Z",
+        },
+    }
+
+
+def test_stack_is_current_when_images_match() -> None:
+    containers = [
+        _container("web", "sha256:nginx"),
+        _container("migrate", "sha256:app", status="exited"),
+    ]
+    assert stack_is_current(CONFIG, containers, IMAGE_IDS)
+
+
+@pytest.mark.parametrize(
+    "containers",
+    [
+        # Imagen nueva descargada para web.
+        [_container("web", "sha256:old"), _container("migrate", "sha256:app", status="exited")],
+        # Servicio sin contenedor.
+        [_container("web", "sha256:nginx")],
+        # One-shot que terminó con error.
+        [_container("web", "sha256:nginx"), _container("migrate", "sha256:app", status="exited", exit_code=1)],
+        # Huérfano de un servicio eliminado.
+        [
+            _container("web", "sha256:nginx"),
+            _container("migrate", "sha256:app", status="exited"),
+            _container("legacy", "sha256:nginx"),
+        ],
+    ],
+)
+def test_stack_needs_recreate(containers: list[dict]) -> None:
+    assert not stack_is_current(CONFIG, containers, IMAGE_IDS)
+
+
+def test_build_services_are_never_skipped() -> None:
+    config = {"services": {"web": {"image": "web:dev", "build": {"context": "."}}}}
+    containers = [_container("web", "sha256:web")]
+    assert not stack_is_current(config, containers, {"web:dev": "sha256:web"})
+
+
+def test_config_edited_after_start_forces_recreate() -> None:
+    containers = [
+        _container("web", "sha256:nginx"),
+        _container("migrate", "sha256:app", status="exited"),
+    ]
+    started = parse_docker_time("2026-01-02T03:04:05.123456789Z")
+    assert started is not None
+    assert stack_is_current(CONFIG, containers, IMAGE_IDS, config_mtime=started.timestamp() - 60)
+    assert not stack_is_current(CONFIG, containers, IMAGE_IDS, config_mtime=started.timestamp() + 60)
+
+
+def test_image_changes_between_snapshots() -> None:
+    before = service_image_ids(
+        [_container("web", "sha256:old"), _container("migrate", "sha256:app")]
+    )
+    after = service_image_ids(
+        [_container("web", "sha256:new"), _container("migrate", "sha256:app")]
+    )
+    assert image_changes(before, after) == [
+        {"service": "web", "image": "", "before": "sha256:old", "after": "sha256:new"}
+    ]
+    assert image_changes(after, after) == []
+
+
+def test_update_skips_recreate_when_unchanged(
+    client, monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    root = tmp_path / "stacks"
+    proj_dir = root / "noop"
+    proj_dir.mkdir(parents=True)
+    (proj_dir / "docker-compose.yml").write_text("services: {}\n", encoding="utf-8")
+    monkeypatch.setattr(projects_module, "PROJECTS_ROOT", root)
+    commands: list[str] = []
+
+    async def _fake_async(cmd, *_a, **_k):
+        commands.append(str(cmd))
+        return ""
+
+    monkeypatch.setattr(
+        projects_module, "run_command", lambda cmd, *_a, **_k: commands.append(str(cmd)) or ""
+    )
+    monkeypatch.setattr(projects_module, "run_command_async", _fake_async)
+    monkeypatch.setattr(projects_module, "_stack_already_current", lambda *_a, **_k: True)
+    monkeypatch.setattr(projects_module, "_service_images", lambda *_a, **_k: {})
+    report = ProjectUpdateReport("noop")
+
+    db = SessionLocal()
+    try:
+        db.add(ProjectSettings(name="noop", path=str(proj_dir)))
+        db.commit()
+        ok, logs = projects_module.update_single_project_logic(
+            "noop", db, locale="en", report=report
+        )
+    finally:
+        db.query(ProjectSettings).filter(ProjectSettings.name == "noop").delete()
+        db.commit()
+        db.close()
+
+    assert ok
+    assert any("up to date" in line for line in logs)
+    assert not any(" stop" in c or " up " in c for c in commands)
+    assert report.status == "SUCCESS"
+    assert report.duration is not None and report.image_changes == []
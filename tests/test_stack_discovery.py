@@ -0,0 +1,110 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+import server.services.stack_discovery as discovery_module
+from server.services.stack_discovery import StackScanner
+
+OLD_NS = time.time_ns() - 3600 * 1_000_000_000
+
+
+def _age(*paths: Path) -> None:
+    # mtime en el pasado: el scanner solo cachea entradas "asentadas".
+    for path in paths:
+        os.utime(path, ns=(OLD_NS, OLD_NS))
+
+
+def _make_tree(root: Path) -> None:
+    for name, compose in [
+        ("classic", "docker-compose.yml"),
+        ("classic_yaml", "docker-compose.yaml"),
+        ("modern", "compose.yml"),
+        ("modern_yaml", "compose.yaml"),
+        ("data", "docker-compose.yml"),
+    ]:
+        (root / name).mkdir(parents=True)
+        (root / name / compose).write_text("services: {}\n", encoding="utf-8")
+    (root / "empty").mkdir()
+    (root / "notes.txt").write_text("x", encoding="utf-8")
+    _age(*root.iterdir(), root)
+
+
+@pytest.fixture()
+def examined(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    calls: list[Path] = []
+    original = discovery_module.find_compose_file
+
+    def _spy(path: Path) -> Path | None:
+        calls.append(path)
+        return original(path)
+
+    monkeypatch.setattr(discovery_module, "find_compose_file", _spy)
+    return calls
+
+
+def test_scanner_recognizes_all_compose_file_names(tmp_path) -> None:
+    root = tmp_path / "stacks"
+    _make_tree(root)
+    found = StackScanner(ignored={"data"}).scan(root)
+    assert set(found) == {"classic", "classic_yaml", "modern", "modern_yaml"}
+    assert found["modern"] == root / "modern"
+
+
+def test_scanner_only_reexamines_changed_entries(tmp_path, examined: list[Path]) -> None:
+    root = tmp_path / "stacks"
+    _make_tree(root)
+    scanner = StackScanner()
+    scanner.scan(root)
+    version = scanner.version
+    examined.clear()
+
+    assert "empty" not in scanner.scan(root)
+    assert examined == []
+    assert scanner.version == version
+
+    # Un compose nuevo cambia el mtime del directorio del stack, no el de la raíz.
+    (root / "empty" / "compose.yaml").write_text("services: {}\n", encoding="utf-8")
+    assert "empty" in scanner.scan(root)
+    assert examined == [root / "empty"]
+    assert scanner.version == version + 1
+
+    (root / "classic").rename(root / "renamed")
+    found = scanner.scan(root)
+    assert "classic" not in found
+    assert "renamed" in found
+
+
+def test_scanner_forgets_missing_root(tmp_path) -> None:
+    root = tmp_path / "stacks"
+    _make_tree(root)
+    scanner = StackScanner()
+    assert scanner.scan(root)
+    for path in sorted(root.rglob("*"), reverse=True):
+        path.unlink() if path.is_file() else path.rmdir()
+    root.rmdir()
+    assert scanner.scan(root) == {}
+
+
+@pytest.mark.skipif(not hasattr(os, "O_CLOEXEC"), reason="inotify solo en Linux")
+def test_inotify_scanner_skips_stat_and_sees_hidden_changes(
+    tmp_path, examined: list[Path]
+) -> None:
+    root = tmp_path / "stacks"
+    _make_tree(root)
+    scanner = StackScanner(use_inotify=True)
+    if scanner._watcher is None:
+        pytest.skip("inotify no disponible")
+    plain = StackScanner()
+    scanner.scan(root)
+    plain.scan(root)
+    examined.clear()
+
+    assert "empty" not in scanner.scan(root)
+    assert examined == []
+
+    # Cambio que conserva el mtime del directorio: solo inotify lo detecta.
+    (root / "empty" / "compose.yml").write_text("services: {}\n", encoding="utf-8")
+    _age(root / "empty")
+    assert "empty" not in plain.scan(root)
+    assert "empty" in scanner.scan(root)
@@ -0,0 +1,82 @@
+import datetime
+import pickle
+
+import pytest
+import server.services.scheduler as scheduler_module
+import server.services.stagger as stagger_module
+from apscheduler.triggers.cron import CronTrigger
+from server.models.db import ScheduledTask
+from server.services.stagger import OffsetTrigger, stagger_offsets
+
+UTC = datetime.UTC
+
+
+def _task(task_id: int, expression: str, *, task_type: str = "cron") -> ScheduledTask:
+    return ScheduledTask(
+        id=task_id,
+        target=f"stack-{task_id}",
+        task_type=task_type,
+        expression=expression,
+        active=True,
+    )
+
+
+def test_offset_trigger_shifts_every_fire_time() -> None:
+    trigger = OffsetTrigger(CronTrigger(minute=0, hour=0, timezone=UTC), offset=90)
+    now = datetime.datetime(2026, 3, 1, 12, 0, tzinfo=UTC)
+    first = trigger.get_next_fire_time(None, now)
+    assert first == datetime.datetime(2026, 3, 2, 0, 1, 30, tzinfo=UTC)
+    assert trigger.get_next_fire_time(first, first) == first + datetime.timedelta(days=1)
+    # Dentro del desfase la ejecución de hoy aún no ha pasado.
+    at_midnight = datetime.datetime(2026, 3, 2, 0, 0, 30, tzinfo=UTC)
+    assert trigger.get_next_fire_time(None, at_midnight) == first
+    # Se guarda en el job store persistente.
+    assert str(pickle.loads(pickle.dumps(trigger))) == str(trigger)
+
+
+def test_only_tasks_sharing_an_expression_are_staggered() -> None:
+    tasks = [_task(i, "0 0 * * *") for i in range(1, 21)]
+    tasks += [_task(30, "0  0 * * *"), _task(31, "15 3 * * *")]
+    tasks += [_task(32, "2030-01-01 00:00:00", task_type="date")]
+    offsets = stagger_offsets(tasks)
+    assert set(offsets) == set(range(1, 21)) | {30}
+    assert all(0 <= offset < stagger_module.SCHEDULER_STAGGER_WINDOW for offset in offsets.values())
+    assert len(set(offsets.values())) > 10
+    # Deterministas: la misma tarea siempre cae en el mismo hueco.
+    assert stagger_offsets(tasks) == offsets
+
+
+def test_jitter_mode_has_no_fixed_offset(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(stagger_module, "SCHEDULER_STAGGER_MODE", "jitter")
+    tasks = [_task(1, "0 0 * * *"), _task(2, "0 0 * * *")]
+    assert stagger_offsets(tasks) == {1: None, 2: None}
+    cron = CronTrigger(minute=0, hour=0, timezone=UTC)
+    trigger = stagger_module.stagger_trigger(cron, 1, {1: None})
+    now = datetime.datetime(2026, 3, 1, 12, 0, tzinfo=UTC)
+    midnight = datetime.datetime(2026, 3, 2, tzinfo=UTC)
+    window = datetime.timedelta(seconds=stagger_module.SCHEDULER_STAGGER_WINDOW)
+    assert midnight <= trigger.get_next_fire_time(None, now) <= midnight + window
+
+
+def test_schedule_api_exposes_stagger_offset(client) -> None:
+    created = [
+        client.post(
+            "/api/schedules",
+            json={"target": f"herd-{i}", "frequency": "daily", "hour": 1, "minute": 17},
+        ).json()
+        for i in range(3)
+    ]
+    scheduler_module.request_scheduler_refresh().result(timeout=5)
+    listed = {row["id"]: row for row in client.get("/api/schedules").json()}
+    try:
+        for task in created:
+            row = listed[task["id"]]
+            assert row["staggered"] is True
+            offset = row["stagger_offset"]
+            job = scheduler_module.scheduler.get_job(f"job_{task['id']}")
+            base = job.next_run_time - datetime.timedelta(seconds=offset)
+            assert (base.hour, base.minute, base.second) == (1, 17, 0)
+    finally:
+        for task in created:
+            client.delete(f"/api/schedules/{task['id']}")
+        scheduler_module.request_scheduler_refresh().result(timeout=5)
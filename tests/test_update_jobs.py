@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+
+import pytest
+import server.services.projects as projects_module
+import server.services.update_jobs as update_jobs_module
+from fastapi.testclient import TestClient
+from server.services.events import Broadcaster
+from server.services.update_jobs import UpdateJob, UpdateJobRegistry
+
+
+def _read_events(response) -> list[tuple[int, str, dict]]:
+    events: list[tuple[int, str, dict]] = []
+    current: dict[str, str] = {}
+    for line in response.iter_lines():
+        if line.startswith(":"):
+            continue
+        if not line:
+            if current:
+                events.append((int(current["id"]), current["event"], json.loads(current["data"])))
+                current = {}
+            continue
+        key, _, value = line.partition(": ")
+        current[key] = value
+    return events
+
+
+def test_broadcaster_replays_after_last_event_id() -> None:
+    broadcaster = Broadcaster()
+
+    async def scenario() -> list[int]:
+        for i in range(3):
+            broadcaster.publish("log", {"i": i})
+        received: list[int] = []
+
+        async def consume() -> None:
+            async for item in broadcaster.subscribe(last_event_id=1):
+                received.append(item.id)
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        # Publicación desde otro hilo (jobs del scheduler).
+        thread = threading.Thread(target=broadcaster.publish, args=("log", {"i": 3}))
+        thread.start()
+        thread.join()
+        broadcaster.close()
+        await asyncio.wait_for(task, timeout=5)
+        return received
+
+    assert asyncio.run(scenario()) == [2, 3, 4]
+
+
+@pytest.fixture
+def fake_update(monkeypatch: pytest.MonkeyPatch):
+    async def _fake(name, _db, *, locale="es", on_output=None, **_kwargs):
+        for i in range(3):
+            on_output(f"{name} line {i}")
+            await asyncio.sleep(0.01)
+        return name != "broken", [f"{name} done"]
+
+    monkeypatch.setattr(projects_module, "update_project", _fake)
+
+
+def test_start_update_streams_log_over_sse(client: TestClient, fake_update) -> None:
+    response = client.post("/api/projects/web/update/start")
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "running"
+
+    with client.stream("GET", f"/api/update-jobs/{job['id']}/events") as stream:
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        events = _read_events(stream)
+
+    kinds = [kind for _id, kind, _data in events]
+    assert kinds[0] == "status" and kinds[-1] == "done"
+    assert [d["line"] for _i, k, d in events if k == "log"] == [f"web line {i}" for i in range(3)]
+    assert events[-1][2]["success"] is True
+
+    # Reconexión: solo lo posterior al último ID recibido.
+    last_seen = events[1][0]
+    with client.stream(
+        "GET", f"/api/update-jobs/{job['id']}/events", headers={"Last-Event-ID": str(last_seen)}
+    ) as stream:
+        replay = _read_events(stream)
+    assert [i for i, _k, _d in replay] == [i for i, _k, _d in events if i > last_seen]
+
+    detail = client.get(f"/api/update-jobs/{job['id']}").json()
+    assert detail["status"] == "success"
+    assert detail["logs"] == ["web done"]
+    assert detail["history_saved"] is True
+
+
+def test_blocking_update_endpoint_uses_job(client: TestClient, fake_update) -> None:
+    ok = client.post("/api/projects/web/update")
+    assert ok.status_code == 200
+    assert ok.json() == {"success": True, "logs": ["web done"]}
+    assert client.post("/api/projects/broken/update").status_code == 500
+    assert client.get("/api/update-jobs/missing").status_code == 404
+
+
+def test_interrupted_job_finishes_and_closes_stream(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _hang(*_args, **_kwargs):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(projects_module, "update_project", _hang)
+    registry = UpdateJobRegistry()
+
+    async def scenario() -> UpdateJob:
+        job = registry.start("stuck", locale="en")
+        await asyncio.sleep(0.05)
+        job.task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await job.task
+        return job
+
+    job = asyncio.run(scenario())
+    assert (job.status, job.success) == ("error", False)
+    assert "Update cancelled" in job.logs[-1]
+    assert job.events.closed
+
+
+def test_queue_failure_marks_job_as_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _broken_queue(*_args, **_kwargs):
+        raise RuntimeError("queue exploded")
+
+    monkeypatch.setattr(update_jobs_module.update_queue, "run_async", _broken_queue)
+    registry = UpdateJobRegistry()
+
+    async def scenario() -> UpdateJob:
+        job = registry.start("web", locale="en")
+        await job.task
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "error"
+    assert "queue exploded" in job.logs[-1]
+    assert job.events.closed
+    assert registry.running_for("web") is None
+
+
+def test_update_project_queries_settings_off_the_event_loop() -> None:
+    threads: list[threading.Thread] = []
+
+    class _Query:
+        def filter(self, *_args):
+            return self
+
+        def first(self):
+            threads.append(threading.current_thread())
+            return None
+
+    class _Session:
+        def query(self, *_args):
+            return _Query()
+
+    success, logs = asyncio.run(
+        projects_module.update_project("off-loop", _Session(), locale="en")
+    )
+    assert success is False
+    assert threads and threads[0] is not threading.main_thread()
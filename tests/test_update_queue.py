@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from server.services.update_queue import UpdateQueue
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condición no alcanzada")
+        time.sleep(0.005)
+
+
+def _submit(queue: UpdateQueue, project: str, source: str, fn, results: dict) -> threading.Thread:
+    def _target() -> None:
+        results.setdefault(project, []).append(queue.run(project, fn, source=source))
+
+    thread = threading.Thread(target=_target)
+    thread.start()
+
+    def _queued() -> bool:
+        snapshot = queue.snapshot()
+        return any(e["project"] == project for e in snapshot["pending"] + snapshot["running"])
+
+    _wait_for(_queued)
+    return thread
+
+
+def test_queue_caps_concurrency_and_serializes_each_project() -> None:
+    queue = UpdateQueue(concurrency=2)
+    release = threading.Event()
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0, "same": 0, "same_peak": 0}
+
+    def _work(project: str):
+        def _run() -> str:
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+                if project == "a":
+                    active["same"] += 1
+                    active["same_peak"] = max(active["same_peak"], active["same"])
+            release.wait()
+            with lock:
+                active["now"] -= 1
+                if project == "a":
+                    active["same"] -= 1
+            return project
+
+        return _run
+
+    results: dict = {}
+    threads = [_submit(queue, "a", "manual", _work("a"), results)]
+    _wait_for(lambda: len(queue.snapshot()["running"]) == 1)
+    # La segunda de "a" entra con la primera ya en curso: no se deduplica, espera su turno.
+    threads += [_submit(queue, name, "manual", _work(name), results) for name in ("a", "b", "c")]
+    _wait_for(lambda: len(queue.snapshot()["running"]) == 2)
+    snapshot = queue.snapshot()
+    assert snapshot["depth"] == 2
+    assert snapshot["pending"][0]["blocked_by_project"] is True
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert active["peak"] == 2
+    assert active["same_peak"] == 1
+    assert results == {"a": [("a", False), ("a", False)], "b": [("b", False)], "c": [("c", False)]}
+    assert queue.snapshot()["completed"] == 4
+
+
+def test_manual_requests_jump_ahead_of_scheduled_ones() -> None:
+    queue = UpdateQueue(concurrency=1)
+    release = threading.Event()
+    order: list[str] = []
+    results: dict = {}
+
+    def _record(name: str):
+        def _run() -> str:
+            order.append(name)
+            return name
+
+        return _run
+
+    blocker = _submit(queue, "busy", "scheduled", release.wait, results)
+    _wait_for(lambda: len(queue.snapshot()["running"]) == 1)
+    threads = [
+        _submit(queue, "cron-1", "scheduled", _record("cron-1"), results),
+        _submit(queue, "cron-2", "scheduled", _record("cron-2"), results),
+        _submit(queue, "click", "manual", _record("click"), results),
+    ]
+    assert [e["project"] for e in queue.snapshot()["pending"]] == ["click", "cron-1", "cron-2"]
+    release.set()
+    for thread in [blocker, *threads]:
+        thread.join(2)
+    assert order == ["click", "cron-1", "cron-2"]
+
+
+def test_identical_pending_requests_run_once() -> None:
+    queue = UpdateQueue(concurrency=1)
+    release = threading.Event()
+    calls: list[str] = []
+    results: dict = {}
+
+    def _update() -> tuple[bool, list[str]]:
+        calls.append("web")
+        return True, ["ok"]
+
+    blocker = _submit(queue, "busy", "scheduled", release.wait, results)
+    _wait_for(lambda: len(queue.snapshot()["running"]) == 1)
+    first = _submit(queue, "web", "scheduled", _update, results)
+    second = threading.Thread(
+        target=lambda: results.setdefault("web", []).append(
+            queue.run("web", _update, source="manual")
+        )
+    )
+    second.start()
+    _wait_for(lambda: queue.snapshot()["pending"][0]["requests"] == 2)
+    # La petición manual sube la prioridad de la pendiente.
+    assert queue.snapshot()["pending"][0]["source"] == "manual"
+    release.set()
+    for thread in (blocker, first, second):
+        thread.join(2)
+
+    assert calls == ["web"]
+    # Solo la que la ejecutó no viene marcada: es la única que debe guardarla en el historial.
+    assert sorted(results["web"], key=lambda r: r.deduplicated) == [
+        ((True, ["ok"]), False),
+        ((True, ["ok"]), True),
+    ]
+    assert queue.snapshot()["deduplicated"] == 1
+
+
+def test_cancelled_async_request_leaves_the_queue() -> None:
+    queue = UpdateQueue(concurrency=1)
+    release = threading.Event()
+    results: dict = {}
+    blocker = _submit(queue, "busy", "scheduled", release.wait, results)
+    _wait_for(lambda: len(queue.snapshot()["running"]) == 1)
+
+    async def _never() -> None:
+        raise AssertionError("no debería ejecutarse")
+
+    async def _cancel() -> None:
+        task = asyncio.create_task(queue.run_async("web", _never, source="manual"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_cancel())
+    assert queue.snapshot()["depth"] == 0
+    release.set()
+    blocker.join(2)
+    assert queue.run("web", lambda: "done", source="manual").result == "done"
+
+
+def test_update_queue_endpoint(client) -> None:
+    res = client.get("/api/update-queue")
+    assert res.status_code == 200
+    body = res.json()
+    assert {"concurrency", "depth", "running", "pending", "avg_wait", "max_wait"} <= set(body)
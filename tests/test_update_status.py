@@ -0,0 +1,86 @@
+import os
+
+import pytest
+from server.services.update_status import (
+    MemoryStatusBackend,
+    SqliteStatusBackend,
+    UpdateStatusStore,
+    _process_token,
+    update_status,
+)
+
+
+def test_update_status_etag_returns_304_until_status_changes(client) -> None:
+    first = client.get("/api/update-status")
+    etag = first.headers["etag"]
+    assert first.json()["version"] == update_status.version()
+
+    assert client.get("/api/update-status", headers={"If-None-Match": etag}).status_code == 304
+
+    with update_status.mutate() as state:
+        state["current_project"] = "demo"
+    changed = client.get("/api/update-status", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["current_project"] == "demo"
+
+    with update_status.mutate() as state:
+        state["current_project"] = ""
+
+
+def test_project_timings_are_recorded() -> None:
+    store = UpdateStatusStore(MemoryStatusBackend())
+    assert store.begin_run()
+    store.project_started("web")
+    assert store.snapshot()["timings"]["web"]["finished_at"] is None
+    store.project_finished("web", "OK")
+    store.finish_run()
+
+    status = store.snapshot()
+    assert status["is_running"] is False
+    assert status["timings"]["web"]["duration"] >= 0
+    assert status["processed"] == [
+        {"name": "web", "status": "OK", "duration": status["timings"]["web"]["duration"]}
+    ]
+    assert "owner" not in status
+
+
+def test_failed_mutation_leaves_state_and_version_untouched() -> None:
+    store = UpdateStatusStore(MemoryStatusBackend())
+    version = store.version()
+    with pytest.raises(RuntimeError), store.mutate() as state:
+        state["current_project"] = "half-done"
+        raise RuntimeError("boom")
+    assert store.version() == version
+    assert store.snapshot()["current_project"] == ""
+
+
+def test_sqlite_backend_is_shared_between_stores(tmp_path) -> None:
+    # Dos stores sobre el mismo fichero simulan dos workers de uvicorn.
+    worker_a = UpdateStatusStore(SqliteStatusBackend(tmp_path / "status.db"))
+    worker_b = UpdateStatusStore(SqliteStatusBackend(tmp_path / "status.db"))
+
+    assert worker_a.begin_run()
+    worker_a.project_started("db")
+    assert worker_b.snapshot()["in_progress"] == ["db"]
+    assert worker_b.etag() == worker_a.etag()
+    # Ya en curso en el otro worker (proceso vivo).
+    assert not worker_b.begin_run()
+
+    worker_a.finish_run()
+    assert worker_b.snapshot()["is_running"] is False
+    assert worker_b.version() > 1
+
+
+def test_sqlite_backend_recovers_run_of_dead_process(tmp_path) -> None:
+    path = tmp_path / "status.db"
+    backend = SqliteStatusBackend(path)
+    with backend.transaction() as state:
+        state["is_running"] = True
+        # Mismo PID, distinto instante de arranque: proceso anterior al reinicio.
+        state["owner"] = f"{os.getpid()}:0"
+    assert _process_token() != state["owner"]
+
+    store = UpdateStatusStore(SqliteStatusBackend(path))
+    assert store.snapshot()["is_running"] is False
+    assert store.begin_run()
@@ -1,4 +1,4 @@
-import { useCallback, useEffect, useMemo, useState } from "react";
+import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import { useTranslation } from "react-i18next";
 
 import Dashboard from "./components/Dashboard";
@@ -8,11 +8,13 @@ import HistoryView from "./components/HistoryView";
 import LogModal from "./components/LogModal";
 import ProgressBar from "./components/ProgressBar";
 import ScheduleView from "./components/ScheduleView";
-import { usePolling } from "./hooks/usePolling";
+import { useUpdateJobStream } from "./hooks/useUpdateJobStream";
+import { useUpdateStatusStream } from "./hooks/useUpdateStatusStream";
 import {
   createSchedule,
   deleteSchedule,
   fetchHistory,
+  fetchHistoryDetails,
   fetchProjects,
   fetchSchedules,
   fetchUpdateStatus,
@@ -20,9 +22,9 @@ import {
   logout,
   normalizeUiLocale,
   SESSION_EXPIRED_ERROR,
+  startProjectUpdate,
   toggleProjectSetting,
   triggerUpdateAll,
-  updateProject,
 } from "./lib/api";
 import { MOCK_HISTORY, MOCK_PROJECTS } from "./lib/mockData";
 
@@ -31,6 +33,7 @@ const DEFAULT_PROGRESS = {
   current: 0,
   total: 0,
   current_project: "",
+  in_progress: [],
 };
 
 export default function App() {
@@ -42,19 +45,23 @@ export default function App() {
   const [updatingProjects, setUpdatingProjects] = useState({});
   const [activeTab, setActiveTab] = useState("dashboard");
   const [selectedLog, setSelectedLog] = useState(null);
+  const [liveJobId, setLiveJobId] = useState(null);
   const [isMockMode, setIsMockMode] = useState(false);
   const [historyLoading, setHistoryLoading] = useState(false);
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [historyLoadingMore, setHistoryLoadingMore] = useState(false);
   const [selectedFreq, setSelectedFreq] = useState("daily");
   const [progress, setProgress] = useState(DEFAULT_PROGRESS);
 
-  const { startPolling, stopPolling } = usePolling();
+  const wasRunningRef = useRef(false);
+
+  const { jobs: updateJobs, follow: followUpdateJob } = useUpdateJobStream();
 
   const handleUnauthorized = useCallback(() => {
-    stopPolling();
     if (window.location.pathname !== "/login") {
       window.location.replace("/login");
     }
-  }, [stopPolling]);
+  }, []);
 
   const requestContext = useMemo(
     () => ({
@@ -90,12 +97,14 @@ export default function App() {
     async (allowMockFallback = true) => {
       setHistoryLoading(true);
       try {
-        const data = await fetchHistory(requestContext);
-        setHistory(data);
+        const page = await fetchHistory(null, requestContext);
+        setHistory(page.items);
+        setHistoryCursor(page.nextCursor);
       } catch (error) {
         if (error.message === SESSION_EXPIRED_ERROR) {
           return;
         }
+        setHistoryCursor(null);
         if (allowMockFallback && isBackendUnreachableError(error)) {
           setHistory(MOCK_HISTORY);
           return;
@@ -110,6 +119,45 @@ export default function App() {
     [requestContext, t]
   );
 
+  const loadMoreHistory = useCallback(async () => {
+    if (!historyCursor) {
+      return;
+    }
+    setHistoryLoadingMore(true);
+    try {
+      const page = await fetchHistory(historyCursor, requestContext);
+      setHistory((prev) => [...prev, ...page.items]);
+      setHistoryCursor(page.nextCursor);
+    } catch (error) {
+      if (error.message !== SESSION_EXPIRED_ERROR) {
+        console.error("Error cargando historial", error);
+        alert(t("alerts.history_load_error"));
+      }
+    } finally {
+      setHistoryLoadingMore(false);
+    }
+  }, [historyCursor, requestContext, t]);
+
+  // El listado no trae los logs: se piden al abrir el detalle.
+  const selectLog = useCallback(
+    async (log) => {
+      if (log.details != null) {
+        setSelectedLog(log);
+        return;
+      }
+      try {
+        const details = await fetchHistoryDetails(log.id, requestContext);
+        setSelectedLog({ ...log, details });
+      } catch (error) {
+        if (error.message !== SESSION_EXPIRED_ERROR) {
+          console.error("Error cargando historial", error);
+          alert(t("alerts.history_load_error"));
+        }
+      }
+    },
+    [requestContext, t]
+  );
+
   const loadSchedules = useCallback(async () => {
     if (isMockMode) {
       return;
@@ -124,32 +172,41 @@ export default function App() {
     }
   }, [isMockMode, requestContext]);
 
-  const checkProgress = useCallback(async () => {
-    try {
-      const data = await fetchUpdateStatus(requestContext);
+  const applyProgress = useCallback(
+    async (data) => {
       if (data.is_running) {
+        wasRunningRef.current = true;
         setProgress(data);
-        startPolling(checkProgress, 1000);
-      } else {
-        stopPolling();
-        setProgress(DEFAULT_PROGRESS);
+        return;
+      }
+      setProgress(DEFAULT_PROGRESS);
+      if (wasRunningRef.current) {
+        wasRunningRef.current = false;
         await loadProjects();
         await loadHistory(false);
       }
+    },
+    [loadHistory, loadProjects]
+  );
+
+  // Solo si el canal SSE se cierra (p. ej. sesión caducada): una consulta normal gestiona el 401.
+  const checkProgress = useCallback(async () => {
+    try {
+      await applyProgress(await fetchUpdateStatus(requestContext));
     } catch (error) {
       if (error.message !== SESSION_EXPIRED_ERROR) {
         console.error("Error checking progress", error);
       }
     }
-  }, [loadHistory, loadProjects, requestContext, startPolling, stopPolling]);
+  }, [applyProgress, requestContext]);
+
+  useUpdateStatusStream(!isMockMode, applyProgress, checkProgress);
 
   useEffect(() => {
     loadProjects();
     loadHistory();
     loadSchedules();
-    checkProgress();
-    return () => stopPolling();
-  }, [checkProgress, loadHistory, loadProjects, loadSchedules, stopPolling]);
+  }, [loadHistory, loadProjects, loadSchedules]);
 
   const handleLogout = async () => {
     try {
@@ -160,27 +217,41 @@ export default function App() {
     }
   };
 
+  const clearUpdating = (name) => {
+    setUpdatingProjects((prev) => {
+      const next = { ...prev };
+      delete next[name];
+      return next;
+    });
+  };
+
   const handleUpdateProject = async (name) => {
     setUpdatingProjects((prev) => ({ ...prev, [name]: true }));
 
     if (isMockMode) {
       await new Promise((resolve) => setTimeout(resolve, 1500));
-    } else {
-      try {
-        await updateProject(name, requestContext);
+      clearUpdating(name);
+      return;
+    }
+
+    try {
+      const job = await startProjectUpdate(name, requestContext);
+      setSelectedLog(null);
+      setLiveJobId(job.id);
+      followUpdateJob(job, async (result) => {
+        clearUpdating(name);
         await loadProjects();
-      } catch (error) {
-        if (error.message !== SESSION_EXPIRED_ERROR) {
+        await loadHistory(false);
+        if (!result.success) {
           alert(t("alerts.backend_error"));
         }
+      });
+    } catch (error) {
+      clearUpdating(name);
+      if (error.message !== SESSION_EXPIRED_ERROR) {
+        alert(t("alerts.backend_error"));
       }
     }
-
-    setUpdatingProjects((prev) => {
-      const next = { ...prev };
-      delete next[name];
-      return next;
-    });
   };
 
   const handleUpdateAll = async () => {
@@ -200,8 +271,9 @@ export default function App() {
         current: 0,
         total: 1,
         current_project: t("status.starting"),
+        in_progress: [],
       });
-      startPolling(checkProgress, 1000);
+      wasRunningRef.current = true;
     } catch (error) {
       if (error.message !== SESSION_EXPIRED_ERROR) {
         alert(t("alerts.backend_error"));
@@ -404,11 +476,22 @@ export default function App() {
             history={history}
             historyLoading={historyLoading}
             onRefresh={loadHistory}
-            onSelectLog={setSelectedLog}
+            hasMore={Boolean(historyCursor)}
+            loadingMore={historyLoadingMore}
+            onLoadMore={loadMoreHistory}
+            onSelectLog={selectLog}
           />
         )}
 
-        <LogModal t={t} selectedLog={selectedLog} onClose={() => setSelectedLog(null)} />
+        <LogModal
+          t={t}
+          selectedLog={selectedLog}
+          liveJob={liveJobId ? updateJobs[liveJobId] : null}
+          onClose={() => {
+            setSelectedLog(null);
+            setLiveJobId(null);
+          }}
+        />
       </main>
 
       <Footer t={t} />
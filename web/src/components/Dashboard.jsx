@@ -62,7 +62,7 @@ export default function Dashboard({
               t={t}
               isUpdatingThis={Boolean(updatingProjects[project.name])}
               isGlobalUpdate={progress.is_running}
-              currentProject={progress.current_project}
+              inProgress={progress.in_progress || [progress.current_project]}
               onUpdateProject={onUpdateProject}
               onToggleSetting={onToggleSetting}
             />
@@ -1,6 +1,15 @@
 import { CheckCircle, Loader2, RefreshCw, XCircle } from "lucide-react";
 
-export default function HistoryView({ t, history, historyLoading, onRefresh, onSelectLog }) {
+export default function HistoryView({
+  t,
+  history,
+  historyLoading,
+  onRefresh,
+  hasMore,
+  loadingMore,
+  onLoadMore,
+  onSelectLog,
+}) {
   return (
     <div className="bg-white rounded-xl shadow-sm border border-slate-200 overflow-hidden animate-in fade-in slide-in-from-right-4 duration-300">
       <div className="p-6 border-b border-slate-200 flex justify-between items-center">
@@ -52,6 +61,20 @@ export default function HistoryView({ t, history, historyLoading, onRefresh, onS
                     </td>
                     <td className="px-6 py-4 font-mono text-slate-500">
                       {new Date(log.timestamp).toLocaleString()}
+                      {(log.run_timing === "late" || log.run_timing === "coalesced") && (
+                        <span
+                          className="ml-2 px-2 py-0.5 rounded-full text-xs font-sans font-medium bg-amber-100 text-amber-700 border border-amber-200"
+                          title={
+                            log.scheduled_for
+                              ? t("history.scheduled_for", {
+                                  date: new Date(log.scheduled_for).toLocaleString(),
+                                })
+                              : undefined
+                          }
+                        >
+                          {t(`history.run_${log.run_timing}`)}
+                        </span>
+                      )}
                     </td>
                     <td className="px-6 py-4 max-w-md truncate" title={log.summary}>
                       {log.summary}
@@ -78,6 +101,18 @@ export default function HistoryView({ t, history, historyLoading, onRefresh, onS
           </tbody>
         </table>
       </div>
+      {hasMore && !historyLoading && (
+        <div className="p-4 border-t border-slate-200 flex justify-center">
+          <button
+            onClick={onLoadMore}
+            disabled={loadingMore}
+            className="inline-flex items-center gap-2 px-4 py-2 text-sm font-medium text-blue-600 hover:text-blue-800 hover:bg-blue-50 rounded-lg transition-colors disabled:opacity-50"
+          >
+            {loadingMore && <Loader2 size={16} className="animate-spin" />}
+            {t("history.load_more")}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -9,12 +9,21 @@ function safeStringifyDetails(details) {
   }
 }
 
-export default function LogModal({ t, selectedLog, onClose }) {
+export default function LogModal({ t, selectedLog, liveJob, onClose }) {
   const dialogRef = useRef(null);
   const closeButtonRef = useRef(null);
+  const logEndRef = useRef(null);
+  const isOpen = Boolean(selectedLog || liveJob);
 
+  // Cada línea nueva crea un liveJob nuevo: seguir el final del log.
   useEffect(() => {
-    if (!selectedLog) {
+    if (liveJob) {
+      logEndRef.current?.scrollIntoView({ block: "end" });
+    }
+  }, [liveJob]);
+
+  useEffect(() => {
+    if (!isOpen) {
       return undefined;
     }
 
@@ -59,9 +68,9 @@ export default function LogModal({ t, selectedLog, onClose }) {
         previousFocused.focus();
       }
     };
-  }, [onClose, selectedLog]);
+  }, [onClose, isOpen]);
 
-  if (!selectedLog) {
+  if (!isOpen) {
     return null;
   }
 
@@ -76,7 +85,9 @@ export default function LogModal({ t, selectedLog, onClose }) {
       >
         <div className="p-5 border-b border-slate-200 flex justify-between items-center bg-slate-50">
           <h3 id="log-modal-title" className="font-bold text-lg text-slate-800">
-            {t("modal.title", { id: selectedLog.id })}
+            {liveJob
+              ? t("modal.live_title", { project: liveJob.project })
+              : t("modal.title", { id: selectedLog.id })}
           </h3>
           <button
             ref={closeButtonRef}
@@ -88,7 +99,17 @@ export default function LogModal({ t, selectedLog, onClose }) {
           </button>
         </div>
         <div className="p-6 overflow-y-auto font-mono text-xs bg-slate-900 text-slate-300">
-          <pre className="whitespace-pre-wrap">{safeStringifyDetails(selectedLog.details)}</pre>
+          {liveJob ? (
+            <>
+              <pre className="whitespace-pre-wrap">{liveJob.lines.join("\n")}</pre>
+              {liveJob.status === "running" && (
+                <p className="mt-2 text-slate-500 animate-pulse">{t("modal.live_running")}</p>
+              )}
+              <div ref={logEndRef} />
+            </>
+          ) : (
+            <pre className="whitespace-pre-wrap">{safeStringifyDetails(selectedLog.details)}</pre>
+          )}
         </div>
         <div className="p-4 border-t border-slate-200 bg-slate-50 flex justify-end">
           <button
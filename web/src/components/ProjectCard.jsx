@@ -5,7 +5,7 @@ export default function ProjectCard({
   t,
   isUpdatingThis,
   isGlobalUpdate,
-  currentProject,
+  inProgress,
   onUpdateProject,
   onToggleSetting,
 }) {
@@ -22,7 +22,7 @@ export default function ProjectCard({
       <div className="p-5 border-b border-slate-100 flex justify-between items-start">
         <div>
           <h3 className="font-bold text-lg text-slate-800 break-all">{project.name}</h3>
-          {(isGlobalUpdate && currentProject === project.name) || isUpdatingThis ? (
+          {(isGlobalUpdate && inProgress.includes(project.name)) || isUpdatingThis ? (
             <span className="text-xs text-blue-600 flex items-center gap-1 mt-1 animate-pulse font-bold">
               <Loader2 size={12} className="animate-spin" /> {t("status.updating")}
             </span>
@@ -40,6 +40,11 @@ export default function ProjectCard({
               <span className="text-xs uppercase font-bold text-slate-400 tracking-wider">
                 {project.status}
               </span>
+              {project.updates_available && (
+                <span className="text-xs font-bold text-amber-700 bg-amber-50 px-2 py-0.5 rounded-full">
+                  {t("status.updates_available")}
+                </span>
+              )}
             </div>
           )}
         </div>
@@ -224,6 +224,23 @@ export default function ScheduleView({
                   </td>
                   <td className="p-4 font-mono text-slate-600 text-xs md:text-sm">
                     {formatExpression(schedule.expression, schedule.task_type)}
+                    {schedule.next_run_time && (
+                      <div className="font-sans text-xs text-slate-400 mt-1">
+                        {t("schedule.next_run", {
+                          date: new Date(schedule.next_run_time).toLocaleString(),
+                        })}
+                      </div>
+                    )}
+                    {schedule.staggered && (
+                      <div className="font-sans text-xs text-slate-400">
+                        {schedule.stagger_offset != null
+                          ? t("schedule.stagger_offset", {
+                              minutes: Math.floor(schedule.stagger_offset / 60),
+                              seconds: schedule.stagger_offset % 60,
+                            })
+                          : t("schedule.stagger_jitter")}
+                      </div>
+                    )}
                   </td>
                   <td className="p-4 text-right">
                     <button
@@ -0,0 +1,56 @@
+import { useCallback, useEffect, useRef, useState } from "react";
+
+import { updateJobEventsUrl } from "../lib/api";
+
+const MAX_LINES = 2000;
+
+/** Sigue por SSE el log de jobs de actualización (EventSource reconecta con Last-Event-ID). */
+export function useUpdateJobStream() {
+  const [jobs, setJobs] = useState({});
+  const sourcesRef = useRef({});
+
+  const patchJob = useCallback((id, update) => {
+    setJobs((prev) => (prev[id] ? { ...prev, [id]: update(prev[id]) } : prev));
+  }, []);
+
+  const follow = useCallback(
+    (job, onDone) => {
+      const source = new EventSource(updateJobEventsUrl(job.id));
+      sourcesRef.current[job.id] = source;
+      setJobs((prev) => ({ ...prev, [job.id]: { ...job, lines: [] } }));
+
+      const finish = (result) => {
+        source.close();
+        delete sourcesRef.current[job.id];
+        patchJob(job.id, (current) => ({ ...current, ...result }));
+        onDone?.(result);
+      };
+
+      source.addEventListener("log", (event) => {
+        const { line } = JSON.parse(event.data);
+        patchJob(job.id, (current) => ({
+          ...current,
+          lines: [...current.lines, line].slice(-MAX_LINES),
+        }));
+      });
+      source.addEventListener("done", (event) => finish(JSON.parse(event.data)));
+      source.onerror = () => {
+        // CLOSED: el servidor rechazó la conexión (job desconocido, sesión caducada...).
+        if (source.readyState === EventSource.CLOSED) {
+          finish({ status: "error", success: false });
+        }
+      };
+    },
+    [patchJob]
+  );
+
+  useEffect(
+    () => () => {
+      Object.values(sourcesRef.current).forEach((source) => source.close());
+      sourcesRef.current = {};
+    },
+    []
+  );
+
+  return { jobs, follow };
+}
@@ -0,0 +1,29 @@
+import { useEffect, useRef } from "react";
+
+import { updateStatusStreamUrl } from "../lib/api";
+
+/**
+ * Estado de la actualización global por SSE: el servidor solo emite cuando cambia y, al
+ * reconectar (Last-Event-ID = última versión), envía el estado actual si nos lo perdimos.
+ */
+export function useUpdateStatusStream(enabled, onStatus, onClosed) {
+  const onStatusRef = useRef(onStatus);
+  const onClosedRef = useRef(onClosed);
+  onStatusRef.current = onStatus;
+  onClosedRef.current = onClosed;
+
+  useEffect(() => {
+    if (!enabled) {
+      return undefined;
+    }
+    const source = new EventSource(updateStatusStreamUrl());
+    source.addEventListener("status", (event) => onStatusRef.current(JSON.parse(event.data)));
+    source.onerror = () => {
+      // CONNECTING: EventSource reintenta solo. CLOSED: respuesta no válida (p. ej. 401).
+      if (source.readyState === EventSource.CLOSED) {
+        onClosedRef.current?.();
+      }
+    };
+    return () => source.close();
+  }, [enabled]);
+}
@@ -27,6 +27,7 @@ const resources = {
         active: "{{count}} activos.",
         update_all: "Actualizar Todo",
         update_project: "Actualizar proyecto",
+        updates_available: "Imágenes nuevas",
         updating: "Actualizando...",
         updating_btn: "Actualizando...",
         starting: "Iniciando...",
@@ -64,6 +65,9 @@ const resources = {
         delete_task: "Eliminar tarea",
         active_tasks: "Tareas Activas",
         tasks_count: "{{count}} Tareas",
+        next_run: "Próxima: {{date}}",
+        stagger_offset: "Escalonada: +{{minutes}} min {{seconds}} s",
+        stagger_jitter: "Escalonada: retraso aleatorio",
         no_tasks: "No hay tareas programadas.",
         format: {
           daily: "Diaria a las {{time}}",
@@ -83,9 +87,15 @@ const resources = {
         status_error: "Error",
         view_details: "Ver Detalles",
         no_logs: "No hay registros de actualizaciones aun.",
+        load_more: "Cargar más",
+        run_late: "Con retraso",
+        run_coalesced: "Agrupada",
+        scheduled_for: "Programada para {{date}}",
       },
       modal: {
         title: "Detalles del Log #{{id}}",
+        live_title: "Actualizando {{project}}",
+        live_running: "En curso...",
         close: "Cerrar",
       },
       alerts: {
@@ -139,6 +149,7 @@ const resources = {
         active: "{{count}} active.",
         update_all: "Update All",
         update_project: "Update project",
+        updates_available: "New images",
         updating: "Updating...",
         updating_btn: "Updating...",
         starting: "Starting...",
@@ -176,6 +187,9 @@ const resources = {
         delete_task: "Delete task",
         active_tasks: "Active Tasks",
         tasks_count: "{{count}} Tasks",
+        next_run: "Next: {{date}}",
+        stagger_offset: "Staggered: +{{minutes}} min {{seconds}} s",
+        stagger_jitter: "Staggered: random delay",
         no_tasks: "No scheduled tasks.",
         format: {
           daily: "Daily at {{time}}",
@@ -195,9 +209,15 @@ const resources = {
         status_error: "Error",
         view_details: "View Details",
         no_logs: "No update records yet.",
+        load_more: "Load more",
+        run_late: "Late",
+        run_coalesced: "Coalesced",
+        scheduled_for: "Scheduled for {{date}}",
       },
       modal: {
         title: "Log Details #{{id}}",
+        live_title: "Updating {{project}}",
+        live_running: "Running...",
         close: "Close",
       },
       alerts: {
@@ -93,8 +93,20 @@ export function fetchProjects(context = {}) {
   return requestJson("/projects", {}, context);
 }
 
-export function fetchHistory(context = {}) {
-  return requestJson("/history", {}, context);
+/** Página del historial (sin `details`); `nextCursor` es null en la última. */
+export async function fetchHistory(cursor = null, context = {}) {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  const response = await request(`/history${query}`, {}, context);
+  await assertOk(response);
+  const items = await readJsonBody(response);
+  return { items: items ?? [], nextCursor: response.headers.get("X-Next-Cursor") };
+}
+
+/** Log completo de una ejecución, como texto JSON (el navegador descomprime el deflate). */
+export async function fetchHistoryDetails(id, context = {}) {
+  const response = await request(`/history/${id}/details`, {}, context);
+  await assertOk(response);
+  return response.text();
 }
 
 export function fetchSchedules(context = {}) {
@@ -105,6 +117,10 @@ export function fetchUpdateStatus(context = {}) {
   return requestJson("/update-status", {}, context);
 }
 
+export function updateStatusStreamUrl() {
+  return `${API_URL}/update-status/stream`;
+}
+
 export async function triggerUpdateAll(context = {}) {
   const response = await request("/update-all", { method: "POST" }, context);
   await assertOk(response);
@@ -120,6 +136,15 @@ export async function updateProject(name, context = {}) {
   return readJsonBody(response);
 }
 
+/** Lanza la actualización en segundo plano; devuelve el job (id, project, status...). */
+export function startProjectUpdate(name, context = {}) {
+  return requestJson(`/projects/${projectSegment(name)}/update/start`, { method: "POST" }, context);
+}
+
+export function updateJobEventsUrl(jobId) {
+  return `${API_URL}/update-jobs/${encodeURIComponent(jobId)}/events`;
+}
+
 export async function toggleProjectSetting(name, setting, context = {}) {
   const response = await request(
     `/projects/${projectSegment(name)}/toggle_${setting}`,